@@ -30,16 +30,20 @@
 #
 # =================================================================
 
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import sys
+import traceback
 from glob import glob
 
 import click
 
 from pycsw import __version__
 from pycsw.core import config as pconfig
-from pycsw.core import metadata, repository, util
+from pycsw.core import httpclient, metadata, repository, util
 from pycsw.core.etree import etree
 from pycsw.core.etree import PARSER
 from pycsw.core.util import parse_ini_config
@@ -48,10 +52,11 @@ LOGGER = logging.getLogger(__name__)
 
 
 def setup_db(database, table, home, create_sfsql_tables=True, create_plpythonu_functions=True,
-             postgis_geometry_column='wkb_geometry', extra_columns=[], language='english'):
+             postgis_geometry_column='wkb_geometry', extra_columns=[], language='english',
+             create_fts_index=True):
     """Setup database tables and indexes"""
-    from sqlalchemy import Column, create_engine, Integer, MetaData, \
-        Table, Text, Unicode
+    from sqlalchemy import Column, create_engine, Float, Index, Integer, \
+        MetaData, Table, Text, Unicode
     from sqlalchemy.orm import create_session
 
     LOGGER.info('Creating database %s', database)
@@ -177,6 +182,13 @@ def setup_db(database, table, home, create_sfsql_tables=True, create_plpythonu_f
         Column('distancevalue', Text, index=True),
         Column('distanceuom', Text, index=True),
         Column('wkt_geometry', Text),
+        # numeric bounding box of wkt_geometry, for index driven spatial filters
+        Column('bbox_minx', Float),
+        Column('bbox_miny', Float),
+        Column('bbox_maxx', Float),
+        Column('bbox_maxy', Float),
+        # area of wkt_geometry, for spatial sorting
+        Column('area', Float, index=True),
 
         # service
         Column('servicetype', Text, index=True),
@@ -218,6 +230,9 @@ def setup_db(database, table, home, create_sfsql_tables=True, create_plpythonu_f
             LOGGER.info('Adding extra column: %s', extra_column)
             records.append_column(extra_column)
 
+    Index('ix_%s_bbox' % table_name, records.c.bbox_minx, records.c.bbox_maxx,
+          records.c.bbox_miny, records.c.bbox_maxy)
+
     records.create()
 
     conn = dbase.connect()
@@ -282,6 +297,11 @@ def setup_db(database, table, home, create_sfsql_tables=True, create_plpythonu_f
             conn.execute(function_get_geometry_area)
             conn.execute(function_get_spatial_overlay_rank)
 
+    if dbase.name == 'sqlite':
+        create_sqlite_spatial_index(conn, table_name)
+        if create_fts_index:
+            create_sqlite_fts_index(conn, table_name)
+
     if dbase.name == 'postgresql':
         LOGGER.info('Creating PostgreSQL Free Text Search (FTS) GIN index')
         tsvector_fts = "alter table %s add column anytext_tsvector tsvector" % table_name
@@ -323,8 +343,224 @@ FOR EACH ROW EXECUTE PROCEDURE %(table)s_update_geometry();
         conn.execute(create_insert_update_trigger_sql)
         conn.execute(create_spatial_index_sql)
 
-def load_records(context, database, table, xml_dirpath, recursive=False, force_update=False):
-    """Load metadata records from directory of files to database"""
+    # the table has been (re)created: drop any memoized model of it
+    repository.Repository.invalidate(table=table)
+
+def create_sqlite_spatial_index(conn, table_name):
+    """create an SQLite R*Tree index of record bounding boxes, kept in sync
+    with the records table by triggers"""
+    from sqlalchemy.exc import OperationalError
+
+    LOGGER.info('Creating SQLite R*Tree spatial index')
+    try:
+        conn.execute(
+            'CREATE VIRTUAL TABLE %s_rtree USING rtree(id, minx, maxx, miny, maxy)'
+            % table_name)
+    except OperationalError as err:
+        LOGGER.warning('SQLite R*Tree module not available: %s', err)
+        return False
+
+    # bounds are read from the numeric bounding box columns, so that the
+    # triggers only use built-in SQL and any SQLite client can write records
+    bounds = 'NEW.bbox_minx, NEW.bbox_maxx, NEW.bbox_miny, NEW.bbox_maxy'
+    columns = 'bbox_minx, bbox_miny, bbox_maxx, bbox_maxy'
+
+    conn.execute('''
+CREATE TRIGGER %(table)s_rtree_insert AFTER INSERT ON %(table)s
+WHEN NEW.bbox_minx IS NOT NULL
+BEGIN
+    INSERT INTO %(table)s_rtree VALUES (NEW.rowid, %(bounds)s);
+END''' % {'table': table_name, 'bounds': bounds})
+
+    conn.execute('''
+CREATE TRIGGER %(table)s_rtree_update AFTER UPDATE OF %(columns)s ON %(table)s
+BEGIN
+    DELETE FROM %(table)s_rtree WHERE id = OLD.rowid;
+    INSERT INTO %(table)s_rtree SELECT NEW.rowid, %(bounds)s
+    WHERE NEW.bbox_minx IS NOT NULL;
+END''' % {'table': table_name, 'bounds': bounds, 'columns': columns})
+
+    conn.execute('''
+CREATE TRIGGER %(table)s_rtree_delete AFTER DELETE ON %(table)s
+BEGIN
+    DELETE FROM %(table)s_rtree WHERE id = OLD.rowid;
+END''' % {'table': table_name})
+
+    return True
+
+
+def rebuild_sqlite_spatial_index(conn, table_name):
+    """repopulate an SQLite R*Tree index (e.g. after VACUUM, which may
+    renumber rowids)"""
+
+    LOGGER.info('Rebuilding SQLite R*Tree spatial index')
+    conn.execute('DELETE FROM %s_rtree' % table_name)
+    conn.execute(
+        'INSERT INTO %(table)s_rtree SELECT rowid, bbox_minx, bbox_maxx, '
+        'bbox_miny, bbox_maxy FROM %(table)s WHERE bbox_minx IS NOT NULL'
+        % {'table': table_name})
+
+
+def create_sqlite_fts_index(conn, table_name):
+    """create an SQLite FTS5 full-text index of record anytext, title and
+    abstract, kept in sync with the records table by triggers"""
+    from sqlalchemy.exc import OperationalError
+
+    columns = ', '.join(util.FTS_INDEX_COLUMNS)
+    new_columns = ', '.join('NEW.%s' % column for column in util.FTS_INDEX_COLUMNS)
+    old_columns = ', '.join('OLD.%s' % column for column in util.FTS_INDEX_COLUMNS)
+
+    LOGGER.info('Creating SQLite FTS5 full-text index')
+    try:
+        # the trigram tokenizer allows for substring matching, like the
+        # LIKE '%term%' queries it replaces
+        conn.execute(
+            "CREATE VIRTUAL TABLE %(table)s_fts USING fts5(%(columns)s, "
+            "content='%(table)s', content_rowid='rowid', tokenize='trigram')"
+            % {'table': table_name, 'columns': columns})
+    except OperationalError as err:
+        LOGGER.warning('SQLite FTS5 module or trigram tokenizer not available: %s', err)
+        return False
+
+    conn.execute('''
+CREATE TRIGGER %(table)s_fts_insert AFTER INSERT ON %(table)s
+BEGIN
+    INSERT INTO %(table)s_fts(rowid, %(columns)s) VALUES (NEW.rowid, %(new)s);
+END''' % {'table': table_name, 'columns': columns, 'new': new_columns})
+
+    conn.execute('''
+CREATE TRIGGER %(table)s_fts_update AFTER UPDATE OF %(columns)s ON %(table)s
+BEGIN
+    INSERT INTO %(table)s_fts(%(table)s_fts, rowid, %(columns)s) VALUES ('delete', OLD.rowid, %(old)s);
+    INSERT INTO %(table)s_fts(rowid, %(columns)s) VALUES (NEW.rowid, %(new)s);
+END''' % {'table': table_name, 'columns': columns, 'old': old_columns, 'new': new_columns})
+
+    conn.execute('''
+CREATE TRIGGER %(table)s_fts_delete AFTER DELETE ON %(table)s
+BEGIN
+    INSERT INTO %(table)s_fts(%(table)s_fts, rowid, %(columns)s) VALUES ('delete', OLD.rowid, %(old)s);
+END''' % {'table': table_name, 'columns': columns, 'old': old_columns})
+
+    return True
+
+
+def rebuild_sqlite_fts_index(conn, table_name):
+    """repopulate an SQLite FTS5 index from the records table (e.g. after
+    VACUUM, which may renumber rowids)"""
+
+    LOGGER.info('Rebuilding SQLite FTS5 full-text index')
+    conn.execute("INSERT INTO %(table)s_fts(%(table)s_fts) VALUES ('rebuild')"
+                 % {'table': table_name})
+
+
+def _parse_record_file(context, repo, recfile):
+    """parse a metadata file into a list of record column dicts
+
+    returns a tuple of (records, error): records is None and error a
+    message if the file could not be parsed
+    """
+
+    # read document
+    try:
+        exml = etree.parse(recfile, context.parser)
+    except Exception as err:
+        LOGGER.debug(traceback.format_exc())
+        return None, 'XML document "%s" is not well-formed: %s' % (recfile, err)
+
+    try:
+        records = metadata.parse_record(context, exml, repo)
+    except Exception as err:
+        LOGGER.debug(traceback.format_exc())
+        return None, 'Could not parse "%s" as an XML record: %s' % (recfile, err)
+
+    return [repo.as_dict(rec) for rec in records], None
+
+
+# per process state of load_records parser workers
+_LOAD_WORKER = {}
+
+
+def _load_worker_init(database, table, context):
+    """initialize a load_records parser worker process"""
+
+    _LOAD_WORKER['context'] = context
+    _LOAD_WORKER['repo'] = repository.Repository(database, context, table=table)
+
+
+def _load_worker_parse(recfile):
+    """parse a metadata file in a load_records parser worker process"""
+
+    return (recfile,) + _parse_record_file(_LOAD_WORKER['context'],
+                                           _LOAD_WORKER['repo'], recfile)
+
+
+def _read_manifest(manifest):
+    """read a load_records manifest file (empty if it does not exist)"""
+
+    if not os.path.exists(manifest):
+        LOGGER.info('Manifest %s not found; loading all files', manifest)
+        return {}
+
+    with open(manifest, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _write_manifest(manifest, entries):
+    """atomically write a load_records manifest file"""
+
+    tmp = '%s.tmp' % manifest
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(entries, fh, indent=0, sort_keys=True)
+    os.replace(tmp, manifest)
+
+
+def _file_digest(path):
+    """SHA-256 hex digest of a file's content"""
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _delete_identifiers(repo, identifiers, chunk_size=500):
+    """delete records by identifier (their children, which come from files
+    of their own, are kept)"""
+
+    column = getattr(repo.dataset,
+                     repo.context.md_core_model['mappings']['pycsw:Identifier'])
+    identifiers = sorted(identifiers)
+
+    deleted = 0
+    try:
+        repo.session.begin()
+        for i in range(0, len(identifiers), chunk_size):
+            deleted += repo.session.query(repo.dataset).filter(
+                column.in_(identifiers[i:i + chunk_size])).delete(
+                synchronize_session=False)
+        repo.session.commit()
+    except Exception:
+        repo.session.rollback()
+        raise
+
+    return deleted
+
+
+def load_records(context, database, table, xml_dirpath, recursive=False, force_update=False,
+                 batch_size=repository.INSERT_BATCH_SIZE, jobs=1, manifest=None,
+                 delete_missing=False):
+    """Load metadata records from directory of files to database
+
+    with jobs > 1, files are parsed in a pool of worker processes while
+    this process writes their records to the database
+
+    with a manifest (path to a JSON file of the path, mtime, size, content
+    hash and record identifiers of each loaded file), only new and changed
+    files are loaded (replacing their records), records no longer in a
+    changed file are deleted, and records of files which disappeared are
+    deleted if delete_missing is set
+    """
     from sqlalchemy.exc import DBAPIError
 
     repo = repository.Repository(database, context, table=table)
@@ -343,50 +579,132 @@ def load_records(context, database, table, xml_dirpath, recursive=False, force_u
         for rec in glob(os.path.join(xml_dirpath, '*.xml')):
             file_list.append(rec)
 
+    if force_update:
+        mode = 'upsert'
+    else:
+        mode = 'insert'
+
+    entries = None
+    if manifest is not None:
+        entries = _read_manifest(manifest)
+        scanned = set()
+        changed = {}
+        for recfile in file_list:
+            key = os.path.abspath(recfile)
+            scanned.add(key)
+            stat = os.stat(recfile)
+            entry = entries.get(key)
+            if (entry is not None and entry['mtime'] == stat.st_mtime and
+                    entry['size'] == stat.st_size):
+                continue
+            digest = _file_digest(recfile)
+            if entry is not None and entry['sha256'] == digest:  # touched
+                entry.update(mtime=stat.st_mtime, size=stat.st_size)
+                continue
+            changed[recfile] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'sha256': digest
+            }
+
+        LOGGER.info('%d of %d files new or changed since last load',
+                    len(changed), len(file_list))
+        file_list = list(changed)
+        # changed files replace their records
+        mode = 'upsert'
+
     total = len(file_list)
     counter = 0
 
-    for recfile in sorted(file_list):
-        counter += 1
-        LOGGER.info('Processing file %s (%d of %d)', recfile, counter, total)
-        # read document
-        try:
-            exml = etree.parse(recfile, context.parser)
-        except etree.XMLSyntaxError as err:
-            LOGGER.error('XML document "%s" is not well-formed', recfile, exc_info=True)
-            continue
-        except Exception as err:
-            LOGGER.exception('XML document "%s" is not well-formed', recfile)
-            continue
+    pending = []
+    file_identifiers = {}
+    failed_identifiers = {}
 
-        try:
-            record = metadata.parse_record(context, exml, repo)
-        except Exception as err:
-            LOGGER.exception('Could not parse "%s" as an XML record', recfile)
-            continue
+    def flush():
+        """insert pending records and account for their outcomes"""
 
-        for rec in record:
-            LOGGER.info('Inserting %s %s into database %s, table %s ....',
-                        rec.typename, rec.identifier, database, table)
+        # TODO: do this as CSW Harvest
+        outcomes = repo.insert_many([rec for recfile, rec in pending], mode,
+                                    batch_size)
 
-            # TODO: do this as CSW Harvest
-            try:
-                repo.insert(rec, 'local', util.get_today_and_now())
-                loaded_files.add(recfile)
-                LOGGER.info('Inserted %s', recfile)
-            except Exception as err:
-                if force_update:
-                    LOGGER.info('Record exists. Updating.')
-                    repo.update(rec)
-                    LOGGER.info('Updated %s', recfile)
-                    loaded_files.add(recfile)
+        for (recfile, rec), outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                if isinstance(outcome, DBAPIError) and outcome.args:
+                    # Pull a decent database error message and not the full SQL that was run
+                    # since INSERT SQL statements are rather large.
+                    LOGGER.error('ERROR: %s not inserted: %s', recfile, outcome.args[0])
                 else:
-                    if isinstance(err, DBAPIError) and err.args:
-                        # Pull a decent database error message and not the full SQL that was run
-                        # since INSERT SQL statements are rather large.
-                        LOGGER.error('ERROR: %s not inserted: %s', recfile, err.args[0], exc_info=True)
-                    else:
-                        LOGGER.error('ERROR: %s not inserted: %s', recfile, err, exc_info=True)
+                    LOGGER.error('ERROR: %s not inserted: %s', recfile, outcome)
+                failed_identifiers.setdefault(recfile, []).append(
+                    rec['identifier'])
+            else:
+                LOGGER.info('%s %s', outcome.capitalize(), recfile)
+                loaded_files.add(recfile)
+                file_identifiers.setdefault(recfile, []).append(
+                    rec['identifier'])
+
+        del pending[:]
+
+    pool = None
+    if jobs > 1 and total > 1:
+        LOGGER.info('Parsing files with %d worker processes', jobs)
+        # spawn workers so that they do not inherit database connections
+        pool = multiprocessing.get_context('spawn').Pool(
+            jobs, _load_worker_init, (database, table, context))
+        parsed = pool.imap(_load_worker_parse, sorted(file_list),
+                           chunksize=max(1, min(64, total // (jobs * 4))))
+    else:
+        parsed = ((recfile,) + _parse_record_file(context, repo, recfile)
+                  for recfile in sorted(file_list))
+
+    try:
+        for recfile, records, error in parsed:
+            counter += 1
+            LOGGER.info('Processing file %s (%d of %d)', recfile, counter, total)
+
+            if error is not None:
+                LOGGER.error(error)
+                continue
+
+            for rec in records:
+                LOGGER.info('Inserting %s %s into database %s, table %s ....',
+                            rec['typename'], rec['identifier'], database, table)
+                pending.append((recfile, rec))
+
+            if len(pending) >= batch_size:
+                flush()
+
+        flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    if entries is not None:
+        stale = set()
+        for recfile in loaded_files:
+            key = os.path.abspath(recfile)
+            if key in entries:
+                stale.update(entries[key]['identifiers'])
+            # records which failed to load keep their previous version,
+            # if any, which still belongs to the file
+            entries[key] = dict(changed[recfile], identifiers=sorted(
+                set(file_identifiers.get(recfile, [])) |
+                set(failed_identifiers.get(recfile, []))))
+
+        if delete_missing:
+            for key in set(entries) - scanned:
+                LOGGER.info('File %s no longer exists', key)
+                stale.update(entries.pop(key)['identifiers'])
+
+        # records may have moved to another file
+        for entry in entries.values():
+            stale.difference_update(entry['identifiers'])
+
+        if stale:
+            LOGGER.info('Deleting %d records no longer in any file', len(stale))
+            _delete_identifiers(repo, stale)
+
+        _write_manifest(manifest, entries)
 
     return tuple(loaded_files)
 
@@ -449,7 +767,6 @@ def export_records(context, database, table, xml_dirpath):
 
 def refresh_harvested_records(context, database, table, url):
     """refresh / harvest all non-local records in repository"""
-    from owslib.csw import CatalogueServiceWeb
 
     # get configuration and init repo connection
     repos = repository.Repository(database, context, table=table)
@@ -459,7 +776,8 @@ def refresh_harvested_records(context, database, table, url):
 
     if int(count) > 0:
         LOGGER.info('Refreshing %s harvested records', count)
-        csw = CatalogueServiceWeb(url)
+        # Harvest requests are sent on a single keep-alive connection
+        client = httpclient.get_client()
 
         for rec in records:
             source = \
@@ -478,14 +796,41 @@ def refresh_harvested_records(context, database, table, url):
             if schema == 'http://www.isotc211.org/2005/gmd':
                 schema = 'http://www.isotc211.org/schemas/2005/gmd/'
             try:
-                csw.harvest(source, schema)
-                LOGGER.info(csw.response)
+                response = client.request(
+                    'POST', url, data=harvest_request(context, source, schema),
+                    headers={'Content-Type': 'application/xml'},
+                    raise_for_status=False)
+                # exception reports come with HTTP error statuses or not
+                if (b'ExceptionReport' in response.content or
+                        response.status_code >= 400):
+                    raise RuntimeError('HTTP %d: %s' % (
+                        response.status_code,
+                        response.content.decode('utf-8', 'replace')))
+                LOGGER.info(response.content)
             except Exception as err:
                 LOGGER.exception('Could not harvest')
+
+        LOGGER.info('HTTP statistics: %s', client.stats())
     else:
         LOGGER.info('No harvested records')
 
 
+def harvest_request(context, source, resourcetype):
+    """generate a CSW Harvest request of a resource"""
+
+    node = etree.Element(
+        util.nspath_eval('csw:Harvest', context.namespaces),
+        nsmap={'csw': context.namespaces['csw']})
+    node.set('service', 'CSW')
+    node.set('version', '2.0.2')
+    etree.SubElement(node, util.nspath_eval(
+        'csw:Source', context.namespaces)).text = source
+    etree.SubElement(node, util.nspath_eval(
+        'csw:ResourceType', context.namespaces)).text = resourcetype
+
+    return etree.tostring(node, xml_declaration=True, encoding='UTF-8')
+
+
 def rebuild_db_indexes(context, database, table):
     """Rebuild database indexes"""
 
@@ -513,6 +858,10 @@ def optimize_db(context, database, table):
         # SQLite
         connection.autocommit = True
         connection.execute('VACUUM')
+        if repos.spatial_index is not None:
+            rebuild_sqlite_spatial_index(connection, table)
+        if repos.fts_index is not None:
+            rebuild_sqlite_fts_index(connection, table)
         connection.execute('ANALYZE')
     finally:
         connection.close()
@@ -537,7 +886,8 @@ def gen_sitemap(context, database, table, url, output_file):
         context.namespaces['sitemap']
 
     # get all records
-    count, records = repos.query(constraint={}, maxrecords=99999999)
+    count, records = repos.query(constraint={}, maxrecords=99999999,
+                                 columns=[])
 
     LOGGER.info('Found %s records', count)
 
@@ -560,15 +910,26 @@ def gen_sitemap(context, database, table, url, output_file):
                     encoding='utf8', xml_declaration=1))
 
 
+def prerender_documents(config):
+    """pre-render the OARec documents which only depend on configuration"""
+
+    from pycsw.ogc.api.records import API
+
+    api = API(config)
+
+    LOGGER.info('Pre-rendering documents to %s',
+                config.get('server', 'documents_cache'))
+    return api.write_documents()
+
+
 def post_xml(url, xml, timeout=30):
     """Execute HTTP XML POST request and print response"""
 
     LOGGER.info('Executing HTTP POST request %s on server %s', xml, url)
 
-    from owslib.util import http_post
     try:
         with open(xml) as f:
-            return http_post(url=url, request=f.read(), timeout=timeout)
+            return util.http_request('POST', url, f.read(), timeout=timeout)
     except Exception as err:
         LOGGER.exception('HTTP XML POST error')
         raise RuntimeError(err) from err
@@ -688,14 +1049,17 @@ def cli():
 @cli_callbacks
 @click.pass_context
 @CLI_OPTION_CONFIG
-def cli_setup_db(ctx, config, verbosity):
+@click.option('--fts/--no-fts', 'fts', default=True,
+              help='Create a full-text index (SQLite)')
+def cli_setup_db(ctx, config, verbosity, fts):
     """Create repository tables and indexes"""
     cfg = parse_ini_config(config)
     try:
         setup_db(
             cfg['repository']['database'],
             cfg['repository']['table'],
-            cfg['server']['home']
+            cfg['server']['home'],
+            create_fts_index=fts
         )
     except Exception as err:
         msg = f'ERROR: Database tables already exist: {err}'
@@ -711,9 +1075,24 @@ def cli_setup_db(ctx, config, verbosity):
               type=click.Path(exists=True, resolve_path=True, file_okay=True))
 @click.option('--recursive', '-r', is_flag=True,
               default=False, help='Bypass confirmation')
+@click.option('--batch-size', '-b', 'batch_size', type=click.IntRange(min=1),
+              default=repository.INSERT_BATCH_SIZE,
+              help='Number of records inserted per database statement')
+@click.option('--jobs', '-j', 'jobs', type=click.IntRange(min=1), default=1,
+              help='Number of processes parsing records in parallel')
+@click.option('--manifest', '-m', 'manifest',
+              type=click.Path(dir_okay=False, resolve_path=True),
+              help='Manifest file to load only new and changed files')
+@click.option('--delete-missing', '-d', 'delete_missing', is_flag=True,
+              default=False,
+              help='Delete records of files missing from the manifest path')
 @CLI_OPTION_YES
-def cli_load_records(ctx, config, path, recursive, yes, verbosity):
+def cli_load_records(ctx, config, path, recursive, batch_size, jobs, manifest,
+                     delete_missing, yes, verbosity):
     """Load metadata records from directory or file into repository"""
+    if delete_missing and manifest is None:
+        raise click.UsageError('--delete-missing requires --manifest')
+
     cfg = parse_ini_config(config)
     context = pconfig.StaticContext()
 
@@ -723,7 +1102,11 @@ def cli_load_records(ctx, config, path, recursive, yes, verbosity):
         cfg['repository']['table'],
         path,
         recursive,
-        yes
+        yes,
+        batch_size,
+        jobs,
+        manifest,
+        delete_missing
     )
 
 
@@ -807,6 +1190,7 @@ def cli_refresh_harvested_records(ctx, config, verbosity, url):
     """Refresh / harvest non-local records in repository"""
     cfg = parse_ini_config(config)
     context = pconfig.StaticContext()
+    httpclient.configure(httpclient.get_client_options(cfg))
 
     refresh_harvested_records(
         context,
@@ -837,6 +1221,21 @@ def cli_gen_sitemap(ctx, config, output, verbosity):
         output
     )
 
+@click.command('prerender-documents')
+@cli_callbacks
+@click.pass_context
+@CLI_OPTION_CONFIG
+def cli_prerender_documents(ctx, config, verbosity):
+    """Pre-render OARec landing page, OpenAPI and conformance documents"""
+    cfg = parse_ini_config(config)
+
+    if not cfg.has_option('server', 'documents_cache'):
+        raise click.ClickException('server.documents_cache is not set')
+
+    for filepath in prerender_documents(cfg):
+        click.echo(filepath)
+
+
 @click.command('post-xml')
 @cli_callbacks
 @click.pass_context
@@ -886,6 +1285,7 @@ cli.add_command(cli_rebuild_db_indexes)
 cli.add_command(cli_optimize_db)
 cli.add_command(cli_refresh_harvested_records)
 cli.add_command(cli_gen_sitemap)
+cli.add_command(cli_prerender_documents)
 cli.add_command(cli_post_xml)
 cli.add_command(cli_get_sysprof)
 cli.add_command(cli_validate_xml)
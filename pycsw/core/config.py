@@ -29,11 +29,40 @@
 # =================================================================
 
 import logging
+from types import MappingProxyType
+
 from pycsw.core.etree import PARSER
 from pycsw import __version__
 
 LOGGER = logging.getLogger(__name__)
 
+# namespaces shared by all requests; every StaticContext holds its own
+# mutable copy, which request handlers (OpenSearch, OAI-PMH, SRU) extend
+NAMESPACES = MappingProxyType({
+    'atom': 'http://www.w3.org/2005/Atom',
+    'csw': 'http://www.opengis.net/cat/csw/2.0.2',
+    'csw30': 'http://www.opengis.net/cat/csw/3.0',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dct': 'http://purl.org/dc/terms/',
+    'dif': 'http://gcmd.gsfc.nasa.gov/Aboutus/xml/dif/',
+    'fes20': 'http://www.opengis.net/fes/2.0',
+    'fgdc': 'http://www.opengis.net/cat/csw/csdgm',
+    'gm03': 'http://www.interlis.ch/INTERLIS2.3',
+    'gmd': 'http://www.isotc211.org/2005/gmd',
+    'gml': 'http://www.opengis.net/gml',
+    'ogc': 'http://www.opengis.net/ogc',
+    'os': 'http://a9.com/-/spec/opensearch/1.1/',
+    'ows': 'http://www.opengis.net/ows',
+    'ows11': 'http://www.opengis.net/ows/1.1',
+    'ows20': 'http://www.opengis.net/ows/2.0',
+    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'sitemap': 'http://www.sitemaps.org/schemas/sitemap/0.9',
+    'soapenv': 'http://www.w3.org/2003/05/soap-envelope',
+    'xlink': 'http://www.w3.org/1999/xlink',
+    'xs': 'http://www.w3.org/2001/XMLSchema',
+    'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
+})
+
 
 class StaticContext(object):
     """core configuration"""
@@ -68,30 +97,11 @@ class StaticContext(object):
             'NoApplicableCode': '400 Internal Server Error'
         }
 
-        self.namespaces = {
-            'atom': 'http://www.w3.org/2005/Atom',
-            'csw': 'http://www.opengis.net/cat/csw/2.0.2',
-            'csw30': 'http://www.opengis.net/cat/csw/3.0',
-            'dc': 'http://purl.org/dc/elements/1.1/',
-            'dct': 'http://purl.org/dc/terms/',
-            'dif': 'http://gcmd.gsfc.nasa.gov/Aboutus/xml/dif/',
-            'fes20': 'http://www.opengis.net/fes/2.0',
-            'fgdc': 'http://www.opengis.net/cat/csw/csdgm',
-            'gm03': 'http://www.interlis.ch/INTERLIS2.3',
-            'gmd': 'http://www.isotc211.org/2005/gmd',
-            'gml': 'http://www.opengis.net/gml',
-            'ogc': 'http://www.opengis.net/ogc',
-            'os': 'http://a9.com/-/spec/opensearch/1.1/',
-            'ows': 'http://www.opengis.net/ows',
-            'ows11': 'http://www.opengis.net/ows/1.1',
-            'ows20': 'http://www.opengis.net/ows/2.0',
-            'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-            'sitemap': 'http://www.sitemaps.org/schemas/sitemap/0.9',
-            'soapenv': 'http://www.w3.org/2003/05/soap-envelope',
-            'xlink': 'http://www.w3.org/1999/xlink',
-            'xs': 'http://www.w3.org/2001/XMLSchema',
-            'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-        }
+        self.namespaces = dict(NAMESPACES)
+
+        # stored records of the request to splice into the response as is,
+        # if enabled (see pycsw.core.util.load_record_xml)
+        self.raw_records = None
 
         self.keep_ns_prefixes = [
             'csw', 'dc', 'dct', 'gmd', 'gml', 'ows', 'xs'
@@ -561,6 +571,20 @@ class StaticContext(object):
         }
         self.set_model(prefix)
 
+    def __getstate__(self):
+        """state to pickle (e.g. for worker processes), without the XML
+        parser, which cannot be pickled"""
+
+        state = self.__dict__.copy()
+        del state['parser']
+        return state
+
+    def __setstate__(self, state):
+        """restore pickled state, with the default XML parser"""
+
+        self.__dict__.update(state)
+        self.parser = PARSER
+
     def set_model(self, prefix):
         """sets model given request context"""
 
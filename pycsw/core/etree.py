@@ -38,6 +38,72 @@ against known XML attacks.
 
 """
 
+import logging
+import os
+import threading
+
 from lxml import etree
 
+LOGGER = logging.getLogger(__name__)
+
 PARSER = etree.XMLParser(resolve_entities=False)
+
+VALIDATION_MODES = ['full', 'cached', 'off']
+
+# compiled XML Schemas, shared by all threads
+_SCHEMAS = {}
+_SCHEMAS_LOCK = threading.Lock()
+
+# validating parsers, one set per thread
+_PARSERS = threading.local()
+
+
+def get_schema(path, cached=True):
+    """Return a compiled XML Schema
+
+    Compiled schemas are memoized process-wide by (absolute) path, unless
+    ``cached`` is ``False``
+
+    """
+
+    path = os.path.abspath(path)
+
+    if not cached:
+        return etree.XMLSchema(file=path)
+
+    with _SCHEMAS_LOCK:
+        if path not in _SCHEMAS:
+            LOGGER.debug('Compiling XML Schema %s', path)
+            _SCHEMAS[path] = etree.XMLSchema(file=path)
+        return _SCHEMAS[path]
+
+
+def get_validating_parser(path, cached=True):
+    """Return a parser validating against the XML Schema at ``path``
+
+    Parsers are not shared between threads, so they are memoized per
+    thread, unless ``cached`` is ``False``
+
+    """
+
+    if not cached:
+        return etree.XMLParser(schema=get_schema(path, False),
+                               resolve_entities=False)
+
+    path = os.path.abspath(path)
+    parsers = _PARSERS.__dict__.setdefault('parsers', {})
+
+    if path not in parsers:
+        parsers[path] = etree.XMLParser(schema=get_schema(path),
+                                        resolve_entities=False)
+    return parsers[path]
+
+
+def warm_schemas(paths):
+    """Compile and memoize XML Schemas ahead of the first request"""
+
+    for path in paths:
+        try:
+            get_schema(path)
+        except Exception as err:
+            LOGGER.warning('Could not compile XML Schema %s: %s', path, err)
@@ -30,10 +30,15 @@
 #
 # =================================================================
 
+from collections import OrderedDict
 import json
 
+from lxml import etree
 import xmltodict
 
+# member of the dictionary of the element records are streamed into
+RECORDS_KEY = '#pycsw:records'
+
 
 def xml2dict(xml_string, namespaces):
     """Convert an xml document to a dictionary.
@@ -67,3 +72,222 @@ def xml2json(xml_string, namespaces, pretty_print=False):
                           indent=4, separators=separators)
 
     return json.dumps(xml2dict(xml_string, namespaces), separators=separators)
+
+
+def element2dict(element, namespaces, records_parent=None):
+    """Convert an lxml element to a dictionary, without serializing it.
+
+    The dictionary is the one ``xml2dict`` returns for the serialization
+    of ``element``: names are prefixed per ``namespaces``, attributes and
+    namespace declarations are keyed with ``@``, text is stripped and
+    repeated elements are grouped in lists.
+
+    Parameters
+    ----------
+    element: lxml.etree._Element
+        XML element to convert to a dictionary.
+    namespaces: dict
+        Namespaces used in ``element``
+    records_parent: lxml.etree._Element, optional
+        Descendant of ``element`` whose dictionary gets a last
+        ``RECORDS_KEY`` member, to be replaced with streamed records (see
+        ``iter_json``)
+
+    Returns
+    -------
+    dict
+        A dictionary with the contents of the xml data
+
+    """
+
+    namespaces_reverse = dict((v, k) for k, v in namespaces.items())
+    names = {}
+
+    def build_name(qname):
+        try:
+            return names[qname]
+        except KeyError:
+            pass
+        name = qname
+        if qname.startswith('{'):
+            namespace, local_name = qname[1:].split('}', 1)
+            prefix = namespaces_reverse.get(namespace, namespace)
+            name = '%s:%s' % (prefix, local_name) if prefix else local_name
+        names[qname] = name
+        return name
+
+    def push(item, key, value):
+        if key not in item:
+            item[key] = value
+        elif isinstance(item[key], list):
+            item[key].append(value)
+        else:
+            item[key] = [item[key], value]
+
+    root = {}
+    stack = [root]
+    declarations = {}
+
+    for event, node in etree.iterwalk(element,
+                                      events=('start-ns', 'start', 'end')):
+        if event == 'start-ns':
+            declarations[node[0] or ''] = node[1]
+        elif event == 'start':
+            item = dict(('@%s' % build_name(key), value)
+                        for key, value in node.attrib.items())
+            if declarations:
+                item['@xmlns'] = declarations
+                declarations = {}
+            stack.append(item)
+        else:
+            item = stack.pop()
+
+            # text includes the tails of children, comments included
+            data = node.text or ''
+            for child in node:
+                if child.tail:
+                    data += child.tail
+            data = data.strip() or None
+
+            if node is records_parent:
+                item[RECORDS_KEY] = None
+            if not item:
+                value = data
+            else:
+                if data:
+                    push(item, '#text', data)
+                value = item
+
+            push(stack[-1], build_name(node.tag), value)
+
+    return root
+
+
+def element2json(element, namespaces, pretty_print=False):
+    """Convert an lxml element to JSON, as ``xml2json`` converts its
+    serialization"""
+
+    separators = (',', ': ')
+
+    if pretty_print:
+        return json.dumps(element2dict(element, namespaces),
+                          indent=4, separators=separators)
+
+    return json.dumps(element2dict(element, namespaces),
+                      separators=separators)
+
+
+def iter_json(element, namespaces, records_parent, records,
+              pretty_print=False):
+    """Convert an lxml element to JSON, chunk by chunk, with records
+    streamed into one of its descendants.
+
+    The JSON is the one of ``element`` with ``records`` as the last
+    children of ``records_parent``.  Records with the same name are
+    grouped in lists: records named as the first one are written as they
+    come, records with other names are held until all records are read.
+    Namespace declarations of records already in scope of
+    ``records_parent`` are left out.
+
+    Parameters
+    ----------
+    element: lxml.etree._Element
+        XML element to convert to JSON.
+    namespaces: dict
+        Namespaces used in ``element`` and ``records``
+    records_parent: lxml.etree._Element
+        Descendant of ``element`` the records belong to
+    records: iterable
+        lxml.etree._Element records
+    pretty_print: bool
+        Whether to indent the JSON
+
+    Returns
+    -------
+    generator
+        The chunks (str) of the JSON representation
+
+    """
+
+    separators = (',', ': ')
+    indent = 4 if pretty_print else None
+
+    head, tail = json.dumps(
+        element2dict(element, namespaces, records_parent), indent=indent,
+        separators=separators).split('%s: null' % json.dumps(RECORDS_KEY), 1)
+
+    # indentation of the members of records_parent
+    newline = '\n%s' % head.rsplit('\n', 1)[-1] if pretty_print else ''
+
+    def dumps(value, level=0):
+        # JSON of a member value, indented at its position
+        value = json.dumps(value, indent=indent, separators=separators)
+        return value.replace('\n', newline + ' ' * 4 * level)
+
+    written = False
+
+    def member(name):
+        # start of a member of records_parent
+        nonlocal written
+        separator = ',%s' % newline if written else head
+        written = True
+        return '%s%s: ' % (separator, json.dumps(name))
+
+    item_separator = ',%s    ' % newline if pretty_print else ','
+    list_start = '[%s    ' % newline if pretty_print else '['
+
+    # namespaces declared by ancestors, not redeclared by records
+    scope = dict((prefix or '', uri)
+                 for prefix, uri in records_parent.nsmap.items())
+
+    def convert(record):
+        (name, value), = element2dict(record, namespaces).items()
+        if isinstance(value, dict) and '@xmlns' in value:
+            declarations = dict(
+                (prefix, uri) for prefix, uri in value['@xmlns'].items()
+                if scope.get(prefix) != uri)
+            if declarations:
+                value['@xmlns'] = declarations
+            else:
+                del value['@xmlns']
+                if not value:
+                    value = None
+                elif list(value) == ['#text']:
+                    value = value['#text']
+        return name, value
+
+    # records named as the first one are written as they come, the others
+    # are kept until the end, so that each name is a single member
+    first = None  # name of the first record
+    pending = None  # value of the first record, not written yet
+    listed = False  # whether the list of the first records is written
+    others = OrderedDict()  # values of the other records, by name
+    for record in records:
+        name, value = convert(record)
+
+        if first is None:
+            first, pending = name, value
+        elif name != first:
+            others.setdefault(name, []).append(value)
+        elif not listed:
+            yield '%s%s%s%s' % (member(name), list_start,
+                                dumps(pending, 1),
+                                item_separator + dumps(value, 1))
+            listed, pending = True, None
+        else:
+            yield item_separator + dumps(value, 1)
+
+    if listed:
+        yield '%s]' % newline
+    elif first is not None:
+        yield member(first) + dumps(pending)
+
+    for name, values in others.items():
+        yield member(name) + dumps(values[0] if len(values) == 1 else values)
+
+    if not written:
+        # no records: drop the member separator before the placeholder
+        head = head.rstrip()
+        yield head[:-1] if head.endswith(',') else head
+
+    yield tail
@@ -0,0 +1,250 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Outbound HTTP client
+
+Requests to remote resources (harvesting, distributed searching) share a
+process wide pool of keep-alive connections per host.  Responses are
+streamed, with a limit on their size, transient failures are retried with
+exponential backoff, and bytes and latency are counted per host.
+"""
+
+from collections import namedtuple
+from http.cookiejar import DefaultCookiePolicy
+import logging
+import threading
+from time import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+LOGGER = logging.getLogger(__name__)
+
+USER_AGENT = 'pycsw (https://pycsw.org/)'
+
+# Seconds to connect to a host, and to wait for each read of a response
+CONNECT_TIMEOUT = 10
+TIMEOUT = 30
+
+# Number of times a request is retried on connection errors and transient
+# HTTP statuses, and seconds before the first retry (doubled for each
+# next one)
+RETRIES = 2
+BACKOFF = 0.5
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Number of hosts kept in the pool, and of connections kept per host
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+# Maximum size of a (decoded) response in bytes, 0 for no limit
+MAX_SIZE = 100 * 1024 * 1024
+
+# Bytes read from a response at a time
+CHUNK_SIZE = 64 * 1024
+
+# Client options, and their types, set as http_<option> in [server]
+OPTIONS = {
+    'connect_timeout': float,
+    'timeout': float,
+    'retries': int,
+    'backoff': float,
+    'pool_connections': int,
+    'pool_maxsize': int,
+    'max_size': int
+}
+
+HttpResponse = namedtuple('HttpResponse',
+                          ['url', 'status_code', 'headers', 'content'])
+
+# options of the client returned by get_client() by default
+_OPTIONS = {}
+_OPTIONS_LOCK = threading.Lock()
+
+
+def get_client_options(config):
+    """ Return the HTTP client options set in a configuration """
+
+    options = {}
+    for option, type_ in OPTIONS.items():
+        if config.has_option('server', 'http_%s' % option):
+            options[option] = type_(config.get('server', 'http_%s' % option))
+    return options
+
+
+def configure(options):
+    """ Set the options of the client returned by get_client() """
+
+    global _OPTIONS
+
+    with _OPTIONS_LOCK:
+        _OPTIONS = dict(options)
+
+
+def get_client(**options):
+    """ Return the shared client of the options (default: as configured) """
+
+    if not options:
+        options = _OPTIONS
+    return HttpClient.create(**options)
+
+
+class HttpClient(object):
+    """Pooled keep-alive HTTP client, safe to share between threads"""
+
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    @classmethod
+    def create(clazz, **options):
+        """
+        Clients are memoized by options, so that all requests of a process
+        share a single connection pool
+        """
+
+        key = tuple(sorted(options.items()))
+
+        with clazz._clients_lock:
+            if key not in clazz._clients:
+                LOGGER.debug('creating new HTTP client: %s', options)
+                clazz._clients[key] = clazz(**options)
+            return clazz._clients[key]
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, timeout=TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF,
+                 pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 max_size=MAX_SIZE):
+        self.timeout = (float(connect_timeout), float(timeout))
+        self.max_size = int(max_size)
+
+        # POST requests are only retried when they could not be sent
+        retry = Retry(total=int(retries), backoff_factor=float(backoff),
+                      status_forcelist=RETRY_STATUSES, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=int(pool_connections),
+                              pool_maxsize=int(pool_maxsize),
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        # cookies of a remote server must not leak across requests
+        self.session.cookies.set_policy(DefaultCookiePolicy(
+            allowed_domains=[]))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                max_size=None, raise_for_status=True):
+        """
+        perform an HTTP request
+
+        Responses are gzip or deflate encoded if the server supports it,
+        and decoded as they are read
+
+        :param method: HTTP method
+        :param url: URL
+        :param data: request body (optional)
+        :param headers: `dict` of request headers (optional)
+        :param timeout: seconds to connect and to wait for each read, or
+                        `tuple` of both (default is the client timeouts)
+        :param max_size: maximum size of the response in bytes, 0 for no
+                         limit (default is the client maximum size)
+        :param raise_for_status: whether to raise `requests.HTTPError` on
+                                 HTTP error statuses
+
+        :returns: `HttpResponse`
+        """
+
+        if timeout is None:
+            timeout = self.timeout
+        if max_size is None:
+            max_size = self.max_size
+
+        host = urlparse(url).netloc
+        start_time = time()
+        size = 0
+
+        try:
+            with self.session.request(method, url, data=data,
+                                      headers=headers, timeout=timeout,
+                                      stream=True) as response:
+                length = response.headers.get('Content-Length', '')
+                if max_size and length.isdigit() and int(length) > max_size:
+                    raise RuntimeError('Response of %s exceeds %d bytes' %
+                                       (url, max_size))
+
+                chunks = []
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        raise RuntimeError('Response of %s exceeds %d bytes' %
+                                           (url, max_size))
+                    chunks.append(chunk)
+        except Exception:
+            self._count(host, size, time() - start_time, error=True)
+            raise
+
+        elapsed = time() - start_time
+        self._count(host, size, elapsed,
+                    error=response.status_code >= 400)
+        LOGGER.debug('%s %s: HTTP %d, %d bytes in %d ms', method, url,
+                     response.status_code, size, elapsed * 1000)
+
+        if raise_for_status and response.status_code >= 400:
+            raise requests.HTTPError('HTTP %d %s for url: %s' % (
+                response.status_code, response.reason, url),
+                response=response)
+
+        return HttpResponse(response.url, response.status_code,
+                            response.headers, b''.join(chunks))
+
+    def stats(self):
+        """
+        counters of the requests of the client
+
+        :returns: `dict` of counters (requests, errors, bytes and seconds
+                  elapsed) by host
+        """
+
+        with self._stats_lock:
+            return {host: dict(counters)
+                    for host, counters in self._stats.items()}
+
+    def _count(self, host, size, elapsed, error=False):
+        """count a request to a host"""
+
+        with self._stats_lock:
+            counters = self._stats.setdefault(host, {
+                'requests': 0, 'errors': 0, 'bytes': 0, 'elapsed': 0.0})
+            counters['requests'] += 1
+            counters['errors'] += int(error)
+            counters['bytes'] += size
+            counters['elapsed'] += elapsed
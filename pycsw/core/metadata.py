@@ -31,8 +31,13 @@
 #
 # =================================================================
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from itertools import islice
 import json
 import logging
+import time
 import uuid
 from urllib.parse import urlparse
 
@@ -47,10 +52,34 @@ from pycsw.core import util
 
 LOGGER = logging.getLogger(__name__)
 
+# Number of documents (WAF) or pages (CSW) fetched at the same time when
+# harvesting
+HARVEST_WORKERS = 4
+
+# Number of times a failed fetch is retried when harvesting, and seconds
+# before the first retry (doubled for each next one)
+HARVEST_RETRIES = 2
+HARVEST_BACKOFF = 1.0
+
+# Number of harvested records written to the repository at a time
+HARVEST_BATCH_SIZE = 100
+
 def parse_record(context, record, repos=None,
     mtype='http://www.opengis.net/cat/csw/2.0.2',
-    identifier=None, pagesize=10):
-    ''' parse metadata '''
+    identifier=None, pagesize=10, workers=HARVEST_WORKERS,
+    retries=HARVEST_RETRIES, backoff=HARVEST_BACKOFF):
+    ''' parse metadata
+
+    CSW and WAF resources are harvested lazily: the records are returned
+    as an iterator, fetched concurrently by ``workers`` threads as it is
+    consumed, and failed fetches are retried ``retries`` times after
+    ``backoff`` seconds, doubled for each retry '''
+
+    harvest_options = {
+        'workers': workers,
+        'retries': retries,
+        'backoff': backoff
+    }
 
     if identifier is None:
         identifier = uuid.uuid4().urn
@@ -61,7 +90,8 @@ def parse_record(context, record, repos=None,
         LOGGER.info('CSW service detected, fetching via HTTP')
         # CSW service, not csw:Record
         try:
-            return _parse_csw(context, repos, record, identifier, pagesize)
+            return _parse_csw(context, repos, record, identifier, pagesize,
+                              **harvest_options)
         except Exception as err:
             # TODO: implement better exception handling
             if str(err).find('ExceptionReport') != -1:
@@ -77,7 +107,8 @@ def parse_record(context, record, repos=None,
 
     elif mtype == 'urn:geoss:waf':  # WAF
         LOGGER.info('WAF detected, fetching via HTTP')
-        return _parse_waf(context, repos, record, identifier)
+        return _parse_waf(context, repos, record, identifier,
+                          **harvest_options)
 
     elif mtype == 'http://www.opengis.net/wms':  # WMS
         LOGGER.info('WMS detected, fetching via OWSLib')
@@ -125,6 +156,13 @@ def _get(context, obj, name):
 def _set(context, obj, name, value):
     ''' convenience method to set values '''
     setattr(obj, context.md_core_model['mappings'][name], value)
+    # keep the columns derived from geometry (if any) in sync
+    if name == 'pycsw:BoundingBox':
+        if hasattr(obj, util.BBOX_COLUMNS[0]):
+            for column, bound in util.bbox_columns(value).items():
+                setattr(obj, column, bound)
+        if hasattr(obj, util.AREA_COLUMN):
+            setattr(obj, util.AREA_COLUMN, util.geometry_area(value))
 
 def _parse_metadata(context, repos, record):
     """parse metadata formats"""
@@ -162,11 +200,55 @@ def _parse_metadata(context, repos, record):
         raise RuntimeError('Unsupported metadata format')
 
 
-def _parse_csw(context, repos, record, identifier, pagesize=10):
+def _fetch_with_retries(fetch, item, retries=HARVEST_RETRIES,
+    backoff=HARVEST_BACKOFF):
+    ''' fetch an item, retrying failures with exponential backoff '''
+
+    for retry in range(retries + 1):
+        try:
+            return fetch(item)
+        except Exception as err:
+            if retry == retries:
+                raise
+            delay = backoff * 2 ** retry
+            LOGGER.warning('Fetching %s failed (%s), retrying in %s seconds',
+                           item, err, delay)
+            time.sleep(delay)
+
+def _fetch_concurrently(fetch, items, workers=HARVEST_WORKERS,
+    retries=HARVEST_RETRIES, backoff=HARVEST_BACKOFF):
+    ''' fetch items on a bounded pool of threads
+
+    Failed fetches are retried with exponential backoff.  Yields
+    ``(item, result)`` tuples in the order of ``items``, ``result`` being
+    the exception of the last attempt if all attempts failed.  At most
+    twice as many items as ``workers`` are fetched ahead of the consumer '''
+
+    def attempt(item):
+        return _fetch_with_retries(fetch, item, retries, backoff)
+
+    workers = max(int(workers), 1)
+    items = iter(items)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque((item, executor.submit(attempt, item))
+                        for item in islice(items, workers * 2))
+        while pending:
+            item, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as err:
+                result = err
+            for item_ in islice(items, 1):
+                pending.append((item_, executor.submit(attempt, item_)))
+            yield item, result
+
+def _parse_csw(context, repos, record, identifier, pagesize=10,
+    workers=HARVEST_WORKERS, retries=HARVEST_RETRIES,
+    backoff=HARVEST_BACKOFF):
 
     from owslib.csw import CatalogueServiceWeb
 
-    recobjs = []  # records
     serviceobj = repos.dataset()
 
     # if init raises error, this might not be a CSW
@@ -214,8 +296,6 @@ def _parse_csw(context, repos, record, identifier, pagesize=10):
     _set(context, serviceobj, 'pycsw:XML', caps2iso(serviceobj, md, context))
     _set(context, serviceobj, 'pycsw:MetadataType', 'application/xml')
 
-    recobjs.append(serviceobj)
-
     # get all supported typenames of metadata
     # so we can harvest the entire CSW
 
@@ -246,31 +326,64 @@ def _parse_csw(context, repos, record, identifier, pagesize=10):
 
     LOGGER.info('Harvesting %d CSW records', matches)
 
-    # loop over all catalogue records incrementally
-    for r in range(1, matches+1, pagesize):
+    def fetch_page(startposition):
+        # each page is requested by its own copy of the client
+        page = copy.copy(md)
         try:
-            md.getrecords2(typenames=csw_typenames, startposition=r,
-                           maxrecords=pagesize, outputschema=csw_outputschema, esn='full')
-        except Exception as err:  # this is a CSW, but server rejects query
-            raise RuntimeError(md.response)
-        for k, v in md.records.items():
+            page.getrecords2(typenames=csw_typenames,
+                             startposition=startposition,
+                             maxrecords=pagesize,
+                             outputschema=csw_outputschema, esn='full')
+        except Exception:
+            if page.response is md.response:  # no response
+                raise
+            # this is a CSW, but server rejects query
+            raise RuntimeError(page.response)
+        return page
+
+    def parse_page(page):
+        for k, v in page.records.items():
             # try to parse metadata
             try:
                 LOGGER.info('Parsing metadata record: %s', v.xml)
                 if csw_typenames == 'gmd:MD_Metadata':
-                    recobjs.append(_parse_iso(context, repos,
-                                              etree.fromstring(v.xml, context.parser)))
+                    yield _parse_iso(context, repos,
+                                     etree.fromstring(v.xml, context.parser))
                 else:
-                    recobjs.append(_parse_dc(context, repos,
-                                             etree.fromstring(v.xml, context.parser)))
+                    yield _parse_dc(context, repos,
+                                    etree.fromstring(v.xml, context.parser))
             except Exception as err:  # parsing failed for some reason
                 LOGGER.exception('Metadata parsing failed')
 
-    return recobjs
+    def harvest():
+        yield serviceobj
 
-def _parse_waf(context, repos, record, identifier):
+        if matches == 0:
+            return
 
-    recobjs = []
+        page = _fetch_with_retries(fetch_page, 1, retries, backoff)
+        yield from parse_page(page)
+
+        # servers may return less records than requested per page
+        size = pagesize
+        if 0 < page.results['returned'] < pagesize:
+            LOGGER.info('CSW returned %d records per page',
+                        page.results['returned'])
+            size = page.results['returned']
+
+        # loop over all catalogue records incrementally
+        for _, page in _fetch_concurrently(
+                fetch_page, range(1 + size, matches + 1, size), workers,
+                retries, backoff):
+            if isinstance(page, Exception):
+                raise page
+            yield from parse_page(page)
+
+    return harvest()
+
+def _parse_waf(context, repos, record, identifier,
+    workers=HARVEST_WORKERS, retries=HARVEST_RETRIES,
+    backoff=HARVEST_BACKOFF):
 
     content = util.http_request('GET', record)
 
@@ -307,16 +420,21 @@ def _parse_waf(context, repos, record, identifier):
         links.append(link)
 
     LOGGER.debug('%d links found', len(links))
-    for link in links:
-        LOGGER.info('Processing link %s', link)
-        # fetch and parse
-        linkcontent = util.http_request('GET', link)
-        recobj = _parse_metadata(context, repos, linkcontent)[0]
-        recobj.source = link
-        recobj.mdsource = link
-        recobjs.append(recobj)
 
-    return recobjs
+    def harvest():
+        for link, linkcontent in _fetch_concurrently(
+                lambda link: util.http_request('GET', link), links, workers,
+                retries, backoff):
+            LOGGER.info('Processing link %s', link)
+            if isinstance(linkcontent, Exception):
+                raise linkcontent
+            # parse
+            recobj = _parse_metadata(context, repos, linkcontent)[0]
+            recobj.source = link
+            recobj.mdsource = link
+            yield recobj
+
+    return harvest()
 
 def _parse_wms(context, repos, record, identifier):
 
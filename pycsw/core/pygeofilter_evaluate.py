@@ -27,19 +27,45 @@
 #
 # =================================================================
 
-from sqlalchemy import text
+from sqlalchemy import and_, bindparam, not_, text
 
 from pygeofilter import ast
 from pygeofilter.backends.evaluator import handle
 from pygeofilter.backends.sqlalchemy.evaluate import SQLAlchemyFilterEvaluator
 
-from pycsw.core.util import bbox2wktpolygon
+from pycsw.core.util import (bbox2wktpolygon, bbox_columns_filter,
+                              fts_index_filter, fts_index_query,
+                              spatial_index_filter)
 
 
 class PycswFilterEvaluator(SQLAlchemyFilterEvaluator):
-    def __init__(self, field_mapping=None, dbtype='sqlite'):
+    def __init__(self, field_mapping=None, dbtype='sqlite', spatial_index=None,
+                 fts_index=None, bbox_columns=False):
         super().__init__(field_mapping)
         self._pycsw_dbtype = dbtype
+        self._pycsw_spatial_index = spatial_index
+        self._pycsw_fts_index = fts_index
+        self._pycsw_bbox_columns = bbox_columns
+        self._pycsw_fts_params = 0
+
+    @handle(ast.Like)
+    def like(self, node, lhs):
+        fts_query = None
+        if getattr(lhs, 'key', None) is not None:
+            fts_query = fts_index_query(self._pycsw_fts_index, lhs.key, node.pattern)
+
+        if fts_query is None:
+            return super().like(node, lhs)
+
+        param = f'fts_query{self._pycsw_fts_params}'
+        self._pycsw_fts_params += 1
+
+        predicate = text(fts_index_filter(self._pycsw_fts_index, lhs.key, f':{param}'))
+        predicate = predicate.bindparams(bindparam(param, fts_query))
+
+        if node.not_:  # like NOT LIKE, do not match null values
+            return and_(lhs.isnot(None), not_(predicate))
+        return predicate
 
     @handle(ast.BBox)
     def bbox(self, node, lhs):
@@ -52,8 +78,16 @@ class PycswFilterEvaluator(SQLAlchemyFilterEvaluator):
         if self._pycsw_dbtype == 'postgresql+postgis+native':
             return text(f"ST_Intersects({geometry}, 'SRID={crs};{wkt}')")
         else:
-            return text(f"query_spatial({geometry}, '{wkt}', 'bbox', 'false') = 'true'")  # noqa
+            predicate = f"query_spatial({geometry}, '{wkt}', 'bbox', 'false') = 'true'"  # noqa
+            prefilter = spatial_index_filter(self._pycsw_spatial_index, wkt, 'bbox')
+            if prefilter is None and self._pycsw_bbox_columns:
+                prefilter = bbox_columns_filter(wkt, 'bbox')
+            if prefilter is not None:
+                predicate = f'({prefilter} and {predicate})'
+            return text(predicate)
 
 
-def to_filter(ast, dbtype, field_mapping=None):
-    return PycswFilterEvaluator(field_mapping, dbtype).evaluate(ast)
+def to_filter(ast, dbtype, field_mapping=None, spatial_index=None, fts_index=None,
+              bbox_columns=False):
+    return PycswFilterEvaluator(field_mapping, dbtype, spatial_index,
+                                fts_index, bbox_columns).evaluate(ast)
@@ -0,0 +1,173 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+
+import logging
+
+from shapely.geometry import box
+from shapely.prepared import prep
+from shapely.wkt import loads
+from sqlalchemy import and_, case, func, literal, literal_column
+
+LOGGER = logging.getLogger(__name__)
+
+# Number of best candidates reranked exactly, when ranking is not computed
+# by the database
+RANKING_CANDIDATES = 100
+
+
+class SpatialRanking(object):
+    """Request scoped spatial overlay ranking of query results as per
+    Lanfear (2006) http://pubs.usgs.gov/of/2006/1279/2006-1279.pdf
+
+    The rank of a record geometry T for a query geometry Q is
+    ``(X/Q)**kq * (X/T)**kt``, where X is the area of their intersection.
+    """
+
+    def __init__(self, enabled=False, kt=1.0, kq=1.0,
+                 candidates=RANKING_CANDIDATES):
+        self.enabled = enabled
+        self.kt = float(kt)
+        self.kq = float(kq)
+        self.candidates = int(candidates)
+
+        self.query_geometry = None
+        self._prepared = None
+
+    @classmethod
+    def from_config(cls, config):
+        """create the ranking of a request from the [server] configuration"""
+
+        def get(option, default):
+            if config.has_option('server', option):
+                return config.get('server', option)
+            return default
+
+        return cls(get('spatial_ranking', 'false') == 'true',
+                   get('spatial_ranking_kt', 1.0),
+                   get('spatial_ranking_kq', 1.0),
+                   get('spatial_ranking_candidates', RANKING_CANDIDATES))
+
+    @property
+    def active(self):
+        """whether the results of the request are ranked"""
+        return self.enabled and self.query_geometry is not None
+
+    def set_query_geometry(self, geometry):
+        """set the query geometry from the geometry of a spatial filter
+        (``pycsw.ogc.gml.gml3.Geometry``); points are buffered by one unit
+        and lines replaced by their envelope, so that they have an area;
+        results of filters without an area are not ranked"""
+
+        if not self.enabled:
+            return
+
+        wkt = None
+        if geometry.type in ['Polygon', 'Envelope']:
+            if loads(geometry.wkt).area > 0:
+                wkt = geometry.wkt
+        elif geometry.type in ['LineString', 'Point']:
+            minx, miny, maxx, maxy = loads(geometry.wkt).bounds
+            if geometry.type == 'Point':
+                minx, miny, maxx, maxy = minx - 1.0, miny - 1.0, maxx + 1.0, maxy + 1.0
+            tmp_box = box(minx, miny, maxx, maxy)
+            if tmp_box.area > 0:
+                wkt = tmp_box.wkt
+
+        if wkt is not None:
+            self.query_geometry = wkt
+            self._prepared = None
+
+    def score(self, target_geometry):
+        """return the rank of a record geometry (WKT)"""
+
+        if target_geometry is None or self.query_geometry is None:
+            return 0.0
+
+        try:
+            if self._prepared is None:
+                query_geometry = loads(self.query_geometry)
+                self._prepared = (query_geometry, prep(query_geometry))
+            query_geometry, prepared = self._prepared
+
+            target = loads(target_geometry)
+            Q = query_geometry.area
+            T = target.area
+            if Q == 0.0 or T == 0.0 or not prepared.intersects(target):
+                return 0.0
+            if prepared.contains(target):
+                X = T
+            else:
+                X = target.intersection(query_geometry).area
+            return ((X/Q)**self.kq)*((X/T)**self.kt)
+        except Exception:
+            LOGGER.warning('Cannot derive spatial overlay ranking', exc_info=True)
+            return 0.0
+
+    def rerank(self, records, geometry_column):
+        """sort records by rank (stable, so that records of equal rank keep
+        their order)"""
+
+        return sorted(records, reverse=True, key=lambda record: self.score(
+            getattr(record, geometry_column)))
+
+    def postgis_score(self, geometry_column):
+        """return the SQL expression of the rank of PostGIS geometries"""
+
+        query_geometry = loads(self.query_geometry)
+        if query_geometry.area == 0:
+            return literal(0.0)
+
+        intersection = func.ST_Area(func.ST_Intersection(
+            literal_column(geometry_column),
+            func.ST_GeomFromText(self.query_geometry, 4326)))
+
+        return func.coalesce(
+            func.power(intersection / query_geometry.area, self.kq) *
+            func.power(intersection / func.nullif(
+                func.ST_Area(literal_column(geometry_column)), 0), self.kt),
+            0)
+
+    def envelope_score(self, minx, miny, maxx, maxy):
+        """return the SQL expression of an approximate rank, computed on
+        numeric bounding box columns, which selects ranking candidates"""
+
+        qminx, qminy, qmaxx, qmaxy = loads(self.query_geometry).bounds
+
+        def least(a, b):
+            return case([(a < b, a)], else_=b)
+
+        def greatest(a, b):
+            return case([(a > b, a)], else_=b)
+
+        width = least(maxx, qmaxx) - greatest(minx, qminx)
+        height = least(maxy, qmaxy) - greatest(miny, qminy)
+        area = (maxx - minx) * (maxy - miny)
+
+        # with kt = kq = 1, the rank is proportional to X * X / T
+        return case([(and_(width > 0, height > 0, area > 0),
+                      width * height * width * height / area)], else_=0)
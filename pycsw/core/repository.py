@@ -32,9 +32,12 @@
 #
 # =================================================================
 
+from functools import lru_cache
 import inspect
+import itertools
 import logging
 import os
+import threading
 
 from shapely.wkt import loads
 try:
@@ -42,10 +45,11 @@ try:
 except:
     from shapely.geos import ReadingError
 
-from sqlalchemy import create_engine, func, __version__, select
+from sqlalchemy import (and_, bindparam, cast, create_engine, Float, func,
+                        or_, __version__, select)
 from sqlalchemy.sql import text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import create_session
+from sqlalchemy.orm import defer, scoped_session, sessionmaker
 
 from pycsw.core import util
 from pycsw.core.etree import etree
@@ -53,12 +57,43 @@ from pycsw.core.etree import PARSER
 
 LOGGER = logging.getLogger(__name__)
 
+PAGING_MODES = ['window', 'count']
+
+INSERT_MODES = ['insert', 'upsert', 'skip']
+
+INSERT_BATCH_SIZE = 1000
+
+# number of records fetched at a time when streaming query results
+STREAM_BATCH_SIZE = 100
+
+# large columns only loaded when a caller asks for them
+DEFERRABLE_COLUMNS = ['pycsw:XML', 'pycsw:AnyText', 'pycsw:Metadata']
+
+# connection pool options of the [repository] configuration section
+POOL_OPTIONS = ['pool_size', 'max_overflow', 'pool_recycle', 'pool_pre_ping']
+
+
+def get_pool_options(config):
+    ''' Return the connection pool options set in a configuration '''
+
+    options = {}
+    for option in POOL_OPTIONS:
+        if config.has_option('repository', option):
+            if option == 'pool_pre_ping':
+                options[option] = config.getboolean('repository', option)
+            else:
+                options[option] = config.getint('repository', option)
+    return options
+
 
 class Repository(object):
     _engines = {}
+    _engines_lock = threading.Lock()
+    _models = {}
+    _models_lock = threading.Lock()
 
     @classmethod
-    def create_engine(clazz, url):
+    def create_engine(clazz, url, **pool_options):
         '''
         SQL Alchemy engines are thread-safe and simple wrappers for connection pools
 
@@ -67,32 +102,71 @@ class Repository(object):
         To reduce startup time we can cache the engine as a class variable in the
         repository object and do database initialization once
 
-        Engines are memoized by url
+        Engines are memoized by url and connection pool options, so that
+        concurrent requests share a single connection pool
         '''
-        if url not in clazz._engines:
-            LOGGER.info('creating new engine: %s', url)
-            engine = create_engine('%s' % url, echo=False, pool_pre_ping=True)
-
-            # load SQLite query bindings
-            # This can be directly bound via events
-            # for sqlite < 0.7, we need to to this on a per-connection basis
-            if engine.name in ['sqlite', 'sqlite3'] and __version__ >= '0.7':
-                from sqlalchemy import event
-                @event.listens_for(engine, "connect")
-                def connect(dbapi_connection, connection_rec):
-                    create_custom_sql_functions(dbapi_connection)
+        pool_options = dict({'pool_pre_ping': True}, **pool_options)
+        key = (url, tuple(sorted(pool_options.items())))
+
+        with clazz._engines_lock:
+            if key not in clazz._engines:
+                LOGGER.info('creating new engine: %s', url)
+                if url.startswith('sqlite'):
+                    # SQLite connections are not pooled by size
+                    for option in ['pool_size', 'max_overflow']:
+                        if pool_options.pop(option, None) is not None:
+                            LOGGER.debug('Ignoring %s for SQLite', option)
+                engine = create_engine('%s' % url, echo=False, **pool_options)
+
+                # load SQLite query bindings
+                # This can be directly bound via events
+                # for sqlite < 0.7, we need to to this on a per-connection basis
+                if engine.name in ['sqlite', 'sqlite3'] and __version__ >= '0.7':
+                    from sqlalchemy import event
+                    @event.listens_for(engine, "connect")
+                    def connect(dbapi_connection, connection_rec):
+                        create_custom_sql_functions(dbapi_connection)
+                        # rows replaced by INSERT OR REPLACE (upserts on
+                        # SQLite < 3.24) fire the delete triggers of the
+                        # R*Tree and FTS5 indexes only with recursive_triggers
+                        dbapi_connection.execute('PRAGMA recursive_triggers = ON')
+
+                clazz._engines[key] = engine
+
+            return clazz._engines[key]
 
-            clazz._engines[url] = engine
+    @classmethod
+    def invalidate(clazz, url=None, table=None):
+        '''
+        Drop memoized table models and backend capabilities
 
-        return clazz._engines[url]
+        Models are memoized by url, table and core model mappings and must be
+        invalidated when the underlying table is (re)created or altered.
+        Without arguments, all memoized models are dropped
+        '''
+        with clazz._models_lock:
+            for key in list(clazz._models.keys()):
+                if url in [None, key[0]] and table in [None, key[1]]:
+                    LOGGER.info('invalidating model: %s, %s', key[0], key[1])
+                    del clazz._models[key]
 
     ''' Class to interact with underlying repository '''
-    def __init__(self, database, context, app_root=None, table='records', repo_filter=None):
-        ''' Initialize repository '''
+    def __init__(self, database, context, app_root=None, table='records', repo_filter=None,
+                 paging='window', pool_options=None, check_xml=False):
+        ''' Initialize repository
+
+        With ``check_xml``, the stored XML of records is checked to be
+        well-formed when records are inserted or updated, so that it can be
+        output as is (see ``pycsw.core.util.load_record_xml``)
+        '''
 
         self.context = context
         self.filter = repo_filter
-        self.fts = False
+        self.check_xml = check_xml
+
+        if paging not in PAGING_MODES:
+            raise RuntimeError('Invalid paging mode: %s' % paging)
+        self.paging = paging
 
         # Don't use relative paths, this is hack to get around
         # most wsgi restriction...
@@ -101,17 +175,69 @@ class Repository(object):
             database = database.replace('sqlite:///',
                        'sqlite:///%s%s' % (app_root, os.sep))
 
-        self.engine = Repository.create_engine('%s' % database)
+        self.engine = Repository.create_engine('%s' % database,
+                                               **(pool_options or {}))
+
+        # sessions are thread-local, so that a repository can be shared by
+        # the threads of a server; call ``session.remove()`` once a request
+        # is done
+        self.session = scoped_session(sessionmaker(
+            bind=self.engine, autocommit=True, autoflush=False,
+            expire_on_commit=False))
+
+        # reflecting the table and detecting backend capabilities is
+        # expensive, so models are memoized like engines
+        key = (database, table, tuple(sorted(
+            self.context.md_core_model['mappings'].items())))
+
+        with Repository._models_lock:
+            if key not in Repository._models:
+                Repository._models[key] = self._load_model(table)
+            model = Repository._models[key]
+
+        self.dataset = model['dataset']
+        self.dbtype = model['dbtype']
+        self.postgis_geometry_column = model['postgis_geometry_column']
+        self.fts = model['fts']
+        self.spatial_index = model['spatial_index']
+        self.fts_index = model['fts_index']
+        self.bbox_columns = model['bbox_columns']
+        self.area_column = model['area_column']
+        self.window_functions = model['window_functions']
+
+        if self.dbtype in ['sqlite', 'sqlite3']:  # load SQLite query bindings
+            # <= 0.6 behaviour
+            if not __version__ >= '0.7':
+                self.connection = self.engine.raw_connection()
+                create_custom_sql_functions(self.connection)
+
+        LOGGER.info('setting repository queryables')
+        # queryables depend on the typenames of the request model (i.e.
+        # loaded profiles); callers may rebind queryables per request, so
+        # every repository gets its own copy of each group
+        typenames = tuple(sorted(self.context.model['typenames'].keys()))
+
+        with Repository._models_lock:
+            if typenames not in model['queryables']:
+                model['queryables'][typenames] = self._gen_queryables()
+            queryables = model['queryables'][typenames]
+
+        self.queryables = dict([(qname, dict(qvalue))
+                                for qname, qvalue in queryables.items()])
+
+    def _load_model(self, table):
+        ''' Reflect table and detect backend capabilities '''
 
         base = declarative_base(bind=self.engine)
 
         LOGGER.info('binding ORM to existing database')
 
-        self.postgis_geometry_column = None
+        postgis_geometry_column = None
+        fts = False
 
         schema_name, table_name = table.rpartition(".")[::2]
 
-        self.dataset = type(
+        dataset = type(
             'dataset',
             (base,),
             {
@@ -123,13 +249,11 @@ class Repository(object):
             }
         )
 
-        self.dbtype = self.engine.name
-
-        self.session = create_session(self.engine)
+        dbtype = self.engine.name
 
         temp_dbtype = None
 
-        if self.dbtype == 'postgresql':
+        if dbtype == 'postgresql':
             # check if PostgreSQL is enabled with PostGIS 1.x
             try:
                 self.session.execute(select([func.postgis_version()]))
@@ -156,7 +280,7 @@ class Repository(object):
                     "limit 1;" % table_name
                 )
                 row = result.fetchone()
-                self.postgis_geometry_column = str(row['f_geometry_column'])
+                postgis_geometry_column = str(row['f_geometry_column'])
                 temp_dbtype = 'postgresql+postgis+native'
                 LOGGER.debug('PostgreSQL+PostGIS+Native detected')
             except Exception as err:
@@ -164,38 +288,93 @@ class Repository(object):
 
             # check if a native PostgreSQL FTS GIN index exists
             result = self.session.execute("select relname from pg_class where relname='fts_gin_idx'").scalar()
-            self.fts = bool(result)
-            LOGGER.debug('PostgreSQL FTS enabled: %r', self.fts)
+            fts = bool(result)
+            LOGGER.debug('PostgreSQL FTS enabled: %r', fts)
 
         if temp_dbtype is not None:
             LOGGER.debug('%s support detected', temp_dbtype)
-            self.dbtype = temp_dbtype
+            dbtype = temp_dbtype
+
+        # check if an SQLite R*Tree spatial index exists
+        spatial_index = None
+        if dbtype in ['sqlite', 'sqlite3']:
+            index_name = '%s_rtree' % table_name
+            result = self.session.execute(
+                "select name from sqlite_master where type='table' and name=:name",
+                {'name': index_name}).scalar()
+            if result is not None:
+                spatial_index = index_name
+            LOGGER.debug('SQLite R*Tree spatial index: %s', spatial_index)
+
+        # check if an SQLite FTS5 full-text index exists
+        fts_index = None
+        if dbtype in ['sqlite', 'sqlite3']:
+            index_name = '%s_fts' % table_name
+            result = self.session.execute(
+                "select name from sqlite_master where type='table' and name=:name",
+                {'name': index_name}).scalar()
+            if result is not None:
+                fts_index = index_name
+            LOGGER.debug('SQLite FTS5 full-text index: %s', fts_index)
+
+        # check if the table has numeric bounding box columns
+        bbox_columns = all(column in dataset.__table__.columns
+                           for column in util.BBOX_COLUMNS)
+        LOGGER.debug('Bounding box columns: %r', bbox_columns)
+
+        # check if the table has a geometry area column
+        area_column = util.AREA_COLUMN in dataset.__table__.columns
+        LOGGER.debug('Area column: %r', area_column)
+
+        # check if window functions (i.e. COUNT(*) OVER ()) are supported
+        window_functions = False
+        dialect = self.engine.dialect
+        if dialect.name == 'postgresql':
+            window_functions = True
+        elif dialect.name == 'sqlite':
+            window_functions = dialect.dbapi.sqlite_version_info >= (3, 25, 0)
+        elif dialect.name == 'mysql' and dialect.server_version_info is not None:
+            if getattr(dialect, '_is_mariadb', False):
+                window_functions = dialect.server_version_info >= (10, 2)
+            else:
+                window_functions = dialect.server_version_info >= (8, 0)
+        LOGGER.debug('Window functions supported: %r', window_functions)
+
+        return {
+            'dataset': dataset,
+            'dbtype': dbtype,
+            'postgis_geometry_column': postgis_geometry_column,
+            'fts': fts,
+            'spatial_index': spatial_index,
+            'fts_index': fts_index,
+            'bbox_columns': bbox_columns,
+            'area_column': area_column,
+            'window_functions': window_functions,
+            'queryables': {}
+        }
 
-        if self.dbtype in ['sqlite', 'sqlite3']:  # load SQLite query bindings
-            # <= 0.6 behaviour
-            if not __version__ >= '0.7':
-                self.connection = self.engine.raw_connection()
-                create_custom_sql_functions(self.connection)
+    def _gen_queryables(self):
+        ''' Generate core queryables db and obj bindings '''
 
-        LOGGER.info('setting repository queryables')
-        # generate core queryables db and obj bindings
-        self.queryables = {}
+        queryables = {}
 
         for tname in self.context.model['typenames']:
             for qname in self.context.model['typenames'][tname]['queryables']:
-                self.queryables[qname] = {}
+                queryables[qname] = {}
 
                 for qkey, qvalue in \
                 self.context.model['typenames'][tname]['queryables'][qname].items():
-                    self.queryables[qname][qkey] = qvalue
+                    queryables[qname][qkey] = qvalue
 
         # flatten all queryables
         # TODO smarter way of doing this
-        self.queryables['_all'] = {}
-        for qbl in self.queryables:
-            self.queryables['_all'].update(self.queryables[qbl])
+        queryables['_all'] = {}
+        for qbl in queryables:
+            queryables['_all'].update(queryables[qbl])
 
-        self.queryables['_all'].update(self.context.md_core_model['mappings'])
+        queryables['_all'].update(self.context.md_core_model['mappings'])
+
+        return queryables
 
     def _create_values(self, values):
         value_dict = {}
@@ -232,13 +411,14 @@ class Repository(object):
 
         return properties
 
-    def query_ids(self, ids):
+    def query_ids(self, ids, columns=None):
         ''' Query by list of identifiers '''
 
         column = getattr(self.dataset, \
         self.context.md_core_model['mappings']['pycsw:Identifier'])
 
-        query = self.session.query(self.dataset).filter(column.in_(ids))
+        query = self.project(self.session.query(self.dataset).filter(
+            column.in_(ids)), columns)
         return self._get_repo_filter(query).all()
 
     def query_domain(self, domain, typenames, domainquerytype='list',
@@ -279,8 +459,18 @@ class Repository(object):
         return self._get_repo_filter(query).all()
 
     def query(self, constraint, sortby=None, typenames=None,
-        maxrecords=10, startposition=0):
-        ''' Query records from underlying repository '''
+        maxrecords=10, startposition=0, cursor=None, columns=None,
+        ranking=None, stream=False):
+        ''' Query records from underlying repository
+
+        If a ``cursor`` is given (empty for the first page), records are
+        paged by keyset (see ``apply_cursor``) instead of ``startposition``.
+        If ``columns`` is given, large columns not listed are deferred
+        (see ``project``).  If an active ``ranking`` is given
+        (``pycsw.core.ranking.SpatialRanking``), records are ordered by
+        spatial overlay rank first (see ``rank``).  If ``stream`` is set,
+        records are returned as an iterator (see ``paginate``)
+        '''
 
         # run the raw query and get total
         if 'where' in constraint:  # GetRecords with constraint
@@ -291,37 +481,235 @@ class Repository(object):
             LOGGER.debug('No constraint detected')
             query = self.session.query(self.dataset)
 
-        total = self._get_repo_filter(query).count()
+        query = self.project(query, columns)
 
-        if util.ranking_pass:  #apply spatial ranking
-            #TODO: Check here for dbtype so to extract wkt from postgis native to wkt
+        if ranking is not None and not ranking.active:
+            ranking = None
+
+        if ranking is not None:  # apply spatial ranking
             LOGGER.debug('spatial ranking detected')
-            LOGGER.debug('Target WKT: %s', getattr(self.dataset, self.context.md_core_model['mappings']['pycsw:BoundingBox']))
-            LOGGER.debug('Query WKT: %s', util.ranking_query_geometry)
-            query = query.order_by(func.get_spatial_overlay_rank(getattr(self.dataset, self.context.md_core_model['mappings']['pycsw:BoundingBox']), util.ranking_query_geometry).desc())
-            #trying to make this wsgi safe
-            util.ranking_pass = False
-            util.ranking_query_geometry = ''
+            LOGGER.debug('Query WKT: %s', ranking.query_geometry)
+            query = query.order_by(self.rank(ranking).desc())
 
         if sortby is not None:  # apply sorting
             LOGGER.debug('sorting detected')
             #TODO: Check here for dbtype so to extract wkt from postgis native to wkt
             sortby_column = getattr(self.dataset, sortby['propertyname'])
 
+            if 'spatial' in sortby and sortby['spatial']:  # spatial sort
+                if (self.area_column and sortby['propertyname'] ==
+                        self.context.md_core_model['mappings']['pycsw:BoundingBox']):
+                    LOGGER.debug('Sorting by stored geometry area')
+                    sortby_column = getattr(self.dataset, util.AREA_COLUMN)
+                else:
+                    sortby_column = func.get_geometry_area(sortby_column)
+
             if sortby['order'] == 'DESC':  # descending sort
-                if 'spatial' in sortby and sortby['spatial']:  # spatial sort
-                    query = query.order_by(func.get_geometry_area(sortby_column).desc())
-                else:  # aspatial sort
-                    query = query.order_by(sortby_column.desc())
+                query = query.order_by(sortby_column.desc())
             else:  # ascending sort
-                if 'spatial' in sortby and sortby['spatial']:  # spatial sort
-                    query = query.order_by(func.get_geometry_area(sortby_column))
-                else:  # aspatial sort
-                    query = query.order_by(sortby_column)
+                query = query.order_by(sortby_column)
+
+        if cursor is None:
+            # always apply limit and offset
+            total, records = self._paginate_ranked(
+                self._get_repo_filter(query), maxrecords, startposition,
+                ranking, stream)
+
+            return [str(total), records]
+
+        sortkey = None
+        descending = False
+        if sortby is not None:
+            sortkey = sortby['propertyname']
+            descending = sortby['order'] == 'DESC'
+
+        # keyset pagination does not apply to computed sort keys
+        seek = ranking is None and not (sortby is not None and
+                                        sortby.get('spatial'))
+
+        query, position, offset = self.apply_cursor(query, cursor, sortkey,
+                                                    descending, seek)
+
+        total, records = self._paginate_ranked(self._get_repo_filter(query),
+                                               maxrecords, offset, ranking,
+                                               stream)
+
+        # when seeking, only the records after the cursor are counted
+        return [str(total + position - offset), records]
+
+    def rank(self, ranking):
+        ''' Return the SQL expression records are ordered by to rank them
+
+        On PostGIS native geometries, this is the exact rank computed by
+        the database.  Elsewhere, it only selects the candidates which
+        ``_paginate_ranked`` reranks exactly: an approximate rank computed
+        on the bounding box columns if any, else the rank computed by the
+        ``get_spatial_overlay_rank`` function
+        '''
+
+        if self.dbtype == 'postgresql+postgis+native':
+            return ranking.postgis_score(self.postgis_geometry_column)
+
+        if self.bbox_columns:
+            return ranking.envelope_score(*[getattr(self.dataset, column)
+                                            for column in util.BBOX_COLUMNS])
+
+        return cast(func.get_spatial_overlay_rank(getattr(self.dataset,
+            self.context.md_core_model['mappings']['pycsw:BoundingBox']),
+            ranking.query_geometry), Float)
+
+    def _paginate_ranked(self, query, maxrecords, startposition, ranking=None,
+                         stream=False):
+        ''' Paginate a query, reranking its best candidates exactly in
+        Python unless the database ranks records exactly (see ``rank``)
+
+        Only the first ``ranking.candidates`` records of the query are
+        reranked, whatever the page, so that pages do not overlap; records
+        past them follow in the order of the query '''
+
+        if (ranking is None or self.dbtype == 'postgresql+postgis+native' or
+                int(maxrecords) == 0):
+            return self.paginate(query, maxrecords, startposition, stream)
+
+        start = int(startposition)
+        end = start + int(maxrecords)
+        window = ranking.candidates
+
+        if start >= window:  # past the reranked candidates
+            return self.paginate(query, maxrecords, start, stream)
 
-        # always apply limit and offset
-        return [str(total), self._get_repo_filter(query).limit(
-        maxrecords).offset(startposition).all()]
+        total, candidates = self.paginate(query, window, 0)
+        records = ranking.rerank(candidates,
+            self.context.md_core_model['mappings']['pycsw:BoundingBox'])[start:end]
+
+        if end > window and int(total) > window:
+            total, rest = self.paginate(query, end - window, window)
+            records.extend(rest)
+
+        return total, records
+
+    def apply_cursor(self, query, cursor, sortkey=None, descending=False,
+                     seek=True):
+        ''' Apply a pagination cursor to a query
+
+        The query, already ordered by ``sortkey`` if any, is additionally
+        ordered by identifier and, if ``seek`` is possible, restricted to
+        the records following the last record of the cursor, i.e.
+        ``WHERE (sortkey, identifier) > (...)``, so that deep pages cost the
+        same as the first one.  Otherwise records are skipped by offset.
+
+        Returns the query, the position of the cursor and the offset to
+        apply to the query.  Raises ``ValueError`` on an invalid cursor
+        '''
+
+        position, values = util.decode_cursor(cursor)
+
+        identifier = getattr(self.dataset,
+            self.context.md_core_model['mappings']['pycsw:Identifier'])
+
+        if descending:
+            query = query.order_by(identifier.desc())
+        else:
+            query = query.order_by(identifier)
+
+        if not seek or values is None or (sortkey is not None and
+                                          values[0] is None):
+            LOGGER.debug('Paging by offset: %d', position)
+            return query, position, position
+
+        LOGGER.debug('Paging by keyset: %s', values)
+
+        if descending:
+            after = lambda column, value: column < value
+        else:
+            after = lambda column, value: column > value
+
+        if sortkey is None:
+            return query.filter(after(identifier, values[1])), position, 0
+
+        sortkey_column = getattr(self.dataset, sortkey)
+        predicates = [
+            after(sortkey_column, values[0]),
+            and_(sortkey_column == values[0], after(identifier, values[1]))
+        ]
+
+        # NULL sort keys are ordered last in PostgreSQL ascending sorts
+        # and in descending sorts elsewhere
+        if (self.engine.name == 'postgresql') != descending:
+            predicates.append(sortkey_column.is_(None))
+
+        return query.filter(or_(*predicates)), position, 0
+
+    def get_cursor(self, record, position, sortkey=None):
+        ''' Return the cursor of the page following a record
+
+        :param record: last record of a page
+        :param position: number of records up to and including ``record``
+        :param sortkey: attribute the records are sorted by, if any
+        '''
+
+        values = [
+            getattr(record, sortkey) if sortkey is not None else None,
+            getattr(record,
+                self.context.md_core_model['mappings']['pycsw:Identifier'])
+        ]
+
+        return util.encode_cursor(position, values)
+
+    def paginate(self, query, maxrecords=10, startposition=0, stream=False):
+        ''' Return the number of matches and a page of records of a query
+
+        With paging mode ``window`` and a backend supporting window
+        functions, the number of matches is fetched along with the page in
+        a single statement, else a separate count query is issued.
+
+        If ``stream`` is set, the page is returned as an iterator fetching
+        ``STREAM_BATCH_SIZE`` records at a time (through a server-side
+        cursor where the backend supports it) instead of a list
+        '''
+
+        maxrecords = int(maxrecords)
+        startposition = int(startposition)
+
+        if (self.paging == 'window' and self.window_functions and
+                maxrecords > 0):
+            LOGGER.debug('Fetching page and number of matches in one query')
+            rows = query.add_columns(func.count().over()).limit(
+                maxrecords).offset(startposition)
+
+            if stream:
+                rows = iter(rows.yield_per(STREAM_BATCH_SIZE))
+                first = next(rows, None)
+                if first is not None:
+                    return first[-1], _stream_rows(first, rows)
+                rows = []
+            else:
+                rows = rows.all()
+
+            if rows:
+                return rows[0][-1], [row[0] for row in rows]
+            if startposition == 0:
+                return 0, []
+
+            # page is past the last match: there is no row to read from
+            LOGGER.debug('Empty page, counting matches')
+            return query.count(), []
+
+        LOGGER.debug('Counting matches')
+        total = query.count()
+
+        query = query.limit(maxrecords).offset(startposition)
+
+        if stream:
+            # fetch the first batch now, so that a failing query fails the
+            # request rather than the response being streamed
+            rows = iter(query.yield_per(STREAM_BATCH_SIZE))
+            first = next(rows, None)
+            if first is None:
+                return total, []
+            return total, itertools.chain([first], rows)
+
+        return total, query.all()
 
     def insert(self, record, source, insert_date):
         ''' Insert a record into the repository '''
@@ -330,6 +718,9 @@ class Repository(object):
             LOGGER.debug('Decoding bytes to unicode')
             record.xml = record.xml.decode()
 
+        if self.check_xml:
+            check_xml(record.xml)
+
         try:
             self.session.begin()
             self.session.add(record)
@@ -338,6 +729,184 @@ class Repository(object):
             self.session.rollback()
             raise
 
+    def as_dict(self, record):
+        ''' Return the column values of a record object as a dict '''
+
+        return dict((prop.key, getattr(record, prop.key))
+                    for prop in self.dataset.__mapper__.column_attrs)
+
+    def insert_many(self, records, mode='insert',
+                    batch_size=INSERT_BATCH_SIZE, stop_on_error=False):
+        ''' Insert records into the repository in batches
+
+        ``mode`` decides what happens to records whose identifier already
+        exists: ``insert`` fails them, ``upsert`` replaces the existing
+        record and ``skip`` leaves it untouched.  Each batch is written
+        in one transaction, by executing a single statement for all its
+        rows (``ON CONFLICT`` on PostgreSQL and SQLite >= 3.24,
+        ``OR REPLACE`` / ``OR IGNORE`` on older SQLite, ``ON DUPLICATE KEY``
+        on MySQL); a failing batch is retried record by record, each
+        committed on its own.  With ``stop_on_error``, records after the
+        first failing one are not written.
+
+        ``records`` are record objects or dicts of their column values (see
+        ``as_dict``).  Returns the outcome of each record, in order:
+        ``inserted``, ``updated``, ``skipped``, or the exception raised for
+        it; with ``stop_on_error``, outcomes end at the first exception
+        '''
+
+        if mode not in INSERT_MODES:
+            msg = 'Invalid insert mode: {} (choose from {})'.format(
+                mode, ', '.join(INSERT_MODES))
+            LOGGER.error(msg)
+            raise RuntimeError(msg)
+
+        batch_size = max(int(batch_size), 1)
+
+        outcomes = []
+        for i in range(0, len(records), batch_size):
+            outcomes.extend(self._insert_batch(records[i:i + batch_size],
+                                               mode, stop_on_error))
+            if stop_on_error and isinstance(outcomes[-1], Exception):
+                break
+
+        return outcomes
+
+    def _insert_batch(self, records, mode, stop_on_error=False):
+        ''' Insert a batch of records, see ``insert_many`` '''
+
+        if not records:
+            return []
+
+        mapper = self.dataset.__mapper__
+        identifier = mapper.column_attrs[
+            self.context.md_core_model['mappings']['pycsw:Identifier']
+        ].columns[0]
+
+        rows = []
+        for record in records:
+            if not isinstance(record, dict):
+                record = self.as_dict(record)
+            row = dict((prop.columns[0].key, record.get(prop.key))
+                       for prop in mapper.column_attrs)
+            if isinstance(row.get('xml'), bytes):
+                LOGGER.debug('Decoding bytes to unicode')
+                row['xml'] = row['xml'].decode()
+            rows.append(row)
+
+        ids = [row[identifier.key] for row in rows]
+
+        try:
+            if self.check_xml:
+                for row in rows:
+                    check_xml(row.get('xml'))
+
+            self.session.begin()
+            existing = set(i[0] for i in self.session.query(identifier).filter(
+                identifier.in_(ids)))
+
+            outcomes = []
+            for id_ in ids:
+                if id_ not in existing:
+                    outcomes.append('inserted')
+                elif mode == 'upsert':
+                    outcomes.append('updated')
+                else:
+                    outcomes.append('skipped')
+                existing.add(id_)
+
+            statement = self._insert_statement(mode, identifier)
+
+            if statement is not None:
+                self.session.execute(statement, rows)
+            else:  # no native upsert: split into inserts and updates
+                new = [row for row, outcome in zip(rows, outcomes)
+                       if outcome == 'inserted']
+                if new:
+                    self.session.execute(
+                        self.dataset.__table__.insert(), new)
+                if mode == 'upsert':
+                    self._update_rows(
+                        [row for row, outcome in zip(rows, outcomes)
+                         if outcome == 'updated'], identifier)
+            self.session.commit()
+        except Exception as err:
+            self.session.rollback()
+            if len(records) == 1:
+                LOGGER.debug('Record %s not inserted: %s', ids[0], err)
+                return [err]
+            LOGGER.debug('Batch insert failed; retrying record by record')
+            outcomes = []
+            for record in records:
+                outcomes.append(self._insert_batch([record], mode)[0])
+                if stop_on_error and isinstance(outcomes[-1], Exception):
+                    break
+            return outcomes
+
+        return outcomes
+
+    def _insert_statement(self, mode, identifier):
+        ''' Build a native multi-row insert statement for ``mode``
+
+        Returns ``None`` if the backend has no native upsert
+        '''
+
+        table = self.dataset.__table__
+        dialect = self.engine.dialect.name
+
+        if mode == 'insert':
+            return table.insert()
+
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table)
+            if mode == 'skip':
+                return statement.on_conflict_do_nothing(
+                    index_elements=[identifier])
+            return statement.on_conflict_do_update(
+                index_elements=[identifier],
+                set_=dict((column.name, statement.excluded[column.name])
+                          for column in table.columns
+                          if column is not identifier))
+        elif dialect == 'sqlite':
+            if mode == 'skip':
+                return table.insert().prefix_with('OR IGNORE')
+            if self.engine.dialect.dbapi.sqlite_version_info < (3, 24, 0):
+                return table.insert().prefix_with('OR REPLACE')
+            # unlike OR REPLACE, an upsert updates rows in place, keeping
+            # their rowid and firing update triggers (e.g. of the R*Tree)
+            quote = self.engine.dialect.identifier_preparer.quote
+            return text('INSERT INTO %s (%s) VALUES (%s) ON CONFLICT (%s) DO UPDATE SET %s' % (
+                self.engine.dialect.identifier_preparer.format_table(table),
+                ', '.join(quote(column.name) for column in table.columns),
+                ', '.join(':%s' % column.key for column in table.columns),
+                quote(identifier.name),
+                ', '.join('%s = excluded.%s' % (quote(column.name), quote(column.name))
+                          for column in table.columns if column is not identifier)))
+        elif dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(table)
+            if mode == 'skip':
+                return statement.prefix_with('IGNORE')
+            return statement.on_duplicate_key_update(
+                dict((column.name, statement.inserted[column.name])
+                     for column in table.columns
+                     if column is not identifier))
+
+        return None
+
+    def _update_rows(self, rows, identifier):
+        ''' Replace existing records by identifier '''
+
+        if not rows:
+            return
+
+        statement = self.dataset.__table__.update().where(
+            identifier == bindparam('_identifier'))
+
+        self.session.execute(statement, [
+            dict(row, _identifier=row[identifier.key]) for row in rows])
+
     def update(self, record=None, recprops=None, constraint=None):
         ''' Update a record in the repository based on identifier '''
 
@@ -353,6 +922,9 @@ class Repository(object):
                 LOGGER.debug('Decoding bytes to unicode')
                 record.xml = record.xml.decode()
 
+            if self.check_xml:
+                check_xml(record.xml)
+
         if recprops is None and constraint is None:  # full update
             LOGGER.debug('full update')
             update_dict = dict([(getattr(self.dataset, key),
@@ -382,15 +954,23 @@ class Repository(object):
                     if 'dbcol' not in rpu['rp']:
                         self.session.rollback()
                         raise RuntimeError('property not found for XPath %s' % rpu['rp']['name'])
+                    values = {
+                        getattr(self.dataset,
+                        rpu['rp']['dbcol']): rpu['value'],
+                        'xml': func.update_xpath(str(self.context.namespaces),
+                               getattr(self.dataset,
+                               self.context.md_core_model['mappings']['pycsw:XML']),
+                               str(rpu)),
+                    }
+                    # keep the columns derived from geometry (if any) in sync
+                    if rpu['rp']['dbcol'] == self.context.md_core_model['mappings']['pycsw:BoundingBox']:
+                        if self.bbox_columns:
+                            values.update(util.bbox_columns(rpu['value']))
+                        if self.area_column:
+                            values[util.AREA_COLUMN] = util.geometry_area(rpu['value'])
                     rows += self._get_repo_filter(self.session.query(self.dataset)).filter(
-                        text(constraint['where'])).params(self._create_values(constraint['values'])).update({
-                            getattr(self.dataset,
-                            rpu['rp']['dbcol']): rpu['value'],
-                            'xml': func.update_xpath(str(self.context.namespaces),
-                                   getattr(self.dataset,
-                                   self.context.md_core_model['mappings']['pycsw:XML']),
-                                   str(rpu)),
-                        }, synchronize_session='fetch')
+                        text(constraint['where'])).params(self._create_values(constraint['values'])).update(
+                            values, synchronize_session='fetch')
                     # then update anytext tokens
                     rows2 += self._get_repo_filter(self.session.query(self.dataset)).filter(
                         text(constraint['where'])).params(self._create_values(constraint['values'])).update({
@@ -437,6 +1017,26 @@ class Repository(object):
 
         return rows
 
+    def project(self, query, columns=None):
+        ''' Defer loading of large columns not listed in ``columns``
+
+        ``columns`` is an iterable of database column names needed by the
+        caller (``None`` loads all columns).  Deferred columns are still
+        loaded on first access
+        '''
+
+        if columns is None:
+            return query
+
+        mapped = self.dataset.__mapper__.column_attrs.keys()
+
+        for key in DEFERRABLE_COLUMNS:
+            column = self.context.md_core_model['mappings'].get(key)
+            if column in mapped and column not in columns:
+                query = query.options(defer(getattr(self.dataset, column)))
+
+        return query
+
     def _get_repo_filter(self, query):
         ''' Apply repository wide side filter / mask query '''
         if self.filter is not None:
@@ -454,6 +1054,7 @@ def create_custom_sql_functions(connection):
         update_xpath,
         util.get_anytext,
         get_geometry_area,
+        get_geometry_bounds,
         get_spatial_overlay_rank
     ]:
         argspec = inspect_function(function_object)
@@ -464,6 +1065,32 @@ def create_custom_sql_functions(connection):
         )
 
 
+def check_xml(xml):
+    ''' Raise a RuntimeError if the stored XML of a record is not
+    well-formed '''
+
+    if xml is None:
+        return
+
+    if isinstance(xml, str):
+        xml = xml.encode('utf-8')
+
+    try:
+        etree.fromstring(xml, PARSER)
+    except etree.XMLSyntaxError as err:
+        msg = 'Record XML is not well-formed: %s' % err
+        LOGGER.error(msg)
+        raise RuntimeError(msg) from err
+
+
+def _stream_rows(first, rows):
+    ''' Iterate over the records of rows fetched along with a count '''
+
+    yield first[0]
+    for row in rows:
+        yield row[0]
+
+
 def query_spatial(bbox_data_wkt, bbox_input_wkt, predicate, distance):
     """Perform spatial query
 
@@ -557,6 +1184,26 @@ def get_geometry_area(geometry):
         return '0'
 
 
+@lru_cache(maxsize=64)
+def _get_geometry_bounds(geometry):
+    """Derive (minx, miny, maxx, maxy) of a geometry, or None"""
+    try:
+        bounds = util.wkt2geom(geometry)
+    except (AttributeError, ValueError, ReadingError, TypeError):
+        return None
+    if len(bounds) != 4:  # empty geometry
+        return None
+    return bounds
+
+
+def get_geometry_bounds(geometry, index):
+    """Derive a bound (0: minx, 1: miny, 2: maxx, 3: maxy) of a geometry"""
+    bounds = _get_geometry_bounds(geometry)
+    if bounds is None:
+        return None
+    return bounds[int(index)]
+
+
 def get_spatial_overlay_rank(target_geometry, query_geometry):
     """Derive spatial overlay rank for geospatial search as per Lanfear (2006)
     http://pubs.usgs.gov/of/2006/1279/2006-1279.pdf"""
@@ -32,6 +32,7 @@
 #
 # =================================================================
 
+import base64
 from configparser import BasicInterpolation, ConfigParser
 import json
 import os
@@ -40,19 +41,32 @@ import datetime
 import logging
 import time
 
-from urllib.request import Request, urlopen
 from urllib.parse import urlparse
 from shapely.wkt import loads
-from owslib.util import http_post
 
 from pycsw.core.etree import etree, PARSER
+from pycsw.core.httpclient import get_client
 
 LOGGER = logging.getLogger(__name__)
 
-# Global variables for spatial ranking algorithm
-ranking_enabled = False
-ranking_pass = False
-ranking_query_geometry = ''
+# Spatial predicates which can only hold if the envelopes of both geometries
+# intersect (with dwithin, once expanded by the distance)
+SPATIAL_INDEX_PREDICATES = ['bbox', 'contains', 'crosses', 'dwithin', 'equals',
+                            'intersects', 'overlaps', 'touches', 'within']
+
+# Numeric bounding box columns of record geometries
+BBOX_COLUMNS = ['bbox_minx', 'bbox_miny', 'bbox_maxx', 'bbox_maxy']
+
+# Column of the area of record geometries, for spatial sorting
+AREA_COLUMN = 'area'
+
+# Columns of the SQLite FTS5 full-text index
+FTS_INDEX_COLUMNS = ['anytext', 'title', 'abstract']
+
+# Placeholder of a stored record spliced into a response as is
+RAW_RECORD = ' pycsw:raw:%d '
+RAW_RECORD_RE = re.compile(r'<!-- pycsw:raw:(\d+) -->')
+XML_DECLARATION_RE = re.compile(r'^\s*<\?xml[^>]*\?>\s*')
 
 # Lookups for the secure_filename function
 # https://github.com/pallets/werkzeug/blob/778f482d1ac0c9e8e98f774d2595e9074e6984d7/werkzeug/utils.py#L30-L31
@@ -205,6 +219,215 @@ def wkt2geom(ewkt, bounds=True):
     return geometry.envelope.bounds if bounds else geometry
 
 
+def spatial_index_filter(spatial_index, wkt, predicate, distance='false'):
+    """Derive an SQL pre-filter selecting the rows of an SQLite R*Tree
+    spatial index whose envelope intersects the envelope of a query geometry
+
+    Parameters
+    ----------
+    spatial_index: str
+        Name of the R*Tree table (see ``Repository.spatial_index``)
+    wkt: str
+        Well-Known Text representation of the query geometry
+    predicate: str
+        Spatial predicate of the query
+    distance: int or float or str
+        Distance parameter of the ``dwithin`` predicate
+
+    Returns
+    -------
+    str
+        SQL condition on ``rowid``, or ``None`` if the index cannot be used
+        for the predicate
+
+    """
+
+    if spatial_index is None:
+        return None
+
+    envelope = _query_envelope(wkt, predicate, distance)
+    if envelope is None:
+        return None
+
+    minx, miny, maxx, maxy = envelope
+    return ('rowid in (select id from %s where minx <= %r and maxx >= %r '
+            'and miny <= %r and maxy >= %r)' %
+            (spatial_index, maxx, minx, maxy, miny))
+
+
+def bbox_columns_filter(wkt, predicate, distance='false'):
+    """Derive an SQL pre-filter selecting the rows whose numeric bounding
+    box columns intersect the envelope of a query geometry
+
+    Parameters
+    ----------
+    wkt: str
+        Well-Known Text representation of the query geometry
+    predicate: str
+        Spatial predicate of the query
+    distance: int or float or str
+        Distance parameter of the ``dwithin`` predicate
+
+    Returns
+    -------
+    str
+        SQL condition on the bounding box columns, or ``None`` if they cannot
+        be used for the predicate
+
+    """
+
+    envelope = _query_envelope(wkt, predicate, distance)
+    if envelope is None:
+        return None
+
+    minx, miny, maxx, maxy = envelope
+    return ('(%s <= %r and %s >= %r and %s <= %r and %s >= %r)' %
+            (BBOX_COLUMNS[0], maxx, BBOX_COLUMNS[2], minx,
+             BBOX_COLUMNS[1], maxy, BBOX_COLUMNS[3], miny))
+
+
+def bbox_columns(wkt):
+    """Derive the values of the numeric bounding box columns of a geometry
+
+    Parameters
+    ----------
+    wkt: str
+        Well-Known Text representation of the geometry
+
+    Returns
+    -------
+    dict
+        Values of the bounding box columns, ``None`` if the geometry is
+        missing or invalid
+
+    """
+
+    bounds = None
+    if wkt:
+        try:
+            bounds = wkt2geom(wkt)
+        except Exception as err:
+            LOGGER.debug('Cannot derive envelope of %s: %s', wkt, err)
+
+    # no or empty geometry (without bounds, or NaN bounds)
+    if bounds is None or len(bounds) != 4 or any(b != b for b in bounds):
+        bounds = [None] * 4
+
+    return dict(zip(BBOX_COLUMNS, bounds))
+
+
+def geometry_area(wkt):
+    """Derive the area of a geometry
+
+    Parameters
+    ----------
+    wkt: str
+        Well-Known Text representation of the geometry
+
+    Returns
+    -------
+    float
+        Area of the geometry, ``0`` if the geometry is missing or invalid
+
+    """
+
+    if not wkt:
+        return 0.0
+
+    try:
+        return float(wkt2geom(wkt, bounds=False).area)
+    except Exception as err:
+        LOGGER.debug('Cannot derive area of %s: %s', wkt, err)
+        return 0.0
+
+
+def _query_envelope(wkt, predicate, distance='false'):
+    """envelope (minx, miny, maxx, maxy) which the envelope of a record
+    geometry must intersect to satisfy a spatial predicate, or None"""
+
+    if predicate not in SPATIAL_INDEX_PREDICATES:
+        return None
+
+    try:
+        minx, miny, maxx, maxy = wkt2geom(wkt)
+    except Exception as err:
+        LOGGER.debug('Cannot derive envelope of %s: %s', wkt, err)
+        return None
+
+    if predicate == 'dwithin':
+        try:
+            distance = float(distance)
+        except ValueError:
+            return None
+        minx, miny, maxx, maxy = (minx - distance, miny - distance,
+                                  maxx + distance, maxy + distance)
+
+    return minx, miny, maxx, maxy
+
+
+def fts_index_query(fts_index, column, pattern):
+    """Derive an SQLite FTS5 MATCH query equivalent to a LIKE pattern
+
+    The full-text index uses the trigram tokenizer, so a phrase query
+    matches the same (case insensitive) substrings as ``LIKE '%term%'``.
+
+    Parameters
+    ----------
+    fts_index: str
+        Name of the FTS5 table (see ``Repository.fts_index``)
+    column: str
+        Name of the queried column
+    pattern: str
+        LIKE pattern of the query
+
+    Returns
+    -------
+    str
+        MATCH query, or ``None`` if the index cannot be used for the pattern
+
+    """
+
+    if fts_index is None or column not in FTS_INDEX_COLUMNS:
+        return None
+
+    if not (len(pattern) > 1 and pattern.startswith('%') and pattern.endswith('%')):
+        return None
+
+    term = pattern.strip('%')
+
+    # trigrams need at least three characters, and inner wildcards cannot
+    # be expressed as a phrase query
+    if len(term) < 3 or '%' in term or '_' in term:
+        return None
+
+    return '"%s"' % term.replace('"', '""')
+
+
+def fts_index_filter(fts_index, column, param):
+    """Derive an SQL condition selecting the rows matched by an SQLite FTS5
+    full-text index query on a column
+
+    Parameters
+    ----------
+    fts_index: str
+        Name of the FTS5 table (see ``Repository.fts_index``)
+    column: str
+        Name of the queried column
+    param: str
+        Bind parameter placeholder of the MATCH query (see
+        ``fts_index_query``)
+
+    Returns
+    -------
+    str
+        SQL condition on ``rowid``
+
+    """
+
+    return ('rowid in (select rowid from %s where %s match %s)' %
+            (fts_index, column, param))
+
+
 def bbox2wktpolygon(bbox):
     """Return OGC WKT Polygon of a simple bbox string
 
@@ -273,14 +496,18 @@ def getqattr(obj, name):
     return result
 
 
-def http_request(method, url, request=None, timeout=30):
-    """Perform HTTP request"""
+def http_request(method, url, request=None, timeout=None):
+    """Perform HTTP request, on the shared pool of HTTP connections
+
+    The body of POST responses is returned whatever the HTTP status, as
+    OGC services return exception reports with HTTP error statuses"""
+
     if method == 'POST':
-        return http_post(url, request, timeout=timeout)
-    else:  # GET
-        request = Request(url)
-        request.add_header('User-Agent', 'pycsw (https://pycsw.org/)')
-        return urlopen(request, timeout=timeout).read()
+        return get_client().request(method, url, data=request,
+                                    headers={'Content-Type': 'text/xml'},
+                                    timeout=timeout,
+                                    raise_for_status=False).content
+    return get_client().request(method, url, timeout=timeout).content
 
 
 def bind_url(url):
@@ -455,3 +682,97 @@ def is_none_or_empty(value):
         return True
 
     return False
+
+
+def encode_cursor(position, values=None):
+    """
+    Encode a pagination cursor as an opaque token
+
+    :param position: number of records before the next page
+    :param values: `list` of sort key and identifier of the last record
+                   of the current page
+
+    :returns: `str` of cursor token
+    """
+
+    token = json.dumps([position, values], default=str)
+
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a pagination cursor token
+
+    :param token: `str` of cursor token, empty for the first page
+
+    :returns: `tuple` of position and `list` of sort key and identifier
+              (or `None`)
+    """
+
+    if is_none_or_empty(token):
+        return 0, None
+
+    try:
+        token = token.strip()
+        position, values = json.loads(base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)))
+        position = int(position)
+    except Exception as err:
+        raise ValueError('Invalid cursor: {}'.format(token)) from err
+
+    if position < 0 or (values is not None and
+                        (not isinstance(values, list) or len(values) != 2)):
+        raise ValueError('Invalid cursor: {}'.format(token))
+
+    return position, values
+
+
+def load_record_xml(context, xml):
+    """
+    Load the stored XML of a record which is output as is
+
+    If enabled for the request (``context.raw_records`` is a `list`), the
+    XML is not parsed: a placeholder is returned instead, replaced by the
+    stored XML when the response is written (see ``splice_raw_records``)
+
+    :param context: `pycsw.core.config.StaticContext` of the request
+    :param xml: `str` or `bytes` of stored XML
+
+    :returns: `lxml.etree._Element` of record, or `lxml.etree._Comment`
+              placeholder
+    """
+
+    if context.raw_records is None:
+        return etree.fromstring(xml, context.parser)
+
+    if isinstance(xml, bytes):
+        xml = xml.decode('utf-8')
+
+    context.raw_records.append(XML_DECLARATION_RE.sub('', xml, count=1))
+
+    return etree.Comment(RAW_RECORD % (len(context.raw_records) - 1))
+
+
+def splice_raw_records(context, response):
+    """
+    Replace the placeholders of stored records in a serialized response
+    with their stored XML
+
+    Spliced records are released from ``context.raw_records``
+
+    :param context: `pycsw.core.config.StaticContext` of the request
+    :param response: `str` of serialized response
+
+    :returns: `str` of response
+    """
+
+    if not context.raw_records:
+        return response
+
+    def splice(match):
+        index = int(match.group(1))
+        xml, context.raw_records[index] = context.raw_records[index], None
+        return xml
+
+    return RAW_RECORD_RE.sub(splice, response)
@@ -37,9 +37,10 @@ LOGGER = logging.getLogger(__name__)
 
 class OAIPMH(object):
     """OAI-PMH wrapper class"""
-    def __init__(self, context, config):
+    def __init__(self, context, config, pagination='offset'):
         LOGGER.debug('Initializing OAI-PMH constants')
         self.oaipmh_version = '2.0'
+        self.pagination = pagination
 
         self.namespaces = {
             'oai': 'http://www.openarchives.org/OAI/2.0/',
@@ -152,7 +153,10 @@ class OAIPMH(object):
                     del kvpout['outputschema']
             elif kvp['verb'] in ['ListRecords', 'ListIdentifiers']:
                 if 'resumptiontoken' in kvp:
-                    kvpout['startposition'] = kvp['resumptiontoken']
+                    if self.pagination == 'cursor':
+                        kvpout['cursor'] = kvp['resumptiontoken']
+                    else:
+                        kvpout['startposition'] = kvp['resumptiontoken']
                 if ('outputschema' in kvpout and
                    kvp['verb'] == 'ListIdentifiers'):  # simple output only
                     pass #del kvpout['outputschema']
@@ -179,7 +183,7 @@ class OAIPMH(object):
         LOGGER.debug('Resulting parameters: %s', kvpout)
         return kvpout
 
-    def response(self, response, kvp, repository, server_url):
+    def response(self, response, kvp, repository, server_url, cursor=None):
         """process OAI-PMH request"""
 
         mode = kvp.pop('mode', None)
@@ -264,10 +268,15 @@ class OAIPMH(object):
                 if verb != 'GetRecord':
                     complete_list_size = response.xpath('//@numberOfRecordsMatched')[0]
                     next_record = response.xpath('//@nextRecord')[0]
-                    cursor = str(int(complete_list_size) - int(next_record) - 1)
+                    list_cursor = str(int(complete_list_size) - int(next_record) - 1)
+
+                    if self.pagination == 'cursor':
+                        token = cursor if next_record != '0' and cursor else ''
+                    else:
+                        token = next_record
 
                     resumption_token = etree.SubElement(verbnode, util.nspath_eval('oai:resumptionToken', self.namespaces),
-                                                        completeListSize=complete_list_size, cursor=cursor).text = next_record
+                                                        completeListSize=complete_list_size, cursor=list_cursor).text = token
         return node
 
     def _get_metadata_prefix(self, prefix):
@@ -30,8 +30,10 @@
 # =================================================================
 
 from configparser import ConfigParser
+import hashlib
 import logging
 import os
+import threading
 from urllib.parse import urlencode
 
 from pygeofilter.parsers.ecql import parse as parse_ecql
@@ -41,9 +43,10 @@ from pycsw import __version__
 from pycsw.core import log
 from pycsw.core.config import StaticContext
 from pycsw.core.pygeofilter_evaluate import to_filter
-from pycsw.core.util import bind_url, jsonify_links, wkt2geom
+from pycsw.core.util import bind_url, encode_cursor, jsonify_links, wkt2geom
 from pycsw.ogc.api.oapi import gen_oapi
-from pycsw.ogc.api.util import match_env_var, render_j2_template, to_json
+from pycsw.ogc.api.util import (match_env_var, match_etag,
+                                render_j2_template, to_json)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -71,6 +74,17 @@ CONFORMANCE_CLASSES = [
     'https://api.stacspec.org/v1.0.0-beta.4/item-search#sort'
 ]
 
+#: documents which only depend on configuration, with their templates
+DOCUMENTS = {
+    'landing_page': 'landing_page.html',
+    'openapi': 'openapi.html',
+    'conformance': 'conformance.html',
+    'collections': 'collections.html',
+    'collection': 'collection.html'
+}
+
+DOCUMENT_FORMATS = ['json', 'html']
+
 
 class API:
     """API object"""
@@ -97,6 +111,15 @@ class API:
         LOGGER.debug(f'Server URL: {url_}')
         self.config['server']['url'] = url_.rstrip('/')
 
+        # configuration dependent documents, rendered once per
+        # configuration snapshot
+        snapshot = repr([__version__] + [
+            (section, sorted(self.config.items(section, raw=True)))
+            for section in self.config.sections()])
+        self.snapshot = hashlib.sha256(snapshot.encode('utf-8')).hexdigest()
+        self.documents = {}
+        self.documents_lock = threading.Lock()
+
         self.context = StaticContext()
 
         LOGGER.debug('Setting maxrecords')
@@ -110,6 +133,14 @@ class API:
         if self.config.has_option('repository', 'filter'):
             repo_filter = self.config.get('repository', 'filter')
 
+        paging = 'window'
+        if self.config.has_option('repository', 'paging'):
+            paging = self.config.get('repository', 'paging')
+
+        self.pagination = 'offset'
+        if self.config.has_option('server', 'pagination'):
+            self.pagination = self.config.get('server', 'pagination')
+
         self.orm = 'sqlalchemy'
         from pycsw.core import repository
         try:
@@ -120,7 +151,9 @@ class API:
                 # self.environ.get('local.app_root', None),
                 None,
                 self.config.get('repository', 'table'),
-                repo_filter
+                repo_filter,
+                paging,
+                repository.get_pool_options(self.config)
             )
             LOGGER.debug(f'Repository loaded {self.repository.dbtype}')
         except Exception as err:
@@ -194,6 +227,136 @@ class API:
 
         return headers, status, content
 
+    def get_document_response(self, headers_, name):
+        """
+        Provide a configuration dependent document
+
+        Documents are rendered once and served from memory, with an ETag
+
+        :param headers_: copy of HEADERS object
+        :param name: document name (see `DOCUMENTS`)
+
+        :returns: tuple of headers, status code, content
+        """
+
+        format_ = 'html' if headers_['Content-Type'] == 'text/html' else 'json'
+
+        content, length, etag = self.get_document(name, format_)
+
+        if_none_match = headers_.get('If-None-Match')
+        headers_['ETag'] = etag
+
+        if match_etag(if_none_match, etag):
+            headers_['Content-Length'] = 0
+            return headers_, 304, ''
+
+        headers_['Content-Length'] = length
+
+        return headers_, 200, content
+
+    def get_document(self, name, format_):
+        """
+        Get a configuration dependent document
+
+        Documents are rendered on first use, or read from the directory
+        set by ``server.documents_cache`` if pre-rendered there
+
+        :param name: document name (see `DOCUMENTS`)
+        :param format_: `json` or `html`
+
+        :returns: tuple of content, content length (bytes) and ETag
+        """
+
+        key = (name, format_)
+
+        with self.documents_lock:
+            if key not in self.documents:
+                filepath = self.get_document_filepath(name, format_)
+                if filepath is not None and os.path.isfile(filepath):
+                    LOGGER.debug(f'Reading pre-rendered document {filepath}')
+                    with open(filepath, encoding='utf-8') as fh:
+                        content = fh.read()
+                else:
+                    LOGGER.debug(f'Rendering document {name} ({format_})')
+                    content = self.render_document(name, format_)
+
+                content_bytes = content.encode('utf-8')
+                etag = '"{}"'.format(
+                    hashlib.sha256(content_bytes).hexdigest()[:32])
+                self.documents[key] = (content, len(content_bytes), etag)
+
+            return self.documents[key]
+
+    def get_document_filepath(self, name, format_):
+        """
+        Get the filepath of a pre-rendered document
+
+        :param name: document name (see `DOCUMENTS`)
+        :param format_: `json` or `html`
+
+        :returns: `str` of filepath, or `None` if not configured
+        """
+
+        if not self.config.has_option('server', 'documents_cache'):
+            return None
+
+        return os.path.join(self.config.get('server', 'documents_cache'),
+                            self.snapshot, f'{name}.{format_}')
+
+    def render_document(self, name, format_):
+        """
+        Render a configuration dependent document
+
+        :param name: document name (see `DOCUMENTS`)
+        :param format_: `json` or `html`
+
+        :returns: `str` of rendered document
+        """
+
+        is_html = format_ == 'html'
+
+        if name == 'landing_page':
+            response = self.gen_landing_page()
+        elif name == 'openapi':
+            filepath = f"{THISDIR}/../../core/schemas/ogc/ogcapi/records/part1/1.0/ogcapi-records-1.yaml"
+            response = gen_oapi(self.config, filepath)
+        elif name == 'conformance':
+            response = {
+                'conformsTo': CONFORMANCE_CLASSES
+            }
+        else:
+            response = self.gen_collections(is_html, name == 'collection')
+
+        if is_html:
+            return render_j2_template(self.config, DOCUMENTS[name], response)
+        return to_json(response)
+
+    def write_documents(self):
+        """
+        Pre-render all configuration dependent documents to the directory
+        set by ``server.documents_cache``
+
+        :returns: `list` of filepaths written
+        """
+
+        filepaths = []
+
+        for name in DOCUMENTS.keys():
+            for format_ in DOCUMENT_FORMATS:
+                filepath = self.get_document_filepath(name, format_)
+                if filepath is None:
+                    raise RuntimeError('server.documents_cache is not set')
+
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                LOGGER.info(f'Writing {filepath}')
+                content = self.render_document(name, format_)
+                with open(f'{filepath}.tmp', 'w', encoding='utf-8') as fh:
+                    fh.write(content)
+                os.replace(f'{filepath}.tmp', filepath)
+                filepaths.append(filepath)
+
+        return filepaths
+
     def landing_page(self, headers_, args):
         """
         Provide API landing page
@@ -206,6 +369,15 @@ class API:
 
         headers_['Content-Type'] = self.get_content_type(headers_, args)
 
+        return self.get_document_response(headers_, 'landing_page')
+
+    def gen_landing_page(self):
+        """
+        Generate API landing page
+
+        :returns: `dict` of landing page
+        """
+
         response = {
             'stac_version': '1.0.0-beta.4',
             'id': 'pycsw-catalogue',
@@ -295,7 +467,7 @@ class API:
             }
         ]
 
-        return self.get_response(200, headers_, 'landing_page.html', response)
+        return response
 
     def openapi(self, headers_, args):
         """
@@ -311,11 +483,7 @@ class API:
         if headers_['Content-Type'] == 'application/json':
             headers_['Content-Type'] = 'application/vnd.oai.openapi+json;version=3.0'
 
-        filepath = f"{THISDIR}/../../core/schemas/ogc/ogcapi/records/part1/1.0/ogcapi-records-1.yaml"
-
-        response = gen_oapi(self.config, filepath)
-
-        return self.get_response(200, headers_, 'openapi.html', response)
+        return self.get_document_response(headers_, 'openapi')
 
     def conformance(self, headers_, args):
         """
@@ -329,11 +497,7 @@ class API:
 
         headers_['Content-Type'] = self.get_content_type(headers_, args)
 
-        response = {
-            'conformsTo': CONFORMANCE_CLASSES
-        }
-
-        return self.get_response(200, headers_, 'conformance.html', response)
+        return self.get_document_response(headers_, 'conformance')
 
     def collections(self, headers_, args, collection=False):
         """
@@ -348,6 +512,20 @@ class API:
 
         headers_['Content-Type'] = self.get_content_type(headers_, args)
 
+        name = 'collection' if collection else 'collections'
+
+        return self.get_document_response(headers_, name)
+
+    def gen_collections(self, is_html=False, collection=False):
+        """
+        Generate API collections
+
+        :param is_html: `bool` of whether the document is rendered as HTML
+        :param collection: `bool` of whether to emit single collection
+
+        :returns: `dict` of collections, or of the single collection
+        """
+
         collection_info = {
             'id': 'metadata:main',
             'title': self.config['metadata:main']['identification_title'],
@@ -379,15 +557,11 @@ class API:
             response = {
                 'collections': [collection_info]
             }
-            template = 'collections.html'
             url_base = f"{self.config['server']['url']}/collections"
         else:
             response = collection_info
-            template = 'collection.html'
             url_base = f"{self.config['server']['url']}/collections/metadata:main"
 
-        is_html = headers_['Content-Type'] == 'text/html'
-
         response['links'] = [{
             'rel': 'self' if not is_html else 'alternate',
             'type': 'application/json',
@@ -402,7 +576,7 @@ class API:
             'hreflang': self.config['server']['language']
         }]
 
-        return self.get_response(200, headers_, template, response)
+        return response
 
     def queryables(self, headers_, args):
         """
@@ -446,6 +620,7 @@ class API:
             'q'
         ]
         reserved_query_params = [
+            'cursor',
             'f',
             'filter',
             'limit',
@@ -549,7 +724,10 @@ class API:
 
             LOGGER.debug('Transforming AST into filters')
             try:
-                filters = to_filter(ast, self.repository.dbtype, self.query_mappings)
+                filters = to_filter(ast, self.repository.dbtype, self.query_mappings,
+                                    self.repository.spatial_index,
+                                    self.repository.fts_index,
+                                    self.repository.bbox_columns)
                 LOGGER.debug(f'Filter: {filters}')
             except Exception as err:
                 msg = f'CQL evaluator error: {str(err)}'
@@ -593,10 +771,35 @@ class API:
 
         startindex = int(args.get('startindex', 0))
 
+        cursor = None
+        if self.pagination == 'cursor':
+            cursor = args.get('cursor')
+            if cursor is None:  # first page, or paging by startindex
+                cursor = encode_cursor(startindex)
+
+            sortkey = None
+            descending = False
+            if sortby is not None:
+                sortkey = self.query_mappings[sortby].key
+                descending = args['sortby'].startswith('-')
+            try:
+                query, startindex, offset = self.repository.apply_cursor(
+                    query, cursor, sortkey, descending)
+            except ValueError as err:
+                LOGGER.exception(err)
+                return self.get_exception(400, headers_, 'InvalidParameterValue', str(err))
+
+        # record2json does not need the raw XML, anytext or metadata
+        query = self.repository.project(query, [])
+
         LOGGER.debug(f'Query: {query}')
         LOGGER.debug('Querying repository')
-        count = query.count()
-        records = query.limit(limit).offset(startindex).all()
+        if cursor is None:
+            count, records = self.repository.paginate(query, limit, startindex)
+        else:
+            count, records = self.repository.paginate(query, limit, offset)
+            # when seeking, only the records after the cursor are counted
+            count += startindex - offset
 
         returned = len(records)
 
@@ -611,6 +814,7 @@ class API:
         link_args = {**args}
 
         link_args.pop('f', None)
+        link_args.pop('cursor', None)
 
         if stac_item:
             fragment = 'search'
@@ -644,7 +848,7 @@ class API:
             'hreflang': self.config['server']['language']
         }])
 
-        if startindex > 0:
+        if startindex > 0 and cursor is None:
             link_args.pop('startindex', None)
 
             prev = max(0, startindex - limit)
@@ -667,11 +871,17 @@ class API:
 
             url_ = f"{self.config['server']['url']}/{fragment}?{urlencode(link_args)}"
 
+            if cursor is not None:
+                next_ = self.repository.get_cursor(records[-1], next_, sortkey)
+                href = f"{bind_url(url_)}{urlencode({'cursor': next_})}"
+            else:
+                href = f"{bind_url(url_)}startindex={next_}"
+
             response['links'].append({
                 'rel': 'next',
                 'type': 'application/geo+json',
                 'title': 'items (next)',
-                'href': f"{bind_url(url_)}startindex={next_}",
+                'href': href,
                 'hreflang': self.config['server']['language']
             })
 
@@ -698,9 +908,13 @@ class API:
 
         headers_['Content-Type'] = self.get_content_type(headers_, args)
 
+        columns = None
+        if headers_['Content-Type'] != 'application/xml':
+            columns = []
+
         LOGGER.debug(f'Querying repository for item {item}')
         try:
-            record = self.repository.query_ids([item])[0]
+            record = self.repository.query_ids([item], columns)[0]
         except IndexError:
             return self.get_exception(
                     404, headers_, 'InvalidParameterValue', 'item not found')
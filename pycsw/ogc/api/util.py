@@ -38,8 +38,9 @@ import logging
 import mimetypes
 import os
 import re
+import threading
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jinja2.exceptions import TemplateNotFound
 import yaml
 
@@ -57,6 +58,10 @@ STATIC = '{}/static'.format(TEMPLATES)
 mimetypes.add_type('text/plain', '.yaml')
 mimetypes.add_type('text/plain', '.yml')
 
+# Jinja2 environments, memoized per process by templates path and options
+_ENVIRONMENTS = {}
+_ENVIRONMENTS_LOCK = threading.Lock()
+
 
 def get_typed_value(value):
     """
@@ -112,6 +117,29 @@ def match_env_var(value):
     return env_var
 
 
+def match_etag(if_none_match, etag):
+    """
+    Evaluate an If-None-Match header against the ETag of a document, with
+    the weak comparison of RFC 7232 (the ETag of compressed documents is
+    weak)
+
+    :param if_none_match: value of the If-None-Match header, if any
+    :param etag: ETag of the document
+
+    :returns: `bool` of whether the client has the document
+    """
+
+    if not if_none_match:
+        return False
+
+    def opaque_tag(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    tags = [opaque_tag(tag) for tag in if_none_match.split(',')]
+    return '*' in tags or opaque_tag(etag) in tags
+
+
 def yaml_load(fh):
     """
     serializes a YAML files into a pyyaml object
@@ -159,6 +187,42 @@ def to_json(dict_, pretty=False):
                       indent=indent)
 
 
+def get_j2_environment(templates_path, bytecode_cache=None,
+                       auto_reload=True):
+    """
+    get a memoized Jinja2 environment
+
+    Environments keep compiled templates in memory; with ``bytecode_cache``
+    compiled templates are also stored on disk and shared across processes
+
+    :param templates_path: path to templates
+    :param bytecode_cache: directory of compiled templates (optional)
+    :param auto_reload: whether to check templates for changes on disk
+
+    :returns: `jinja2.Environment`
+    """
+
+    key = (templates_path, bytecode_cache, auto_reload)
+
+    with _ENVIRONMENTS_LOCK:
+        if key not in _ENVIRONMENTS:
+            LOGGER.debug('creating Jinja2 environment: {}'.format(key))
+            kwargs = {}
+            if bytecode_cache is not None:
+                os.makedirs(bytecode_cache, exist_ok=True)
+                kwargs['bytecode_cache'] = FileSystemBytecodeCache(
+                    bytecode_cache)
+
+            env = Environment(loader=FileSystemLoader(templates_path),
+                              auto_reload=auto_reload, **kwargs)
+            env.filters['to_json'] = to_json
+            env.globals.update(to_json=to_json)
+
+            _ENVIRONMENTS[key] = env
+
+        return _ENVIRONMENTS[key]
+
+
 def render_j2_template(config, template, data):
     """
     render Jinja2 template
@@ -170,26 +234,31 @@ def render_j2_template(config, template, data):
     :returns: string of rendered template
     """
 
+    try:
+        bytecode_cache = config['server'].get('templates_cache')
+        auto_reload = config['server'].get(
+            'templates_auto_reload', 'true') == 'true'
+    except (KeyError, TypeError):
+        bytecode_cache = None
+        auto_reload = True
+
     custom_templates = False
     try:
         templates_path = config['server']['templates']['path']
-        env = Environment(loader=FileSystemLoader(templates_path))
+        env = get_j2_environment(templates_path, bytecode_cache, auto_reload)
         custom_templates = True
         LOGGER.debug('using custom templates: {}'.format(templates_path))
     except (KeyError, TypeError):
-        env = Environment(loader=FileSystemLoader(TEMPLATES))
+        env = get_j2_environment(TEMPLATES, bytecode_cache, auto_reload)
         LOGGER.debug('using default templates: {}'.format(TEMPLATES))
 
-    env.filters['to_json'] = to_json
-    env.globals.update(to_json=to_json)
-
     try:
         template = env.get_template(template)
     except TemplateNotFound as err:
         if custom_templates:
             LOGGER.debug(err)
             LOGGER.debug('Custom template not found; using default')
-            env = Environment(loader=FileSystemLoader(TEMPLATES))
+            env = get_j2_environment(TEMPLATES, bytecode_cache, auto_reload)
             template = env.get_template(template)
         else:
             raise
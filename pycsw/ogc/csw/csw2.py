@@ -38,6 +38,7 @@ from io import StringIO
 from pycsw.core.etree import etree
 from pycsw import oaipmh, opensearch, sru
 from pycsw.ogc.csw.cql import cql2fes
+from pycsw.ogc.csw.federated import FederatedSearch
 from pycsw.plugins.profiles import profile as pprofile
 import pycsw.plugins.outputschemas
 from pycsw.core import config, log, metadata, util
@@ -742,7 +743,11 @@ class Csw2(object):
                         cql = cql2fes(tmp, self.parent.context.namespaces, fes_version='1.0')
                         self.parent.kvp['constraint']['where'], self.parent.kvp['constraint']['values'] = fes1.parse(cql,
                         self.parent.repository.queryables['_all'], self.parent.repository.dbtype,
-                        self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts)
+                        self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts,
+                        getattr(self.parent.repository, 'spatial_index', None),
+                        getattr(self.parent.repository, 'fts_index', None),
+                        getattr(self.parent.repository, 'bbox_columns', False),
+                        self.parent.ranking)
                         self.parent.kvp['constraint']['_dict'] = xml2dict(etree.tostring(cql), self.parent.context.namespaces)
                     except Exception as err:
                         LOGGER.exception('Invalid CQL query %s', tmp)
@@ -754,8 +759,7 @@ class Csw2(object):
                         schema = os.path.join(self.parent.config.get('server', 'home'),
                         'core', 'schemas', 'ogc', 'filter', '1.1.0', 'filter.xsd')
                         LOGGER.info('Validating Filter %s', self.parent.kvp['constraint'])
-                        schema = etree.XMLSchema(file=schema)
-                        parser = etree.XMLParser(schema=schema, resolve_entities=False)
+                        parser = self.parent.get_parser(schema)
                         doc = etree.fromstring(self.parent.kvp['constraint'], parser)
                         LOGGER.debug('Filter is valid XML')
                         self.parent.kvp['constraint'] = {}
@@ -764,7 +768,11 @@ class Csw2(object):
                         fes1.parse(doc,
                         self.parent.repository.queryables['_all'],
                         self.parent.repository.dbtype,
-                        self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts)
+                        self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts,
+                        getattr(self.parent.repository, 'spatial_index', None),
+                        getattr(self.parent.repository, 'fts_index', None),
+                        getattr(self.parent.repository, 'bbox_columns', False),
+                        self.parent.ranking)
                         self.parent.kvp['constraint']['_dict'] = xml2dict(etree.tostring(doc), self.parent.context.namespaces)
                     except Exception as err:
                         errortext = \
@@ -811,6 +819,43 @@ class Csw2(object):
         if 'startposition' not in self.parent.kvp or not self.parent.kvp['startposition']:
             self.parent.kvp['startposition'] = 1
 
+        cursor = None
+        if self.parent.pagination == 'cursor':
+            if self.parent.kvp.get('cursor'):
+                try:
+                    position = util.decode_cursor(self.parent.kvp['cursor'])[0]
+                except ValueError as err:
+                    return self.exceptionreport('InvalidParameterValue',
+                    'cursor', str(err))
+                cursor = self.parent.kvp['cursor']
+                self.parent.kvp['startposition'] = position + 1
+            else:  # first page, or paging by startposition
+                cursor = util.encode_cursor(int(self.parent.kvp['startposition']) - 1)
+
+        query_args = {}
+        if cursor is not None:
+            query_args['cursor'] = cursor
+
+        # only load the large columns the requested output needs
+        if self.parent.orm == 'sqlalchemy':
+            if self.parent.kvp.get('elementname'):
+                queryables = self.parent.repository.queryables['_all']
+                query_args['columns'] = [queryables[i]['dbcol'] for i in
+                                         self.parent.kvp['elementname']
+                                         if i in queryables]
+            elif self.parent.kvp.get('elementsetname') in ['brief',
+                                                           'summary']:
+                query_args['columns'] = []
+
+        # rank records by spatial overlay with the query geometry, if any
+        if self.parent.ranking.active:
+            query_args['ranking'] = self.parent.ranking
+
+        # stream records from the database to the client, if possible
+        stream = self.parent.streams_records()
+        if stream and self.parent.orm == 'sqlalchemy':
+            query_args['stream'] = True
+
         # query repository
         LOGGER.debug('Querying repository with constraint: %s,\
         sortby: %s, typenames: %s, maxrecords: %s, startposition: %s',
@@ -822,7 +867,8 @@ class Csw2(object):
             constraint=self.parent.kvp['constraint'],
             sortby=self.parent.kvp['sortby'], typenames=self.parent.kvp['typenames'],
             maxrecords=self.parent.kvp['maxrecords'],
-            startposition=int(self.parent.kvp['startposition'])-1)
+            startposition=int(self.parent.kvp['startposition'])-1,
+            **query_args)
         except Exception as err:
             LOGGER.exception('Invalid query syntax.  Query: %s', self.parent.kvp['constraint'])
             LOGGER.exception('Invalid query syntax.  Result: %s', err)
@@ -839,44 +885,18 @@ class Csw2(object):
             LOGGER.debug('DistributedSearch specified (hopCount: %s).',
             self.parent.kvp['hopcount'])
 
-            from owslib.csw import CatalogueServiceWeb
-            from owslib.ows import ExceptionReport
-            for fedcat in \
-            self.parent.config.get('server', 'federatedcatalogues').split(','):
-                LOGGER.debug('Performing distributed search on federated \
-                catalogue: %s.', fedcat)
-                remotecsw = CatalogueServiceWeb(fedcat, version='2.0.2', skip_caps=True)
-                try:
-                    if str(self.parent.request).startswith('http'):
-                        self.parent.request = self.parent.request.split('?')[-1]
-                        self.parent.request = self.parent.request.replace('mode=opensearch', '')
-                    remotecsw.getrecords2(xml=self.parent.request,
-                                          esn=self.parent.kvp['elementsetname'],
-                                          outputschema=self.parent.kvp['outputschema'])
-                    if hasattr(remotecsw, 'results'):
-                        LOGGER.debug(
-                        'Distributed search results from catalogue \
-                        %s: %s.', fedcat, remotecsw.results)
-
-                        remotecsw_matches = int(remotecsw.results['matches'])
-                        plural = 's' if remotecsw_matches != 1 else ''
-                        if remotecsw_matches > 0:
-                            matched = str(int(matched) + remotecsw_matches)
-                            dsresults.append(etree.Comment(
-                            ' %d result%s from %s ' %
-                            (remotecsw_matches, plural, fedcat)))
-
-                            dsresults.append(remotecsw.records)
-                except ExceptionReport as err:
-                    error_string = 'remote CSW %s returned exception: ' % fedcat
+            federated_search = FederatedSearch.from_config(self.parent.config)
+            for fedresult in federated_search.search(self.parent.request):
+                if fedresult.error is not None:
                     dsresults.append(etree.Comment(
-                    ' %s\n\n%s ' % (error_string, err)))
-                    LOGGER.exception(error_string)
-                except Exception as err:
-                    error_string = 'remote CSW %s returned error: ' % fedcat
+                    ' %s ' % fedresult.error.replace('--', '- -')))
+                elif fedresult.matched > 0:
+                    matched = str(int(matched) + fedresult.matched)
+                    plural = 's' if fedresult.matched != 1 else ''
                     dsresults.append(etree.Comment(
-                    ' %s\n\n%s ' % (error_string, err)))
-                    LOGGER.exception(error_string)
+                    ' %d result%s from %s ' %
+                    (fedresult.matched, plural, fedresult.url)))
+                    dsresults.extend(fedresult.records)
 
         if int(matched) == 0:
             returned = nextrecord = '0'
@@ -896,6 +916,14 @@ class Csw2(object):
         LOGGER.debug('Results: matched: %s, returned: %s, next: %s',
         matched, returned, nextrecord)
 
+        if cursor is not None and nextrecord != '0' and results:
+            sortkey = None
+            if self.parent.kvp['sortby'] is not None:
+                sortkey = self.parent.kvp['sortby']['propertyname']
+            self.parent.next_cursor = self.parent.repository.get_cursor(
+                results[-1], int(self.parent.kvp['startposition']) - 1 + len(results),
+                sortkey)
+
         node = etree.Element(util.nspath_eval('csw:GetRecordsResponse',
         self.parent.context.namespaces),
         nsmap=self.parent.context.namespaces, version='2.0.2')
@@ -933,7 +961,12 @@ class Csw2(object):
             return node
 
 
-        if results is not None:
+        if results is not None and stream:
+            LOGGER.info('Streaming records from %s',
+            self.parent.kvp['startposition'])
+            self.parent.stream = (searchresults, results,
+                                  self._write_search_result)
+        elif results is not None:
             if len(results) < int(self.parent.kvp['maxrecords']):
                 max1 = len(results)
             else:
@@ -943,40 +976,7 @@ class Csw2(object):
 
             for res in results:
                 try:
-                    if (self.parent.kvp['outputschema'] ==
-                        'http://www.opengis.net/cat/csw/2.0.2' and
-                        'csw:Record' in self.parent.kvp['typenames']):
-                        # serialize csw:Record inline
-                        searchresults.append(self._write_record(
-                        res, self.parent.repository.queryables['_all']))
-                    elif (self.parent.kvp['outputschema'] ==
-                        'http://www.opengis.net/cat/csw/2.0.2' and
-                        'csw:Record' not in self.parent.kvp['typenames']):
-                        # serialize into csw:Record model
-
-                        for prof in self.parent.profiles['loaded']:
-                            # find source typename
-                            if self.parent.profiles['loaded'][prof].typename in \
-                            self.parent.kvp['typenames']:
-                                typename = self.parent.profiles['loaded'][prof].typename
-                                break
-
-                        util.transform_mappings(
-                            self.parent.repository.queryables['_all'],
-                            self.parent.context.model['typenames'][typename][
-                                'mappings']['csw:Record']
-                        )
-
-                        searchresults.append(self._write_record(
-                        res, self.parent.repository.queryables['_all']))
-                    elif self.parent.kvp['outputschema'] in self.parent.outputschemas.keys():  # use outputschema serializer
-                        searchresults.append(self.parent.outputschemas[self.parent.kvp['outputschema']].write_record(res, self.parent.kvp['elementsetname'], self.parent.context, self.parent.config.get('server', 'url')))
-                    else:  # use profile serializer
-                        searchresults.append(
-                        self.parent.profiles['loaded'][self.parent.kvp['outputschema']].\
-                        write_record(res, self.parent.kvp['elementsetname'],
-                        self.parent.kvp['outputschema'],
-                        self.parent.repository.queryables['_all']))
+                    searchresults.append(self._write_search_result(res))
                 except Exception as err:
                     self.parent.response = self.exceptionreport(
                     'NoApplicableCode', 'service',
@@ -984,11 +984,7 @@ class Csw2(object):
                     return self.parent.response
 
         if len(dsresults) > 0:  # return DistributedSearch results
-            for resultset in dsresults:
-                if isinstance(resultset, etree._Comment):
-                    searchresults.append(resultset)
-                for rec in resultset:
-                    searchresults.append(etree.fromstring(resultset[rec].xml, self.parent.context.parser))
+            searchresults.extend(dsresults)
 
         if 'responsehandler' in self.parent.kvp:  # process the handler
             self.parent._process_responsehandler(etree.tostring(node,
@@ -996,6 +992,43 @@ class Csw2(object):
         else:
             return node
 
+    def _write_search_result(self, res):
+        ''' Serialize a GetRecords result per the requested outputschema '''
+
+        if (self.parent.kvp['outputschema'] ==
+            'http://www.opengis.net/cat/csw/2.0.2' and
+            'csw:Record' in self.parent.kvp['typenames']):
+            # serialize csw:Record inline
+            return self._write_record(
+            res, self.parent.repository.queryables['_all'])
+        elif (self.parent.kvp['outputschema'] ==
+            'http://www.opengis.net/cat/csw/2.0.2' and
+            'csw:Record' not in self.parent.kvp['typenames']):
+            # serialize into csw:Record model
+
+            for prof in self.parent.profiles['loaded']:
+                # find source typename
+                if self.parent.profiles['loaded'][prof].typename in \
+                self.parent.kvp['typenames']:
+                    typename = self.parent.profiles['loaded'][prof].typename
+                    break
+
+            util.transform_mappings(
+                self.parent.repository.queryables['_all'],
+                self.parent.context.model['typenames'][typename][
+                    'mappings']['csw:Record']
+            )
+
+            return self._write_record(
+            res, self.parent.repository.queryables['_all'])
+        elif self.parent.kvp['outputschema'] in self.parent.outputschemas.keys():  # use outputschema serializer
+            return self.parent.outputschemas[self.parent.kvp['outputschema']].write_record(res, self.parent.kvp['elementsetname'], self.parent.context, self.parent.config.get('server', 'url'))
+        else:  # use profile serializer
+            return self.parent.profiles['loaded'][self.parent.kvp['outputschema']].\
+            write_record(res, self.parent.kvp['elementsetname'],
+            self.parent.kvp['outputschema'],
+            self.parent.repository.queryables['_all'])
+
     def getrecordbyid(self, raw=False):
         ''' Handle GetRecordById request '''
 
@@ -1050,8 +1083,8 @@ class Csw2(object):
         if raw:  # GetRepositoryItem request
             LOGGER.debug('GetRepositoryItem request')
             if len(results) > 0:
-                return etree.fromstring(util.getqattr(results[0],
-                self.parent.context.md_core_model['mappings']['pycsw:XML']), self.parent.context.parser)
+                return util.load_record_xml(self.parent.context, util.getqattr(results[0],
+                self.parent.context.md_core_model['mappings']['pycsw:XML']))
 
         for result in results:
             if (util.getqattr(result,
@@ -1122,7 +1155,10 @@ class Csw2(object):
 
         LOGGER.debug('Transaction list: %s', self.parent.kvp['transactions'])
 
-        for ttype in self.parent.kvp['transactions']:
+        transactions = self.parent.kvp['transactions']
+        pending = []
+
+        for position, ttype in enumerate(transactions):
             if ttype['type'] == 'insert':
                 try:
                     record = metadata.parse_record(self.parent.context,
@@ -1140,10 +1176,34 @@ class Csw2(object):
                     return self.exceptionreport('NoApplicableCode',
                     'insert', 'Record requires an identifier')
 
-                # insert new record
-                try:
-                    self.parent.repository.insert(record, 'local',
-                    util.get_today_and_now())
+                pending.append(record)
+
+                # consecutive inserts are written in a single batch
+                if (position + 1 < len(transactions) and
+                    transactions[position + 1]['type'] == 'insert'):
+                    continue
+
+                # insert new records, up to the first failing one
+                if (self.parent.orm == 'sqlalchemy' and
+                    hasattr(self.parent.repository, 'insert_many')):
+                    outcomes = self.parent.repository.insert_many(
+                        pending, stop_on_error=True)
+                else:  # custom repositories insert records one by one
+                    outcomes = []
+                    for record in pending:
+                        try:
+                            self.parent.repository.insert(record, 'local',
+                            util.get_today_and_now())
+                            outcomes.append('inserted')
+                        except Exception as err:
+                            LOGGER.exception('Transaction (insert) failed')
+                            outcomes.append(err)
+                            break
+
+                for record, outcome in zip(pending, outcomes):
+                    if isinstance(outcome, Exception):
+                        return self.exceptionreport('NoApplicableCode',
+                        'insert', 'Transaction (insert) failed: %s.' % str(outcome))
 
                     inserted += 1
                     insertresults.append(
@@ -1151,9 +1211,8 @@ class Csw2(object):
                     self.parent.context.md_core_model['mappings']['pycsw:Identifier']),
                     'title': getattr(record,
                     self.parent.context.md_core_model['mappings']['pycsw:Title'])})
-                except Exception as err:
-                    return self.exceptionreport('NoApplicableCode',
-                    'insert', 'Transaction (insert) failed: %s.' % str(err))
+
+                pending = []
 
             elif ttype['type'] == 'update':
                 if 'constraint' not in ttype:
@@ -1304,9 +1363,9 @@ class Csw2(object):
         else:
             # parse resource into record
             try:
-                records_parsed = metadata.parse_record(self.parent.context,
+                records_parsed = iter(metadata.parse_record(self.parent.context,
                 content, self.parent.repository, self.parent.kvp['resourcetype'],
-                pagesize=self.parent.csw_harvest_pagesize)
+                **self.parent.harvest_options))
             except Exception as err:
                 LOGGER.exception(err)
                 return self.exceptionreport('NoApplicableCode', 'source',
@@ -1316,8 +1375,42 @@ class Csw2(object):
             updated = 0
             ir = []
 
-            LOGGER.debug('Total Records parsed: %d', len(records_parsed))
-            for record in records_parsed:
+            pending = []
+            written = 0
+
+            def kept():
+                # records of earlier batches stay in the repository
+                if written:
+                    return ' (%d records written before the failure are kept)' % written
+                return ''
+
+            def write_pending():
+                # write new and updated records in batches
+                nonlocal written
+                outcomes = []
+                if pending:
+                    outcomes = self.parent.repository.insert_many(pending, 'upsert')
+                    del pending[:]
+
+                errors = [outcome for outcome in outcomes
+                          if isinstance(outcome, Exception)]
+                written += len(outcomes) - len(errors)
+                if errors:
+                    return self.exceptionreport('NoApplicableCode',
+                    'source', 'Harvest failed: %s.%s' % (str(errors[0]), kept()))
+
+            # records are parsed as they are fetched, and written to the
+            # repository as they are parsed
+            while True:
+                try:
+                    record = next(records_parsed)
+                except StopIteration:
+                    break
+                except Exception as err:
+                    LOGGER.exception(err)
+                    return self.exceptionreport('NoApplicableCode', 'source',
+                    'Harvest failed: record parsing failed: %s%s' % (str(err), kept()))
+
                 if self.parent.kvp['resourcetype'] == 'urn:geoss:waf':
                     src = record.source
                 else:
@@ -1369,12 +1462,15 @@ class Csw2(object):
 
                 if len(results) == 0:  # new record, it's a new insert
                     inserted += 1
-                    try:
-                        tmp = self.parent.repository.insert(record, source, insert_date)
-                        if tmp is not None: ir = tmp
-                    except Exception as err:
-                        return self.exceptionreport('NoApplicableCode',
-                        'source', 'Harvest (insert) failed: %s.' % str(err))
+                    if self.parent.config.has_option('repository', 'source'):
+                        try:
+                            tmp = self.parent.repository.insert(record, source, insert_date)
+                            if tmp is not None: ir = tmp
+                        except Exception as err:
+                            return self.exceptionreport('NoApplicableCode',
+                            'source', 'Harvest (insert) failed: %s.' % str(err))
+                    else:
+                        pending.append(record)
                 else:  # existing record, it's an update
                     if source != results[0].source:
                         # same identifier, but different source
@@ -1382,13 +1478,20 @@ class Csw2(object):
                         'source', 'Insert failed: identifier %s in repository\
                         has source %s.' % (identifier, source))
 
-                    try:
-                        self.parent.repository.update(record)
-                    except Exception as err:
-                        return self.exceptionreport('NoApplicableCode',
-                        'source', 'Harvest (update) failed: %s.' % str(err))
+                    pending.append(record)
                     updated += 1
 
+                if len(pending) >= metadata.HARVEST_BATCH_SIZE:
+                    error = write_pending()
+                    if error is not None:
+                        return error
+
+            LOGGER.debug('Total Records parsed: %d', len(ir))
+
+            error = write_pending()
+            if error is not None:
+                return error
+
             if service_identifier is not None:
                 fresh_records = [str(i['identifier']) for i in ir]
                 existing_records = [str(i.identifier) for i in service_results]
@@ -1467,8 +1570,8 @@ class Csw2(object):
             util.getqattr(recobj, self.parent.context.md_core_model['mappings']\
             ['pycsw:Type']) != 'service'):
                 # dump record as is and exit
-                return etree.fromstring(util.getqattr(recobj,
-                self.parent.context.md_core_model['mappings']['pycsw:XML']), self.parent.context.parser)
+                return util.load_record_xml(self.parent.context, util.getqattr(recobj,
+                self.parent.context.md_core_model['mappings']['pycsw:XML']))
 
             etree.SubElement(record,
             util.nspath_eval('dc:identifier', self.parent.context.namespaces)).text = \
@@ -1556,7 +1659,11 @@ class Csw2(object):
                 query['type'] = 'filter'
                 query['where'], query['values'] = fes1.parse(tmp,
                 self.parent.repository.queryables['_all'], self.parent.repository.dbtype,
-                self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts)
+                self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts,
+                getattr(self.parent.repository, 'spatial_index', None),
+                getattr(self.parent.repository, 'fts_index', None),
+                getattr(self.parent.repository, 'bbox_columns', False),
+                self.parent.ranking)
                 query['_dict'] = xml2dict(etree.tostring(tmp), self.parent.context.namespaces)
             except Exception as err:
                 return 'Invalid Filter request: %s' % err
@@ -1570,7 +1677,11 @@ class Csw2(object):
                 cql = cql2fes(tmp.text, self.parent.context.namespaces, fes_version='1.0')
                 query['where'], query['values'] = fes1.parse(cql,
                 self.parent.repository.queryables['_all'], self.parent.repository.dbtype,
-                self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts)
+                self.parent.context.namespaces, self.parent.orm, self.parent.language['text'], self.parent.repository.fts,
+                getattr(self.parent.repository, 'spatial_index', None),
+                getattr(self.parent.repository, 'fts_index', None),
+                getattr(self.parent.repository, 'bbox_columns', False),
+                self.parent.ranking)
                 query['_dict'] = xml2dict(etree.tostring(cql), self.parent.context.namespaces)
             except Exception as err:
                 LOGGER.exception('Invalid CQL request: %s', tmp.text)
@@ -1616,14 +1727,15 @@ class Csw2(object):
             # csw:Insert|csw:Update (with single child) XML document.
             # Only validate non csw:Transaction XML
 
-            if doc.find('.//%s' % util.nspath_eval('csw:Insert',
+            if self.parent.xml_validation == 'off':
+                LOGGER.debug('Request validation disabled')
+            elif doc.find('.//%s' % util.nspath_eval('csw:Insert',
             self.parent.context.namespaces)) is None and \
             len(doc.xpath('//csw:Update/child::*',
             namespaces=self.parent.context.namespaces)) == 0:
 
                 LOGGER.info('Validating %s', postdata)
-                schema = etree.XMLSchema(file=schema)
-                parser = etree.XMLParser(schema=schema, resolve_entities=False)
+                parser = self.parent.get_parser(schema)
                 if hasattr(self.parent, 'soap') and self.parent.soap:
                 # validate the body of the SOAP request
                     doc = etree.fromstring(etree.tostring(doc), parser)
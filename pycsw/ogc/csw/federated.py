@@ -0,0 +1,331 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Distributed search of federated catalogues
+
+Federated catalogues are searched concurrently, on a bounded thread pool,
+with per-catalogue connect and read timeouts and a deadline for the whole
+search.  Catalogues which fail or miss the deadline are reported with
+diagnostics, alongside the results of the others.  Remote responses are
+cached for a short time, keyed by catalogue and normalized request.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import logging
+import threading
+from time import time
+from urllib.parse import parse_qsl, urlencode
+
+import requests
+
+from pycsw.core.etree import PARSER, etree
+from pycsw.core.httpclient import get_client
+from pycsw.core.util import bind_url
+
+LOGGER = logging.getLogger(__name__)
+
+# Maximum number of catalogues searched at the same time
+MAX_WORKERS = 8
+
+# Seconds to connect to a catalogue, and to wait for each read of its
+# response
+CONNECT_TIMEOUT = 5
+TIMEOUT = 30
+
+# Seconds after which catalogues which have not responded are reported as
+# timed out
+DEADLINE = 60
+
+# Seconds remote responses are cached for (0 disables caching), and
+# maximum number of cached responses
+CACHE_TTL = 30
+CACHE_SIZE = 128
+
+# remote responses, by (catalogue, normalized request), shared by all threads
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+_NAMESPACE_CSW30 = 'http://www.opengis.net/cat/csw/3.0'
+
+_FEDERATED_TAGS = ['{%s}FederatedSearchResult' % _NAMESPACE_CSW30,
+                   '{%s}FederatedException' % _NAMESPACE_CSW30]
+
+
+class FederatedResult(object):
+    """Result of the search of a federated catalogue"""
+
+    def __init__(self, url):
+        self.url = url
+        self.matched = 0
+        self.returned = 0
+        self.nextrecord = 0
+        self.records = []
+        self.elapsed = 0  # milliseconds
+        self.cached = False
+
+        # diagnostics, when the search failed
+        self.error = None
+        self.exception_code = None
+        self.locator = None
+
+    def fail(self, error, exception_code='NoApplicableCode', locator=None):
+        """record the failure of the search"""
+
+        self.error = error
+        self.exception_code = exception_code
+        self.locator = locator
+
+
+class FederatedSearch(object):
+    """Concurrent search of federated catalogues"""
+
+    def __init__(self, catalogues, max_workers=MAX_WORKERS,
+                 connect_timeout=CONNECT_TIMEOUT, timeout=TIMEOUT,
+                 deadline=DEADLINE, cache_ttl=CACHE_TTL):
+        self.catalogues = catalogues
+        self.max_workers = int(max_workers)
+        self.connect_timeout = float(connect_timeout)
+        self.timeout = float(timeout)
+        self.deadline = float(deadline)
+        self.cache_ttl = float(cache_ttl)
+
+    @classmethod
+    def from_config(cls, config):
+        """create the search of the catalogues of the [server]
+        configuration"""
+
+        def get(option, default):
+            if config.has_option('server', option):
+                return config.get('server', option)
+            return default
+
+        return cls(config.get('server', 'federatedcatalogues').split(','),
+                   get('federated_max_workers', MAX_WORKERS),
+                   get('federated_connect_timeout', CONNECT_TIMEOUT),
+                   get('federated_timeout', TIMEOUT),
+                   get('federated_deadline', DEADLINE),
+                   get('federated_cache_ttl', CACHE_TTL))
+
+    def search(self, request):
+        """
+        forward a GetRecords request to the federated catalogues
+
+        :param request: request body (POST) or URL (GET)
+
+        :returns: list of `FederatedResult`, in the order of the catalogues
+        """
+
+        method, data = get_request(request)
+        key = (method, normalize_request(method, data))
+
+        results = [FederatedResult(url) for url in self.catalogues]
+        futures = {}
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(results))))
+        try:
+            for result in results:
+                content = self._get_cached(result.url, key)
+                if content is not None:
+                    LOGGER.debug('Cached distributed search results from '
+                                 'catalogue %s', result.url)
+                    result.cached = True
+                    parse_response(result, content)
+                    continue
+
+                LOGGER.info('Performing distributed search on federated '
+                            'catalogue: %s', result.url)
+                future = executor.submit(self._fetch, result.url, method,
+                                         data)
+                futures[future] = result
+
+            done, _ = wait(futures, timeout=self.deadline)
+        finally:
+            # do not wait for catalogues which missed the deadline
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        for future, result in futures.items():
+            if future not in done:
+                LOGGER.warning('Distributed search on catalogue %s timed out',
+                               result.url)
+                result.elapsed = int(self.deadline * 1000)
+                result.fail('remote CSW %s timed out after %s seconds' %
+                            (result.url, self.deadline))
+                continue
+
+            try:
+                content, result.elapsed = future.result()
+            except Exception as err:
+                LOGGER.exception('remote CSW %s returned error', result.url)
+                result.fail('remote CSW %s returned error: %s' %
+                            (result.url, err))
+                continue
+
+            if parse_response(result, content):
+                self._set_cached(result.url, key, content)
+
+        return results
+
+    def _fetch(self, url, method, data):
+        """fetch the response of a catalogue, and its elapsed time"""
+
+        start_time = time()
+
+        headers = None
+        timeout = (self.connect_timeout, self.timeout)
+
+        if method == 'POST':
+            headers = {'Content-Type': 'application/xml'}
+        else:
+            url = '%s%s' % (bind_url(url), data)
+            data = None
+        response = get_client().request(method, url, data=data,
+                                        headers=headers, timeout=timeout,
+                                        raise_for_status=False)
+        if (response.status_code >= 400 and
+                b'ExceptionReport' not in response.content):
+            raise requests.HTTPError('HTTP %d for url: %s' %
+                                     (response.status_code, url))
+
+        return response.content, int((time() - start_time) * 1000)
+
+    def _get_cached(self, url, key):
+        """cached response of a catalogue, if any"""
+
+        if self.cache_ttl <= 0:
+            return None
+
+        with _CACHE_LOCK:
+            expires, content = _CACHE.get((url, key), (0, None))
+            if expires < time():
+                _CACHE.pop((url, key), None)
+                return None
+            _CACHE.move_to_end((url, key))
+            return content
+
+    def _set_cached(self, url, key, content):
+        """cache the response of a catalogue"""
+
+        if self.cache_ttl <= 0:
+            return
+
+        with _CACHE_LOCK:
+            _CACHE[(url, key)] = (time() + self.cache_ttl, content)
+            _CACHE.move_to_end((url, key))
+            while len(_CACHE) > CACHE_SIZE:
+                _CACHE.popitem(last=False)
+
+
+def get_request(request):
+    """
+    derive the request forwarded to federated catalogues
+
+    :param request: request body (POST) or URL (GET)
+
+    :returns: tuple of HTTP method and request body or query string
+    """
+
+    if isinstance(request, bytes):
+        return 'POST', request
+
+    if str(request).startswith('http'):
+        request = request.split('?')[-1]
+    return 'GET', request.replace('mode=opensearch', '')
+
+
+def normalize_request(method, data):
+    """
+    normalize a request, so that equivalent requests are cached once
+
+    :param method: HTTP method
+    :param data: request body (POST) or query string (GET)
+
+    :returns: normalized request
+    """
+
+    if method == 'GET':
+        return urlencode(sorted((key.lower(), value) for key, value in
+                                parse_qsl(data, keep_blank_values=True)))
+
+    try:
+        parser = etree.XMLParser(resolve_entities=False,
+                                 remove_blank_text=True,
+                                 remove_comments=True)
+        return etree.tostring(etree.fromstring(data, parser), method='c14n')
+    except etree.XMLSyntaxError:
+        return data
+
+
+def parse_response(result, content):
+    """
+    parse the GetRecords response of a catalogue into its result
+
+    :param result: `FederatedResult` of the catalogue
+    :param content: response body
+
+    :returns: `bool` of whether the response holds search results
+    """
+
+    try:
+        node = etree.fromstring(content, PARSER)
+    except etree.XMLSyntaxError as err:
+        result.fail('remote CSW %s returned error: %s' % (result.url, err))
+        return False
+
+    if etree.QName(node).localname == 'ExceptionReport':
+        code, locator = 'NoApplicableCode', None
+        exception = node.find('{*}Exception')
+        if exception is not None:
+            code = exception.get('exceptionCode', code)
+            locator = exception.get('locator')
+        text = node.findtext('{*}Exception/{*}ExceptionText') or ''
+
+        LOGGER.warning('remote CSW %s returned exception: %s', result.url,
+                       text)
+        result.fail('remote CSW %s returned exception: %s' %
+                    (result.url, text), code, locator)
+        return False
+
+    searchresults = node.find('{*}SearchResults')
+    if searchresults is None:
+        result.fail('remote CSW %s returned error: no search results' %
+                    result.url)
+        return False
+
+    result.matched = int(searchresults.get('numberOfRecordsMatched', 0))
+    result.returned = int(searchresults.get('numberOfRecordsReturned', 0))
+    result.nextrecord = int(searchresults.get('nextRecord', 0))
+    result.records = [child for child in searchresults.iterchildren(
+        etree.Element) if child.tag not in _FEDERATED_TAGS]
+
+    LOGGER.debug('Distributed search results from catalogue %s: '
+                 'matched: %d, returned: %d', result.url, result.matched,
+                 result.returned)
+    return True
@@ -92,7 +92,8 @@ MODEL = {
 }
 
 
-def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='english', fts=False):
+def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='english', fts=False,
+          spatial_index=None, fts_index=None, bbox_columns=False, ranking=None):
     """OGC Filter object support"""
 
     boq = None
@@ -163,7 +164,9 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
                     boolean_true = 'true'
                     boolean_false = 'false'
 
-                return "%s = %s" % (_get_spatial_operator(queryables['pycsw:BoundingBox'], elem, dbtype, nsmap), boolean_true)
+                return _get_spatial_prefilter(
+                    "%s = %s" % (_get_spatial_operator(queryables['pycsw:BoundingBox'], elem, dbtype, nsmap, ranking=ranking), boolean_true),
+                    elem, dbtype, nsmap, spatial_index, bbox_columns)
             else:
                 pval = elem.find(util.nspath_eval('fes20:Literal', nsmap)).text
 
@@ -209,7 +212,15 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
 
                     LOGGER.debug('new value: %s', pvalue)
 
-            values.append(pvalue)
+            fts_query = None
+            if fts_index is not None and fname is None and com_op == 'like':
+                fts_query = util.fts_index_query(fts_index, pname, pvalue)
+
+            if fts_query is not None:
+                LOGGER.debug('SQLite FTS5 specific search: %s', fts_query)
+                values.append(fts_query)
+            else:
+                values.append(pvalue)
 
             if boq == ' not ':
                 if fname is not None:
@@ -219,6 +230,9 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
                     LOGGER.debug('PostgreSQL FTS specific search')
                     expression = ("%s is null or not plainto_tsquery('%s', %s) @@ anytext_tsvector" %
                                   (anytext, language, assign_param()))
+                elif fts_query is not None:
+                    expression = "%s is null or not %s" % \
+                                   (pname, util.fts_index_filter(fts_index, pname, assign_param()))
                 else:
                     LOGGER.debug('PostgreSQL non-FTS specific search')
                     expression = "%s is null or not %s %s %s" % \
@@ -231,6 +245,8 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
                     LOGGER.debug('PostgreSQL FTS specific search')
                     expression = ("plainto_tsquery('%s', %s) @@ anytext_tsvector" %
                                   (language, assign_param()))
+                elif fts_query is not None:
+                    expression = util.fts_index_filter(fts_index, pname, assign_param())
                 else:
                     LOGGER.debug('PostgreSQL non-FTS specific search')
                     expression = "%s %s %s" % (pname, com_op, assign_param())
@@ -261,7 +277,8 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
                 queries.append("%s = %s" %
                                (_get_spatial_operator(
                                    queryables['pycsw:BoundingBox'],
-                                   child.xpath('child::*')[0], dbtype, nsmap),
+                                   child.xpath('child::*')[0], dbtype, nsmap,
+                                   ranking=ranking),
                                    boolean_false))
             else:
                 LOGGER.debug('fes20:Not / comparison operator detected: %s', child.tag)
@@ -280,18 +297,20 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
                     queries.append("%s = %s or %s is null" %
                                    (_get_spatial_operator(
                                        queryables['pycsw:BoundingBox'],
-                                       child, dbtype, nsmap), boolean_false,
+                                       child, dbtype, nsmap, ranking=ranking), boolean_false,
                                        queryables['pycsw:BoundingBox']))
                 else:
                     queries.append("%s = %s" %
                                    (_get_spatial_operator(
                                        queryables['pycsw:BoundingBox'],
-                                       child, dbtype, nsmap), boolean_false))
+                                       child, dbtype, nsmap, ranking=ranking), boolean_false))
             else:
-                queries.append("%s = %s" %
+                queries.append(_get_spatial_prefilter("%s = %s" %
                                (_get_spatial_operator(
                                    queryables['pycsw:BoundingBox'],
-                                   child, dbtype, nsmap), boolean_true))
+                                   child, dbtype, nsmap, ranking=ranking), boolean_true),
+                               child, dbtype, nsmap, spatial_index,
+                               bbox_columns))
 
         elif child.tag == util.nspath_eval('fes20:FeatureId', nsmap):
             LOGGER.debug('fes20:FeatureId filter detected')
@@ -315,7 +334,40 @@ def parse(element, queryables, dbtype, nsmap, orm='sqlalchemy', language='englis
     return where, values
 
 
-def _get_spatial_operator(geomattr, element, dbtype, nsmap, postgis_geometry_column='wkb_geometry'):
+def _get_spatial_prefilter(expression, element, dbtype, nsmap, spatial_index=None,
+                           bbox_columns=False):
+    """prepend an index driven pre-filter to a spatial predicate expression,
+    so that the exact predicate is only evaluated on candidate rows: the
+    SQLite R*Tree spatial index if any, else the numeric bounding box columns
+    (PostGIS native geometries are indexed already)"""
+
+    if dbtype not in ['sqlite', 'sqlite3']:
+        spatial_index = None
+    if dbtype == 'postgresql+postgis+native':
+        bbox_columns = False
+
+    if spatial_index is None and not bbox_columns:
+        return expression
+
+    distance = element.find(util.nspath_eval('fes20:Distance', nsmap))
+    distance = 'false' if distance is None else distance.text
+
+    wkt = gml3.Geometry(element, nsmap).wkt
+    predicate = etree.QName(element).localname.lower()
+
+    prefilter = util.spatial_index_filter(spatial_index, wkt, predicate, distance)
+    if prefilter is None and bbox_columns:
+        prefilter = util.bbox_columns_filter(wkt, predicate, distance)
+
+    if prefilter is None:
+        return expression
+
+    LOGGER.debug('Applying spatial pre-filter')
+    return '(%s and %s)' % (prefilter, expression)
+
+
+def _get_spatial_operator(geomattr, element, dbtype, nsmap, postgis_geometry_column='wkb_geometry',
+                          ranking=None):
     """return the spatial predicate function"""
     property_name = element.find(util.nspath_eval('fes20:ValueReference', nsmap))
     distance = element.find(util.nspath_eval('fes20:Distance', nsmap))
@@ -334,7 +386,8 @@ def _get_spatial_operator(geomattr, element, dbtype, nsmap, postgis_geometry_col
     geometry = gml3.Geometry(element, nsmap)
 
     #make decision to apply spatial ranking to results
-    set_spatial_ranking(geometry)
+    if ranking is not None:
+        ranking.set_query_geometry(geometry)
 
     spatial_predicate = etree.QName(element).localname.lower()
 
@@ -407,29 +460,3 @@ def _get_comparison_operator(element):
 
     element_name = etree.QName(element).localname
     return MODEL['ComparisonOperators']['fes20:%s' % element_name]['opvalue']
-
-def set_spatial_ranking(geometry):
-    """Given that we have a spatial query in fes20:Filter we check the type of geometry
-    and set the ranking variables"""
-
-    if util.ranking_enabled:
-        if geometry.type in ['Polygon', 'Envelope']:
-            util.ranking_pass = True
-            util.ranking_query_geometry = geometry.wkt
-        elif geometry.type in ['LineString', 'Point']:
-            from shapely.geometry.base import BaseGeometry
-            from shapely.geometry import box
-            from shapely.wkt import loads,dumps
-            ls = loads(geometry.wkt)
-            b = ls.bounds
-            if geometry.type == 'LineString':
-                tmp_box = box(b[0],b[1],b[2],b[3])
-                tmp_wkt = dumps(tmp_box)
-                if tmp_box.area > 0:
-                    util.ranking_pass = True
-                    util.ranking_query_geometry = tmp_wkt
-            elif geometry.type == 'Point':
-                tmp_box = box((float(b[0])-1.0),(float(b[1])-1.0),(float(b[2])+1.0),(float(b[3])+1.0))
-                tmp_wkt = dumps(tmp_box)
-                util.ranking_pass = True
-                util.ranking_query_geometry = tmp_wkt
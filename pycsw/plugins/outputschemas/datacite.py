@@ -100,7 +100,7 @@ def write_record(result, esn, context, url=None):
     # Check if we already have DataCite formatted metadata
     if esn == 'full' and typename == 'datacite':
         # dump record as is and exit
-        return etree.fromstring(util.getqattr(result, context.md_core_model['mappings']['pycsw:XML']), context.parser)
+        return util.load_record_xml(context, util.getqattr(result, context.md_core_model['mappings']['pycsw:XML']))
     # Otherwise build XML tree from available metadata
     node = etree.Element(util.nspath_eval('resource', NAMESPACES))
     node.attrib[util.nspath_eval('xsi:schemaLocation', context.namespaces)] = \
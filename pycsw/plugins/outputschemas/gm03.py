@@ -44,7 +44,7 @@ def write_record(result, esn, context, url=None):
     if typename == 'gm03:TRANSFER':
         # dump record as is and exit
         # TODO: provide brief and summary elementsetname's
-        return etree.fromstring(util.getqattr(result, context.md_core_model['mappings']['pycsw:XML']), context.parser)
+        return util.load_record_xml(context, util.getqattr(result, context.md_core_model['mappings']['pycsw:XML']))
 
     node = etree.Element(util.nspath_eval('gm03:TRANSFER', NAMESPACES), nsmap=NAMESPACES)
 
@@ -391,21 +391,22 @@ class APISO(profile.Profile):
         typename = util.getqattr(result, self.context.md_core_model['mappings']['pycsw:Typename'])
         is_iso_anyway = False
 
-        xml_blob = util.getqattr(result, self.context.md_core_model['mappings']['pycsw:XML'])
+        if esn == 'full':  # only full output may need the raw XML
+            xml_blob = util.getqattr(result, self.context.md_core_model['mappings']['pycsw:XML'])
 
-        #xml_blob_decoded = bytes.fromhex(xml_blob[2:]).decode('utf-8')
+            #xml_blob_decoded = bytes.fromhex(xml_blob[2:]).decode('utf-8')
 
-        if isinstance(xml_blob, bytes):
-            iso_string = b'<gmd:MD_Metadata>'
-        else:
-            iso_string = '<gmd:MD_Metadata>'
+            if isinstance(xml_blob, bytes):
+                iso_string = b'<gmd:MD_Metadata>'
+            else:
+                iso_string = '<gmd:MD_Metadata>'
 
-        if caps is None and xml_blob is not None and xml_blob.startswith(iso_string):
-            is_iso_anyway = True
+            if caps is None and xml_blob is not None and xml_blob.startswith(iso_string):
+                is_iso_anyway = True
 
         if (esn == 'full' and (typename == 'gmd:MD_Metadata' or is_iso_anyway)):
             # dump record as is and exit
-            return etree.fromstring(xml_blob, self.context.parser)
+            return util.load_record_xml(self.context, xml_blob)
 
         node = etree.Element(util.nspath_eval('gmd:MD_Metadata', self.namespaces))
         node.attrib[util.nspath_eval('xsi:schemaLocation', self.context.namespaces)] = \
@@ -129,7 +129,7 @@ class EBRIM(profile.Profile):
 
         if esn == 'full' and typename == 'rim:RegistryObject':
             # dump record as is and exit
-            return etree.fromstring(util.getqattr(result, queryables['pycsw:XML']['dbcol']), self.context.parser)
+            return util.load_record_xml(self.context, util.getqattr(result, queryables['pycsw:XML']['dbcol']))
 
         node = etree.Element(util.nspath_eval('rim:ExtrinsicObject', self.namespaces))
         node.attrib[util.nspath_eval('xsi:schemaLocation', self.context.namespaces)] = \
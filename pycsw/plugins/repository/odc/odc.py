@@ -60,7 +60,7 @@ class OpenDataCatalogRepository(object):
             connection.connection.create_function(
             'get_anytext', 1, repository.get_anytext)
             connection.connection.create_function(
-            'get_geometry_area', 1, util.get_geometry_area)
+            'get_geometry_area', 1, repository.get_geometry_area)
 
         # generate core queryables db and obj bindings
         self.queryables = {}
@@ -135,16 +135,20 @@ class OpenDataCatalogRepository(object):
 
         # apply sorting, limit and offset
         if sortby is not None:
+            pname = sortby['propertyname']
             if 'spatial' in sortby and sortby['spatial']:  # spatial sort
-                desc = False
-                if sortby['order'] == 'DESC':
-                    desc = True
-                query = query.all()
-                return [str(total), sorted(query, key=lambda x: float(util.get_geometry_area(getattr(x, sortby['propertyname']))), reverse=desc)[startposition:startposition+int(maxrecords)]]
+                if self.dbtype not in ['sqlite', 'sqlite3']:
+                    desc = False
+                    if sortby['order'] == 'DESC':
+                        desc = True
+                    query = query.all()
+                    return [str(total), sorted(query, key=lambda x: float(repository.get_geometry_area(getattr(x, sortby['propertyname']))), reverse=desc)[startposition:startposition+int(maxrecords)]]
+                # sort and page in the database, so that only a page of
+                # records is loaded
+                query = query.extra(select={'geometry_area': 'cast(get_geometry_area(%s) as real)' % pname})
+                pname = 'geometry_area'
             if sortby['order'] == 'DESC':
-                pname = '-%s' % sortby['propertyname']
-            else:
-                pname = sortby['propertyname']
+                pname = '-%s' % pname
             return [str(total), \
             query.order_by(pname)[startposition:startposition+int(maxrecords)]]
         else:  # no sort
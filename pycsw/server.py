@@ -38,22 +38,246 @@ from urllib.parse import parse_qsl, splitquery, urlparse
 from io import StringIO
 import configparser
 import sys
+import threading
 from time import time
+from types import MappingProxyType
 import wsgiref.util
 
+from pycsw.core import etree as petree
 from pycsw.core.etree import etree
 from pycsw import oaipmh, opensearch, sru
 from pycsw.plugins.profiles import profile as pprofile
 import pycsw.plugins.outputschemas
-from pycsw.core import config, log, util
+from pycsw.core import config, httpclient, log, metadata, ranking, util
 from pycsw.ogc.csw import csw2, csw3
 
 LOGGER = logging.getLogger(__name__)
 
+# placeholder of the records of a streamed response
+STREAM_MARKER = ' pycsw:records '
+
+# process-wide applications, memoized by configuration file path or
+# content
+_APPLICATIONS = {}
+_APPLICATIONS_LOCK = threading.Lock()
+
+# Maximum number of applications memoized by configuration content
+MAX_CONFIG_APPLICATIONS = 32
+
+
+class Application(object):
+    """ Request independent pycsw state
+
+    Holds everything that is derived from the configuration alone
+    (configuration, custom repository mappings, outputschemas and profile
+    plugins) so that it can be built once and shared by all requests
+    served by a process, possibly from several threads.  Shared structures
+    are read-only mappings; anything a request modifies lives in its
+    ``Csw`` instance and request-scoped ``StaticContext``.
+    """
+
+    def __init__(self, rtconfig):
+        """ Initialize application """
+
+        self.rtconfig = rtconfig
+
+        LOGGER.info('Loading user configuration')
+        if isinstance(rtconfig, configparser.ConfigParser):  # serialized already
+            self.config = rtconfig
+        else:
+            self.config = configparser.ConfigParser(
+                interpolation=util.EnvInterpolation())
+            if isinstance(rtconfig, dict):  # dictionary
+                for section, options in rtconfig.items():
+                    self.config.add_section(section)
+                    for k, v in options.items():
+                        self.config.set(section, k, v)
+            else:  # configuration file
+                import codecs
+                with codecs.open(rtconfig, encoding='utf-8') as scp:
+                    self.config.read_file(scp)
+
+        # set server.home safely
+        # TODO: make this more abstract
+        self.config.set(
+            'server', 'home',
+            os.path.dirname(os.path.join(os.path.dirname(__file__), '..'))
+        )
+
+        # set OGC schemas location
+        if not self.config.has_option('server', 'ogc_schemas_base'):
+            self.config.set('server', 'ogc_schemas_base',
+                            config.StaticContext().ogc_schemas_base)
+
+        # look for tablename, set 'records' as default
+        if not self.config.has_section('repository'):
+            self.config.add_section('repository')
+        if not self.config.has_option('repository', 'table'):
+            self.config.set('repository', 'table', 'records')
+
+        log.setup_logger(self.config)
+
+        # outbound HTTP requests (harvesting, distributed searching)
+        httpclient.configure(httpclient.get_client_options(self.config))
+
+        # load user-defined mappings if they exist
+        self.mappings = None
+        self.mappings_error = None
+        if self.config.has_option('repository', 'mappings'):
+            # override default repository mappings
+            try:
+                import imp
+                module = self.config.get('repository', 'mappings')
+                if os.sep in module:  # filepath
+                    modulename = '%s' % os.path.splitext(module)[0].replace(
+                        os.sep, '.')
+                    mappings = imp.load_source(modulename, module)
+                else:  # dotted name
+                    mappings = __import__(module, fromlist=[''])
+                LOGGER.info('Loading custom repository mappings '
+                             'from %s', module)
+                self.mappings = MappingProxyType(dict(
+                    mappings.MD_CORE_MODEL,
+                    mappings=MappingProxyType(
+                        dict(mappings.MD_CORE_MODEL['mappings']))))
+            except Exception as err:
+                LOGGER.exception('Could not load custom mappings: %s', err)
+                self.mappings_error = str(err)
+
+        # load user-defined max attempt to retry db connection
+        try:
+            self.max_retries = int(self.config.get("repository", "max_retries"))
+        except configparser.NoOptionError:
+            self.max_retries = 5
+
+        # load XML validation mode and compile request schemas
+        self.xml_validation = 'cached'
+        if self.config.has_option('server', 'xml_validation'):
+            self.xml_validation = self.config.get('server', 'xml_validation')
+        if self.xml_validation not in petree.VALIDATION_MODES:
+            raise RuntimeError('Invalid server.xml_validation value: %s' %
+                               self.xml_validation)
+        if self.xml_validation == 'cached':
+            petree.warm_schemas(get_request_schemas(
+                self.config.get('server', 'home')))
+
+        # load pagination mode
+        self.pagination = 'offset'
+        if self.config.has_option('server', 'pagination'):
+            self.pagination = self.config.get('server', 'pagination')
+        if self.pagination not in ['offset', 'cursor']:
+            raise RuntimeError('Invalid server.pagination value: %s' %
+                               self.pagination)
+        if (self.pagination == 'cursor' and
+                self.config.has_option('repository', 'source')):
+            LOGGER.warning('Cursor pagination requires the default '
+                           'repository; using offset pagination')
+            self.pagination = 'offset'
+
+        # load outputschemas
+        LOGGER.info('Loading outputschemas')
+
+        outputschemas = {}
+        for osch in pycsw.plugins.outputschemas.__all__:
+            output_schema_module = __import__(
+                'pycsw.plugins.outputschemas.%s' % osch)
+            mod = getattr(output_schema_module.plugins.outputschemas, osch)
+            outputschemas[mod.NAMESPACE] = mod
+        self.outputschemas = MappingProxyType(outputschemas)
+
+        # load profile plugins; instances are created per request
+        self.profiles = None
+        if self.config.has_option('server', 'profiles'):
+            self.profiles = MappingProxyType(pprofile.load_profiles(
+                os.path.join('pycsw', 'plugins', 'profiles'),
+                pprofile.Profile,
+                self.config.get('server', 'profiles')
+            )['plugins'])
+
+    def get_config(self):
+        """ Return a request-scoped copy of the configuration """
+
+        config_ = configparser.ConfigParser(
+            interpolation=util.EnvInterpolation())
+        config_.read_dict({
+            section: dict(self.config.items(section, raw=True))
+            for section in self.config.sections()
+        })
+        return config_
+
+
+def get_request_schemas(home):
+    """ Return the XML Schemas CSW request documents are validated against """
+
+    schemas = os.path.join(home, 'core', 'schemas', 'ogc')
+
+    return [
+        os.path.join(schemas, 'csw', '2.0.2', 'CSW-discovery.xsd'),
+        os.path.join(schemas, 'csw', '2.0.2', 'CSW-publication.xsd'),
+        os.path.join(schemas, 'filter', '1.1.0', 'filter.xsd'),
+        os.path.join(schemas, 'filter', '2.0', '_wrapper.xsd')
+    ] + [
+        os.path.join(schemas, 'cat', 'csw', '3.0', 'csw%s.xsd' % request)
+        for request in ['GetCapabilities', 'GetDomain', 'GetRecords',
+                        'GetRecordById', 'Harvest', 'Transaction',
+                        'UnHarvest']
+    ]
+
+
+def config_digest(rtconfig):
+    """ Return a hashable digest of the content of a ``dict`` or
+    ``ConfigParser`` configuration """
+
+    if isinstance(rtconfig, configparser.ConfigParser):
+        rtconfig = {section: dict(rtconfig.items(section, raw=True))
+                    for section in rtconfig.sections()}
+
+    return tuple(sorted(
+        (section, tuple(sorted((k, str(v)) for k, v in options.items())))
+        for section, options in rtconfig.items()))
+
+
+def get_application(rtconfig):
+    """ Return the process-wide application for a given configuration
+
+    Applications built from a configuration file are memoized by file path
+    and modification time, so that a changed file is picked up on the next
+    request.  Applications built from a ``dict`` or ``ConfigParser`` are
+    memoized by content (see ``config_digest``), up to
+    ``MAX_CONFIG_APPLICATIONS`` of them.
+    """
+
+    if not isinstance(rtconfig, str):
+        key = ('config', config_digest(rtconfig))
+
+        with _APPLICATIONS_LOCK:
+            if key not in _APPLICATIONS:
+                LOGGER.info('Creating new application from configuration')
+                configs = [k for k in _APPLICATIONS if k[0] == 'config']
+                for stale in configs[:max(len(configs) -
+                                          MAX_CONFIG_APPLICATIONS + 2, 0)]:
+                    del _APPLICATIONS[stale]
+                application = Application(rtconfig)
+                _APPLICATIONS[key] = application
+                # a ConfigParser is completed in place (server.home, ...)
+                _APPLICATIONS[('config', config_digest(rtconfig))] = application
+            return _APPLICATIONS[key]
+
+    key = (os.path.abspath(rtconfig), os.stat(rtconfig).st_mtime)
+
+    with _APPLICATIONS_LOCK:
+        if key not in _APPLICATIONS:
+            LOGGER.info('Creating new application: %s', rtconfig)
+            for stale in [k for k in _APPLICATIONS if k[0] == key[0]]:
+                del _APPLICATIONS[stale]
+            _APPLICATIONS[key] = Application(rtconfig)
+        return _APPLICATIONS[key]
+
 
 class Csw(object):
     """ Base CSW server """
-    def __init__(self, rtconfig=None, env=None, version='3.0.0'):
+    def __init__(self, rtconfig=None, env=None, version='3.0.0',
+                 application=None):
         """ Initialize CSW """
 
         if not env:
@@ -61,10 +285,11 @@ class Csw(object):
         else:
             self.environ = env
 
+        # request-scoped model and namespaces; dispatch and the
+        # OpenSearch, OAI-PMH and SRU handlers extend them per request
         self.context = config.StaticContext()
 
         # Lazy load this when needed
-        # (it will permanently update global cfg namespaces)
         self.sruobj = None
         self.opensearchobj = None
         self.oaipmhobj = None
@@ -81,6 +306,12 @@ class Csw(object):
         self.profiles = None
         self.manager = False
         self.outputschemas = {}
+        self.xml_validation = 'cached'
+        self.pagination = 'offset'
+        self.next_cursor = None
+        self.streaming = False
+        self.stream = None
+        self.raw_xml = False
         self.mimetype = 'application/xml; charset=UTF-8'
         self.encoding = 'UTF-8'
         self.pretty_print = 0
@@ -97,23 +328,14 @@ class Csw(object):
             self.iface = csw2.Csw2(server_csw=self)
             self.context.set_model('csw')
 
-        # load user configuration
+        # load process-wide application state and a request-scoped
+        # copy of the user configuration
         try:
             LOGGER.info('Loading user configuration')
-            if isinstance(rtconfig, configparser.ConfigParser):  # serialized already
-                self.config = rtconfig
-            else:
-                self.config = configparser.ConfigParser(
-                    interpolation=util.EnvInterpolation())
-                if isinstance(rtconfig, dict):  # dictionary
-                    for section, options in rtconfig.items():
-                        self.config.add_section(section)
-                        for k, v in options.items():
-                            self.config.set(section, k, v)
-                else:  # configuration file
-                    import codecs
-                    with codecs.open(rtconfig, encoding='utf-8') as scp:
-                        self.config.read_file(scp)
+            if application is None:
+                application = get_application(rtconfig)
+            self.application = application
+            self.config = self.application.get_config()
         except Exception as err:
             msg = 'Could not load configuration'
             LOGGER.exception('%s %s: %s', msg, rtconfig, err)
@@ -121,13 +343,6 @@ class Csw(object):
                 'NoApplicableCode', 'service', msg)
             return
 
-        # set server.home safely
-        # TODO: make this more abstract
-        self.config.set(
-            'server', 'home',
-            os.path.dirname(os.path.join(os.path.dirname(__file__), '..'))
-        )
-
         if 'PYCSW_IS_CSW' in env and env['PYCSW_IS_CSW']:
             self.config.set('server', 'url', self.config['server']['url'].rstrip('/') + '/csw')
         if 'PYCSW_IS_OPENSEARCH' in env and env['PYCSW_IS_OPENSEARCH']:
@@ -137,16 +352,9 @@ class Csw(object):
         self.context.pycsw_home = self.config.get('server', 'home')
         self.context.url = self.config.get('server', 'url')
 
-        log.setup_logger(self.config)
-
         LOGGER.info('running configuration %s', rtconfig)
         LOGGER.debug('QUERY_STRING: %s', self.environ['QUERY_STRING'])
 
-        # set OGC schemas location
-        if not self.config.has_option('server', 'ogc_schemas_base'):
-            self.config.set('server', 'ogc_schemas_base',
-                            self.context.ogc_schemas_base)
-
         # set mimetype
         if self.config.has_option('server', 'mimetype'):
             self.mimetype = self.config.get('server', 'mimetype').encode()
@@ -164,10 +372,18 @@ class Csw(object):
                 self.config.get('server', 'pretty_print') == 'true'):
             self.pretty_print = 1
 
+        # set GetRecords streaming
+        if (self.config.has_option('server', 'streaming') and
+                self.config.get('server', 'streaming') == 'true'):
+            self.streaming = True
+
+        # set whether stored records are output as is
+        if (self.config.has_option('server', 'raw_xml') and
+                self.config.get('server', 'raw_xml') == 'true'):
+            self.raw_xml = True
+
         # set Spatial Ranking option
-        if (self.config.has_option('server', 'spatial_ranking') and
-                self.config.get('server', 'spatial_ranking') == 'true'):
-            util.ranking_enabled = True
+        self.ranking = ranking.SpatialRanking.from_config(self.config)
 
         # set language default
         if self.config.has_option('server', 'language'):
@@ -183,42 +399,19 @@ class Csw(object):
         LOGGER.debug('Configuration: %s.', self.config)
         LOGGER.debug('Model: %s.', self.context.model)
 
-        # load user-defined mappings if they exist
-        if self.config.has_option('repository', 'mappings'):
-            # override default repository mappings
-            try:
-                import imp
-                module = self.config.get('repository', 'mappings')
-                if os.sep in module:  # filepath
-                    modulename = '%s' % os.path.splitext(module)[0].replace(
-                        os.sep, '.')
-                    mappings = imp.load_source(modulename, module)
-                else:  # dotted name
-                    mappings = __import__(module, fromlist=[''])
-                LOGGER.info('Loading custom repository mappings '
-                             'from %s', module)
-                self.context.md_core_model = mappings.MD_CORE_MODEL
-                self.context.refresh_dc(mappings.MD_CORE_MODEL)
-            except Exception as err:
-                LOGGER.exception('Could not load custom mappings: %s', err)
-                self.response = self.iface.exceptionreport(
-                    'NoApplicableCode', 'service',
-                    'Could not load repository.mappings')
-
-        # load user-defined max attempt to retry db connection
-        try:
-            self.max_retries = int(self.config.get("repository", "max_retries"))
-        except configparser.NoOptionError:
-            self.max_retries = 5
-
-        # load outputschemas
-        LOGGER.info('Loading outputschemas')
+        # apply user-defined mappings if they exist
+        if self.application.mappings_error is not None:
+            self.response = self.iface.exceptionreport(
+                'NoApplicableCode', 'service',
+                'Could not load repository.mappings')
+        elif self.application.mappings is not None:
+            self.context.md_core_model = self.application.mappings
+            self.context.refresh_dc(self.application.mappings)
 
-        for osch in pycsw.plugins.outputschemas.__all__:
-            output_schema_module = __import__(
-                'pycsw.plugins.outputschemas.%s' % osch)
-            mod = getattr(output_schema_module.plugins.outputschemas, osch)
-            self.outputschemas[mod.NAMESPACE] = mod
+        self.max_retries = self.application.max_retries
+        self.outputschemas = self.application.outputschemas
+        self.xml_validation = self.application.xml_validation
+        self.pagination = self.application.pagination
 
         LOGGER.debug('Outputschemas loaded: %s.', self.outputschemas)
         LOGGER.debug('Namespaces: %s', self.context.namespaces)
@@ -230,6 +423,13 @@ class Csw(object):
         else:
             return path
 
+    def get_parser(self, schema):
+        """ return XML parser for request documents as per server.xml_validation """
+        if self.xml_validation == 'off':
+            return self.context.parser
+        return petree.get_validating_parser(
+            schema, self.xml_validation == 'cached')
+
     def dispatch_wsgi(self):
         """ WSGI handler """
 
@@ -281,7 +481,8 @@ class Csw(object):
     def oaipmh(self):
         """ enable OAI-PMH """
         if not self.oaipmhobj:
-            self.oaipmhobj = oaipmh.OAIPMH(self.context, self.config)
+            self.oaipmhobj = oaipmh.OAIPMH(self.context, self.config,
+                                           self.pagination)
         return self.oaipmhobj
 
     def dispatch(self, writer=sys.stdout, write_headers=True):
@@ -335,7 +536,6 @@ class Csw(object):
         ops = self.context.model['operations']
         constraints = self.context.model['constraints']
         # generate domain model
-        # NOTE: We should probably avoid this sort of mutable state for WSGI
         if 'GetDomain' not in ops:
             ops['GetDomain'] = self.context.gen_domains()
 
@@ -368,12 +568,11 @@ class Csw(object):
                 self.config.get('server', 'maxrecords')]
 
         # load profiles
-        if self.config.has_option('server', 'profiles'):
-            self.profiles = pprofile.load_profiles(
-                os.path.join('pycsw', 'plugins', 'profiles'),
-                pprofile.Profile,
-                self.config.get('server', 'profiles')
-            )
+        if self.application.profiles is not None:
+            self.profiles = {
+                'plugins': self.application.profiles,
+                'loaded': {}
+            }
 
             for prof in self.profiles['plugins'].keys():
                 tmp = self.profiles['plugins'][prof](self.context.model,
@@ -389,14 +588,17 @@ class Csw(object):
             LOGGER.debug('Profiles loaded: %s' % list(self.profiles['loaded'].keys()))
 
         # init repository
-        # look for tablename, set 'records' as default
-        if not self.config.has_option('repository', 'table'):
-            self.config.set('repository', 'table', 'records')
-
         repo_filter = None
         if self.config.has_option('repository', 'filter'):
             repo_filter = self.config.get('repository', 'filter')
 
+        paging = 'window'
+        if self.config.has_option('repository', 'paging'):
+            paging = self.config.get('repository', 'paging')
+
+        check_xml = (self.config.has_option('repository', 'check_xml') and
+                     self.config.get('repository', 'check_xml') == 'true')
+
         if self.config.has_option('repository', 'source'):  # load custom repository
             rs = self.config.get('repository', 'source')
             rs_modname, rs_clsname = rs.rsplit('.', 1)
@@ -437,7 +639,10 @@ class Csw(object):
                             self.context,
                             self.environ.get('local.app_root', None),
                             self.config.get('repository', 'table'),
-                            repo_filter
+                            repo_filter,
+                            paging,
+                            repository.get_pool_options(self.config),
+                            check_xml
                         )
                         LOGGER.debug(
                             'Repository loaded (local): %s.' % self.repository.dbtype)
@@ -583,6 +788,14 @@ class Csw(object):
                     import uuid
                     self.kvp['requestid'] = str(uuid.uuid4())
 
+            if (self.raw_xml and self.mode == 'csw' and
+                    not self.asynchronous and
+                    self.kvp.get('outputformat') != 'application/json'):
+                # splice stored records into the response without parsing
+                # them (OpenSearch, SRU, OAI-PMH and JSON output transform
+                # the response)
+                self.context.raw_records = []
+
             if self.kvp['request'] == 'GetCapabilities':
                 self.response = self.iface.getcapabilities()
             elif self.kvp['request'] == 'DescribeRecord':
@@ -627,7 +840,7 @@ class Csw(object):
             LOGGER.info('OAI-PMH mode detected; processing response.')
             self.response = self.oaipmh().response(
                 self.response, self.oaiargs, self.repository,
-                self.config.get('server', 'url')
+                self.config.get('server', 'url'), self.next_cursor
             )
 
         return self._write_response()
@@ -664,6 +877,28 @@ class Csw(object):
         """ Handle Harvest request """
         return self.iface.harvest()
 
+    def streams_records(self):
+        """ Whether GetRecords results can be streamed to the client
+
+        Records are streamed when ``server.streaming`` is enabled, unless
+        the response is post-processed as a whole (OpenSearch, SRU, OAI-PMH,
+        response handlers and distributed searches) or needs
+        the last record before the response starts (cursor pagination)
+        """
+
+        if not self.streaming or self.mode != 'csw' or self.asynchronous:
+            return False
+
+        if self.pagination != 'offset' or 'responsehandler' in self.kvp:
+            return False
+
+        if (self.config.has_option('server', 'federatedcatalogues') and
+                self.kvp.get('distributedsearch') and
+                int(self.kvp.get('hopcount', 0)) > 0):
+            return False
+
+        return True
+
     def _write_response(self):
         """ Generate response """
         # set HTTP response headers and XML declaration
@@ -673,25 +908,38 @@ class Csw(object):
 
         LOGGER.info('Writing response.')
 
+        json_output = (isinstance(self.kvp, dict) and
+                       self.kvp.get('outputformat') == 'application/json')
+
+        if self.stream is not None and not json_output:
+            # placeholder of the records streamed after the response head
+            self.stream[0].append(etree.Comment(STREAM_MARKER))
+
         if hasattr(self, 'soap') and self.soap:
             self._gen_soap_wrapper()
 
-        if etree.__version__ >= '3.5.0':  # remove superfluous namespaces
+        if (etree.__version__ >= '3.5.0' and  # remove superfluous namespaces
+                self.response.tag is not etree.Comment):
             etree.cleanup_namespaces(self.response,
                                      keep_ns_prefixes=self.context.keep_ns_prefixes)
 
-        response = etree.tostring(self.response,
-                                  pretty_print=self.pretty_print,
-                                  encoding='unicode')
-
-        if (isinstance(self.kvp, dict) and 'outputformat' in self.kvp and
-                self.kvp['outputformat'] == 'application/json'):
+        if json_output:
             self.contenttype = self.kvp['outputformat']
             from pycsw.core.formats import fmt_json
-            response = fmt_json.xml2json(response,
-                                         self.context.namespaces,
-                                         self.pretty_print)
+            if self.stream is not None:
+                LOGGER.debug('Streaming response')
+                return [self.context.response_codes[self.status],
+                        self._stream_json_response()]
+            # convert the response tree, without serializing it to XML
+            response = fmt_json.element2json(self.response,
+                                             self.context.namespaces,
+                                             self.pretty_print)
         else:  # it's XML
+            response = etree.tostring(self.response,
+                                      pretty_print=self.pretty_print,
+                                      encoding='unicode')
+            response = util.splice_raw_records(self.context, response)
+
             if 'outputformat' in self.kvp:
                 self.contenttype = self.kvp['outputformat']
             else:
@@ -707,9 +955,94 @@ class Csw(object):
         s = (u'%s%s%s' % (xmldecl, appinfo, response)).encode(self.encoding)
         LOGGER.debug('Response code: %s',
                      self.context.response_codes[self.status])
+
+        marker = ('<!--%s-->' % STREAM_MARKER).encode(self.encoding)
+        if self.stream is not None and marker in s:
+            LOGGER.debug('Streaming response')
+            return [self.context.response_codes[self.status],
+                    self._stream_response(*s.split(marker, 1))]
+
         LOGGER.debug('Response:\n%s', s)
         return [self.context.response_codes[self.status], s]
 
+    def _stream_response(self, head, tail):
+        """ Generate the chunks of a streamed GetRecords response
+
+        The records set by the request handler in ``self.stream`` are
+        serialized one at a time between the ``head`` and ``tail`` of the
+        response document
+        """
+
+        target, records, write_record = self.stream
+        records = iter(records)
+
+        yield head
+
+        while True:
+            # the document is closed if fetching records fails midway
+            try:
+                record = next(records)
+            except StopIteration:
+                break
+            except Exception as err:
+                LOGGER.exception('Fetching streamed records failed')
+                yield (u'<!-- Fetching records failed: %s -->' %
+                       str(err).replace('--', '- -')).encode(self.encoding)
+                break
+
+            try:
+                record = write_record(record)
+                if record.tag is etree.Comment:  # stored record, as is
+                    record = util.splice_raw_records(
+                        self.context, etree.tostring(record, encoding='unicode'))
+                    yield record.encode(self.encoding)
+                    continue
+                etree.cleanup_namespaces(record)
+                yield etree.tostring(record, pretty_print=self.pretty_print,
+                                     encoding=self.encoding)
+            except Exception as err:
+                LOGGER.exception('Record serialization failed')
+                yield (u'<!-- Record serialization failed: %s -->' %
+                       str(err).replace('--', '- -')).encode(self.encoding)
+                break
+
+        yield tail
+
+    def _stream_json_response(self):
+        """ Generate the chunks of a streamed GetRecords JSON response
+
+        The records set by the request handler in ``self.stream`` are
+        converted to JSON one at a time, as members of the JSON of the
+        element they belong to
+        """
+
+        from pycsw.core.formats import fmt_json
+
+        target, records, write_record = self.stream
+
+        def elements():
+            records_ = iter(records)
+            while True:
+                try:
+                    record = next(records_)
+                except StopIteration:
+                    break
+                except Exception:
+                    LOGGER.exception('Fetching streamed records failed')
+                    break
+                try:
+                    record = write_record(record)
+                    etree.cleanup_namespaces(record)
+                except Exception:
+                    LOGGER.exception('Record serialization failed')
+                    break
+                yield record
+
+        for chunk in fmt_json.iter_json(self.response,
+                                        self.context.namespaces, target,
+                                        elements(), self.pretty_print):
+            yield chunk.encode(self.encoding)
+
     def _gen_soap_wrapper(self):
         """ Generate SOAP wrapper """
         LOGGER.info('Writing SOAP wrapper.')
@@ -813,6 +1146,19 @@ class Csw(object):
                 self.csw_harvest_pagesize = int(
                     self.config.get('manager', 'csw_harvest_pagesize'))
 
+            # concurrency and retries of CSW and WAF harvesting
+            self.harvest_options = {
+                'pagesize': self.csw_harvest_pagesize,
+                'workers': metadata.HARVEST_WORKERS,
+                'retries': metadata.HARVEST_RETRIES,
+                'backoff': metadata.HARVEST_BACKOFF
+            }
+            for option, type_ in [('workers', int), ('retries', int),
+                                  ('backoff', float)]:
+                if self.config.has_option('manager', 'harvest_%s' % option):
+                    self.harvest_options[option] = type_(
+                        self.config.get('manager', 'harvest_%s' % option))
+
     def _test_manager(self):
         """ Verify that transactions are allowed """
 
@@ -54,15 +54,28 @@
 # http://localhost:8000/
 #
 
-import gzip
-from io import BytesIO
+from collections import OrderedDict
 import os
 import sys
+import threading
+import zlib
 
 import configparser
-from urllib.parse import unquote
+from urllib.parse import parse_qsl, unquote, urlencode
 
 from pycsw import server
+from pycsw.core.util import bind_url
+
+# content codings responses are compressed with, by order of preference
+COMPRESSION_ENCODINGS = ['gzip', 'deflate']
+
+# default size (bytes) below which responses are not worth compressing
+COMPRESSION_MIN_SIZE = 1024
+
+# compressed forms of cacheable documents, by ETag, coding and level
+COMPRESSION_CACHE_SIZE = 64
+_COMPRESSED = OrderedDict()
+_COMPRESSED_LOCK = threading.Lock()
 
 
 def application(env, start_response):
@@ -72,7 +85,9 @@ def application(env, start_response):
 
     status, headers, contents = application_dispatcher(env)
     start_response(status, list(headers.items()))
-    return [contents]
+    if isinstance(contents, (bytes, str)):
+        return [contents]
+    return contents  # streamed response
 
 
 def application_dispatcher(env):
@@ -84,19 +99,33 @@ def application_dispatcher(env):
     csw = server.Csw(configuration_path, env)
     status, contents = csw.dispatch_wsgi()
     headers = {
-        'Content-Length': str(len(contents)),
         'Content-Type': str(csw.contenttype)
     }
-    if "gzip" in env.get("HTTP_ACCEPT_ENCODING", ""):
+    streamed = not isinstance(contents, (bytes, str))
+    if not streamed:
+        headers['Content-Length'] = str(len(contents))
+    next_cursor = getattr(csw, 'next_cursor', None)
+    if (isinstance(next_cursor, str) and csw.mode == 'csw' and
+            env['REQUEST_METHOD'] == 'GET'):
+        # advertise the next page of cursor paginated GetRecords requests
+        kvp = [(k, v) for k, v in parse_qsl(env.get('QUERY_STRING', ''))
+               if k.lower() not in ['cursor', 'startposition']]
+        kvp.append(('cursor', next_cursor))
+        headers['Link'] = '<%s%s>; rel="next"' % (
+            bind_url(csw.config.get('server', 'url')), urlencode(kvp))
+    encoding = negotiate_encoding(env.get("HTTP_ACCEPT_ENCODING", ""))
+    if encoding is not None:
         try:
-            compression_level = int(
-                csw.config.get("server", "gzip_compresslevel"))
-            contents, compress_headers = compress_response(
-                contents, compression_level)
+            compression_level, min_size = get_compression_options(
+                csw.config, csw.contenttype)
+            contents, compress_headers = compress_contents(
+                contents, encoding, compression_level, min_size)
+            if not streamed:
+                headers['Content-Length'] = str(len(contents))
             headers.update(compress_headers)
         except configparser.NoOptionError:
             print(
-                "The client requested a gzip compressed response. However, "
+                "The client requested a compressed response. However, "
                 "the server does not specify the 'gzip_compresslevel' option. "
                 "Returning an uncompressed response..."
             )
@@ -106,15 +135,17 @@ def application_dispatcher(env):
     return status, headers, contents
 
 
-def compress_response(response, compression_level):
-    """Compress pycsw's response with gzip
+def compress_response(response, compression_level, encoding='gzip'):
+    """Compress pycsw's response with gzip or deflate
 
     Parameters
     ----------
-    response: str
+    response: bytes
         The already processed CSW request
     compression_level: int
         Level of compression to use in gzip algorithm
+    encoding: str
+        Content coding to compress with (``gzip`` or ``deflate``)
 
     Returns
     -------
@@ -125,16 +156,207 @@ def compress_response(response, compression_level):
 
     """
 
-    buf = BytesIO()
-    gzipfile = gzip.GzipFile(mode='wb', fileobj=buf,
-                             compresslevel=compression_level)
-    gzipfile.write(response)
-    gzipfile.close()
-    compressed_response = buf.getvalue()
-    compression_headers = {'Content-Encoding': 'gzip'}
+    # wbits=31 writes a gzip header and trailer, 15 a zlib (deflate) one
+    wbits = 15 if encoding == 'deflate' else 31
+
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, wbits)
+    compressed_response = compressor.compress(response) + compressor.flush()
+    compression_headers = {'Content-Encoding': encoding}
     return compressed_response, compression_headers
 
 
+def compress_response_iter(chunks, compression_level, encoding='gzip'):
+    """Compress a streamed pycsw response with gzip or deflate, chunk by
+    chunk
+
+    Parameters
+    ----------
+    chunks: iterable
+        The chunks (bytes) of the streamed CSW response
+    compression_level: int
+        Level of compression to use in gzip algorithm
+    encoding: str
+        Content coding to compress with (``gzip`` or ``deflate``)
+
+    Returns
+    -------
+    generator
+        The compressed chunks of the response
+    dict
+        Extra HTTP headers that are useful for the response
+
+    """
+
+    # wbits=31 writes a gzip header and trailer, 15 a zlib (deflate) one
+    wbits = 15 if encoding == 'deflate' else 31
+
+    def compress():
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, wbits)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    compression_headers = {'Content-Encoding': encoding}
+    return compress(), compression_headers
+
+
+def compress_contents(contents, encoding, compression_level,
+                      min_size=COMPRESSION_MIN_SIZE, cache_key=None):
+    """Compress a response, unless it is too small to be worth it
+
+    Streamed responses (iterables of chunks) are compressed incrementally.
+    Compressed forms of cacheable responses are kept in memory when given
+    a ``cache_key`` (e.g. the ETag of the response)
+
+    Parameters
+    ----------
+    contents: bytes or iterable
+        The response, or the chunks of a streamed response
+    encoding: str
+        Content coding to compress with (see ``negotiate_encoding``)
+    compression_level: int
+        Level of compression to use
+    min_size: int
+        Size (bytes) below which responses are left uncompressed
+    cache_key: str, optional
+        Key identifying the response contents
+
+    Returns
+    -------
+    bytes or iterable
+        The (compressed) response
+    dict
+        Extra HTTP headers that are useful for the response
+
+    """
+
+    vary_headers = {'Vary': 'Accept-Encoding'}
+
+    if not isinstance(contents, (bytes, str)):
+        contents, compression_headers = compress_response_iter(
+            contents, compression_level, encoding)
+        compression_headers.update(vary_headers)
+        return contents, compression_headers
+
+    if len(contents) < min_size:
+        return contents, vary_headers
+
+    key = (cache_key, encoding, compression_level)
+    if cache_key is not None:
+        with _COMPRESSED_LOCK:
+            if key in _COMPRESSED:
+                _COMPRESSED.move_to_end(key)
+                return _COMPRESSED[key]
+
+    contents, compression_headers = compress_response(
+        contents, compression_level, encoding)
+    compression_headers.update(vary_headers)
+
+    if cache_key is not None:
+        with _COMPRESSED_LOCK:
+            _COMPRESSED[key] = (contents, compression_headers)
+            while len(_COMPRESSED) > COMPRESSION_CACHE_SIZE:
+                _COMPRESSED.popitem(last=False)
+
+    return contents, compression_headers
+
+
+def negotiate_encoding(accept_encoding):
+    """Choose the content coding of a response from an Accept-Encoding
+    header, honouring quality values
+
+    Parameters
+    ----------
+    accept_encoding: str
+        Value of the Accept-Encoding request header
+
+    Returns
+    -------
+    str
+        The preferred content coding (see ``COMPRESSION_ENCODINGS``), or
+        ``None`` if the response is not to be compressed
+
+    """
+
+    qvalues = {}
+    for coding in accept_encoding.split(','):
+        coding, _, params = coding.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[coding] = qvalue
+
+    if 'x-gzip' in qvalues and 'gzip' not in qvalues:
+        qvalues['gzip'] = qvalues['x-gzip']
+
+    encoding, best = None, 0.0
+    for coding in COMPRESSION_ENCODINGS:
+        qvalue = qvalues.get(coding, qvalues.get('*', 0.0))
+        if qvalue > best:
+            encoding, best = coding, qvalue
+
+    # unless the client explicitly prefers uncompressed responses
+    if qvalues.get('identity', 0.0) > best:
+        return None
+
+    return encoding
+
+
+def get_compression_options(config, contenttype):
+    """Get the compression level and minimum size of a response
+
+    The level is set by ``server.gzip_compresslevel``, or by
+    ``server.gzip_compresslevel_<format>`` for the format (``xml``,
+    ``json``, ``html``...) of the response content type
+
+    Parameters
+    ----------
+    config: ConfigParser
+        pycsw configuration
+    contenttype: str
+        Content type of the response
+
+    Returns
+    -------
+    int
+        Level of compression to use
+    int
+        Size (bytes) below which responses are left uncompressed
+
+    Raises
+    ------
+    configparser.NoOptionError
+        If compression is not enabled for the content type
+
+    """
+
+    min_size = COMPRESSION_MIN_SIZE
+    if config.has_option('server', 'gzip_min_size'):
+        min_size = int(config.get('server', 'gzip_min_size'))
+
+    # application/xml, application/atom+xml, text/xml... -> xml
+    format_ = contenttype.split(';')[0].strip().lower()
+    format_ = format_.rpartition('/')[2].rpartition('+')[2]
+
+    option = 'gzip_compresslevel_%s' % format_
+    if format_ and config.has_option('server', option):
+        compression_level = int(config.get('server', option))
+    else:
+        compression_level = int(config.get('server', 'gzip_compresslevel'))
+
+    return compression_level, min_size
+
+
 def get_pycsw_root_path(process_environment, request_environment=None,
                         root_path_key="PYCSW_ROOT"):
     """Get pycsw's root path.
@@ -29,7 +29,7 @@
 #
 # =================================================================
 
-from configparser import ConfigParser
+from configparser import ConfigParser, NoOptionError
 import os
 from pathlib import Path
 import sys
@@ -39,7 +39,8 @@ from flask import Flask, Blueprint, make_response, request
 from pycsw.core.util import parse_ini_config
 from pycsw.ogc.api.records import API
 from pycsw.ogc.api.util import STATIC
-from pycsw.wsgi import application_dispatcher
+from pycsw.wsgi import (application_dispatcher, compress_contents,
+                        get_compression_options, negotiate_encoding)
 
 
 APP = Flask(__name__, static_folder=STATIC, static_url_path='/static')
@@ -72,6 +73,63 @@ def get_response(result: tuple):
     return response
 
 
+@APP.teardown_request
+def remove_session(exception=None):
+    """
+    Release the repository session of the request thread
+
+    :param exception: exception raised by the request, if any
+
+    :returns: `None`
+    """
+
+    api_.repository.session.remove()
+
+
+@APP.after_request
+def compress_response(response):
+    """
+    Compress the response, if enabled and accepted by the client
+
+    CSW responses are already compressed by the CSW dispatcher.  Compressed
+    forms of documents with an ETag are cached in memory, and sent with a
+    weak ETag, as they are not byte for byte the document the ETag stands
+    for
+
+    :param response: Response instance
+
+    :returns: Response instance
+    """
+
+    if (response.direct_passthrough or response.is_streamed or
+            'Content-Encoding' in response.headers):
+        return response
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    try:
+        compression_level, min_size = get_compression_options(
+            APP.config['PYCSW_CONFIG'],
+            response.headers.get('Content-Type', ''))
+    except NoOptionError:
+        return response
+
+    etag = response.headers.get('ETag')
+    content, headers = compress_contents(
+        response.get_data(), encoding, compression_level, min_size, etag)
+    response.set_data(content)
+    response.headers.update(headers)
+
+    # not modified responses validate the compressed document of the client
+    if (etag is not None and not etag.startswith('W/') and
+            ('Content-Encoding' in headers or response.status_code == 304)):
+        response.headers['ETag'] = 'W/%s' % etag
+
+    return response
+
+
 @BLUEPRINT.route('/')
 def landing_page():
     """
@@ -154,7 +212,9 @@ def items():
     if 'search' in request.url_rule.rule:
         stac_item = True
 
-    return get_response(api_.items(dict(request.headers), request.json, dict(request.args), stac_item))
+    return get_response(api_.items(dict(request.headers),
+                                   request.get_json(silent=True),
+                                   dict(request.args), stac_item))
 
 
 @BLUEPRINT.route('/stac/collections/metadata:main/items/<item>')
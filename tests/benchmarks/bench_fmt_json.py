@@ -0,0 +1,105 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Benchmarks for the conversion of CSW responses to JSON
+
+Measures the conversion of GetRecords responses of increasing sizes by
+serializing the response tree to XML and parsing it again (``xml2json``)
+and by walking the response tree (``element2json``).
+
+Run from the root of the repository:
+
+    python tests/benchmarks/bench_fmt_json.py [--iterations 50]
+"""
+
+import argparse
+import copy
+import os
+import timeit
+
+from lxml import etree
+
+from pycsw.core.config import StaticContext
+from pycsw.core.formats import fmt_json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+RESPONSE = os.path.join(ROOT, 'tests', 'functionaltests', 'suites', 'cite',
+                        'expected',
+                        'post_8fb13dc3-5818-45e2-9e29-46abc16e7d38.xml')
+
+SIZES = [10, 100, 1000]
+
+
+def get_response(size):
+    """Build a GetRecords response tree with ``size`` records"""
+
+    response = etree.parse(RESPONSE).getroot()
+    results = response.find('{http://www.opengis.net/cat/csw/2.0.2}'
+                            'SearchResults')
+    records = list(results)
+    for record in records:
+        results.remove(record)
+    for index in range(size):
+        results.append(copy.deepcopy(records[index % len(records)]))
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', '-n', type=int, default=50,
+                        help='Number of conversions per measurement')
+    args = parser.parse_args()
+
+    namespaces = StaticContext().namespaces
+
+    conversions = {
+        'xml2json': lambda response: fmt_json.xml2json(
+            etree.tostring(response, encoding='unicode'), namespaces),
+        'element2json': lambda response: fmt_json.element2json(
+            response, namespaces)
+    }
+
+    print('{:<10} {}'.format(
+        'records', ''.join('{:>20}'.format('%s (ms)' % name)
+                           for name in conversions)))
+
+    for size in SIZES:
+        response = get_response(size)
+
+        results = []
+        for convert in conversions.values():
+            elapsed = timeit.timeit(lambda: convert(response),
+                                    number=args.iterations)
+            results.append(elapsed / args.iterations * 1000)
+
+        print('{:<10} {}'.format(
+            size, ''.join('{:>20.2f}'.format(result) for result in results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Benchmarks for the pycsw CSW server
+
+Compares rebuilding all configuration derived state on every request (the
+behaviour prior to process-wide applications) with reusing the memoized
+``pycsw.server.Application`` of a worker process.
+
+Run from the root of the repository:
+
+    python tests/benchmarks/bench_server.py [--iterations 200]
+"""
+
+import argparse
+import os
+import timeit
+from wsgiref.util import setup_testing_defaults
+
+from pycsw import server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+CONFIG = os.path.join(ROOT, 'tests', 'functionaltests', 'suites', 'cite',
+                      'default.cfg')
+
+REQUESTS = {
+    'GetCapabilities': 'service=CSW&version=2.0.2&request=GetCapabilities',
+    'GetRecords': ('service=CSW&version=2.0.2&request=GetRecords'
+                   '&typenames=csw:Record&elementsetname=full'
+                   '&resulttype=results&maxrecords=10'),
+}
+
+
+def get_environ(query_string):
+    """Build a WSGI environment for a GET request"""
+
+    env = {
+        'QUERY_STRING': query_string,
+        'REQUEST_METHOD': 'GET',
+        'local.app_root': ROOT
+    }
+    setup_testing_defaults(env)
+    return env
+
+
+def per_request(query_string):
+    """Rebuild the application for every request"""
+
+    application = server.Application(CONFIG)
+    csw = server.Csw(CONFIG, get_environ(query_string),
+                     application=application)
+    return csw.dispatch_wsgi()
+
+
+def process_wide(query_string):
+    """Reuse the memoized application of this process"""
+
+    csw = server.Csw(CONFIG, get_environ(query_string))
+    return csw.dispatch_wsgi()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', '-n', type=int, default=200,
+                        help='Number of requests per measurement')
+    args = parser.parse_args()
+
+    print('{:<16} {:>16} {:>16} {:>8}'.format(
+        'request', 'per-request (ms)', 'process (ms)', 'speedup'))
+
+    for name, query_string in REQUESTS.items():
+        results = []
+        for func in [per_request, process_wide]:
+            func(query_string)  # warm up
+            elapsed = timeit.timeit(lambda: func(query_string),
+                                    number=args.iterations)
+            results.append(elapsed / args.iterations * 1000)
+
+        print('{:<16} {:>16.2f} {:>16.2f} {:>7.2f}x'.format(
+            name, results[0], results[1], results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Benchmarks for the validation of CSW POST requests
+
+Measures POST GetRecords throughput for each ``server.xml_validation``
+mode: ``full`` (schemas compiled per request), ``cached`` (schemas compiled
+once per process) and ``off``.
+
+Run from the root of the repository:
+
+    python tests/benchmarks/bench_xml_validation.py [--iterations 200]
+"""
+
+import argparse
+import configparser
+from io import BytesIO
+import os
+import timeit
+from wsgiref.util import setup_testing_defaults
+
+from pycsw import server
+from pycsw.core import util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+SUITES = os.path.join(ROOT, 'tests', 'functionaltests', 'suites')
+
+REQUESTS = {
+    'CSW 2.0.2': (
+        os.path.join(SUITES, 'cite', 'default.cfg'),
+        os.path.join(SUITES, 'cite', 'post',
+                     '0c976d98-c896-4b10-b1fe-a22ef50434e7.xml')
+    ),
+    'CSW 3.0': (
+        os.path.join(SUITES, 'csw30', 'default.cfg'),
+        os.path.join(SUITES, 'csw30', 'post', 'GetRecords-anytext.xml')
+    )
+}
+
+MODES = ['full', 'cached', 'off']
+
+
+def get_application(config_path, mode):
+    """Build an application with a given validation mode"""
+
+    config = configparser.ConfigParser(interpolation=util.EnvInterpolation())
+    with open(config_path, encoding='utf-8') as fh:
+        config.read_file(fh)
+    config.set('server', 'xml_validation', mode)
+    return server.Application(config)
+
+
+def get_environ(body):
+    """Build a WSGI environment for a POST request"""
+
+    env = {
+        'QUERY_STRING': '',
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'local.app_root': ROOT
+    }
+    setup_testing_defaults(env)
+    return env
+
+
+def post(application, body):
+    """Dispatch a POST request"""
+
+    csw = server.Csw(application.config, get_environ(body),
+                     application=application)
+    return csw.dispatch_wsgi()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', '-n', type=int, default=200,
+                        help='Number of requests per measurement')
+    args = parser.parse_args()
+
+    print('{:<12} {}'.format(
+        'request', ''.join('{:>16}'.format('%s (req/s)' % mode)
+                           for mode in MODES)))
+
+    for name, (config_path, request_path) in REQUESTS.items():
+        with open(request_path, 'rb') as fh:
+            body = fh.read()
+
+        results = []
+        for mode in MODES:
+            application = get_application(config_path, mode)
+            post(application, body)  # warm up
+            elapsed = timeit.timeit(lambda: post(application, body),
+                                    number=args.iterations)
+            results.append(args.iterations / elapsed)
+
+        print('{:<12} {}'.format(
+            name, ''.join('{:>16.1f}'.format(result) for result in results)))
+
+
+if __name__ == '__main__':
+    main()
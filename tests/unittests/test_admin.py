@@ -0,0 +1,242 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Unit tests for pycsw.core.admin"""
+
+import os
+
+import pytest
+
+from pycsw.core import admin, metadata, repository
+from pycsw.core.config import StaticContext
+
+pytestmark = pytest.mark.unit
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                    'functionaltests', 'suites', 'cite', 'data')
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Empty SQLite repository"""
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+
+    yield database
+
+    repository.Repository.invalidate(database, 'records')
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_load_records(database, jobs):
+    context = StaticContext()
+
+    loaded = admin.load_records(context, database, 'records', DATA,
+                                batch_size=4, jobs=jobs)
+    assert len(loaded) == 11
+
+    repo = repository.Repository(database, context)
+    assert repo.query({})[0] == '11'
+
+    # existing records are not loaded again unless forced
+    assert admin.load_records(context, database, 'records', DATA,
+                              jobs=jobs) == ()
+    assert len(admin.load_records(context, database, 'records', DATA,
+                                  force_update=True, jobs=jobs)) == 11
+    assert repo.query({})[0] == '11'
+
+
+def test_load_records_jobs_context(tmp_path):
+    # a context with custom mappings, which worker processes parse with
+    context = StaticContext()
+    mappings = context.md_core_model['mappings']
+    mappings['pycsw:Title'], mappings['pycsw:AlternateTitle'] = (
+        mappings['pycsw:AlternateTitle'], mappings['pycsw:Title'])
+
+    rows = {}
+    for jobs in [1, 2]:
+        database = 'sqlite:///{}'.format(tmp_path / 'records{}.db'.format(jobs))
+        admin.setup_db(database, 'records', str(tmp_path))
+        assert len(admin.load_records(context, database, 'records', DATA,
+                                      jobs=jobs)) == 11
+
+        repo = repository.Repository(database, context)
+        rows[jobs] = sorted(
+            (record.identifier, record.title, record.title_alternate)
+            for record in repo.session.query(repo.dataset))
+        repository.Repository.invalidate(database, 'records')
+
+    assert rows[2] == rows[1]
+    assert all(title is None for _, title, _ in rows[1])
+
+
+def test_load_records_manifest(database, tmp_path):
+    context = StaticContext()
+    repo = repository.Repository(database, context)
+
+    data = tmp_path / 'data'
+    data.mkdir()
+    for name in os.listdir(DATA):
+        if name.endswith('.xml'):
+            with open(os.path.join(DATA, name), 'rb') as fh:
+                (data / name).write_bytes(fh.read())
+    manifest = str(tmp_path / 'manifest.json')
+
+    def load(delete_missing=False):
+        return admin.load_records(context, database, 'records', str(data),
+                                  manifest=manifest,
+                                  delete_missing=delete_missing)
+
+    assert len(load()) == 11
+    assert repo.query({})[0] == '11'
+
+    # unchanged files are skipped, touched files are not reloaded
+    assert load() == ()
+    name = 'Record_19887a8a-f6b0-4a63-ae56-7fba0e17801f.xml'
+    os.utime(data / name, (1, 1))
+    assert load() == ()
+
+    # changed files replace their records
+    content = (data / name).read_text(encoding='utf-8')
+    (data / name).write_text(content.replace(
+        'urn:uuid:19887a8a-f6b0-4a63-ae56-7fba0e17801f',
+        'urn:uuid:manifest'), encoding='utf-8')
+    assert load() == (str(data / name),)
+    assert repo.query_ids(['urn:uuid:manifest'])
+    assert not repo.query_ids(['urn:uuid:19887a8a-f6b0-4a63-ae56-7fba0e17801f'])
+    assert repo.query({})[0] == '11'
+
+    # records of removed files are only deleted on request
+    os.remove(data / name)
+    assert load() == ()
+    assert repo.query({})[0] == '11'
+    load(delete_missing=True)
+    assert repo.query({})[0] == '10'
+
+
+RECORD = (
+    '<csw:Record xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+    'xmlns:dct="http://purl.org/dc/terms/">'
+    '<dc:identifier>{}</dc:identifier><dc:title>{}</dc:title>{}'
+    '</csw:Record>'
+)
+
+
+def test_load_records_manifest_children(database, tmp_path, monkeypatch):
+    context = StaticContext()
+    repo = repository.Repository(database, context)
+
+    data = tmp_path / 'data'
+    data.mkdir()
+    parent, child = data / 'parent.xml', data / 'child.xml'
+    parent.write_text(RECORD.format('urn:parent', 'parent', ''))
+    child.write_text(RECORD.format(
+        'urn:child', 'child', '<dct:isPartOf>urn:parent</dct:isPartOf>'))
+    manifest = str(tmp_path / 'manifest.json')
+
+    def load():
+        return admin.load_records(context, database, 'records', str(data),
+                                  manifest=manifest)
+
+    assert len(load()) == 2
+    assert repo.query_ids(['urn:child'])[0].parentidentifier == 'urn:parent'
+
+    # the child of a replaced parent comes from an unchanged file
+    parent.write_text(RECORD.format('urn:parent:2', 'parent', ''))
+    assert load() == (str(parent),)
+    assert not repo.query_ids(['urn:parent'])
+    assert repo.query_ids(['urn:child'])
+
+    # records which fail to load from a changed file (of two records) are
+    # kept
+    parse_record_file = admin._parse_record_file
+
+    def parse_two_records(context, repo, recfile):
+        records, error = parse_record_file(context, repo, recfile)
+        records.append(repo.as_dict(metadata.parse_record(
+            context, RECORD.format('urn:sibling', 'sibling', ''), repo)[0]))
+        return records, error
+
+    insert_many = repository.Repository.insert_many
+
+    def failing_insert_many(self, records, *args, **kwargs):
+        outcomes = iter(insert_many(self, [
+            rec for rec in records if rec['identifier'] != 'urn:child'],
+            *args, **kwargs))
+        return [RuntimeError('failed') if rec['identifier'] == 'urn:child'
+                else next(outcomes) for rec in records]
+
+    monkeypatch.setattr(admin, '_parse_record_file', parse_two_records)
+    monkeypatch.setattr(repository.Repository, 'insert_many',
+                        failing_insert_many)
+    child.write_text(RECORD.format(
+        'urn:child', 'child 2', '<dct:isPartOf>urn:parent</dct:isPartOf>'))
+    assert load() == (str(child),)
+    assert repo.query_ids(['urn:child'])[0].title == 'child'
+    assert repo.query_ids(['urn:sibling'])
+
+    # and deleted once they are no longer in the file
+    monkeypatch.undo()
+    child.write_text(RECORD.format('urn:sibling', 'sibling', ''))
+    assert load() == (str(child),)
+    assert not repo.query_ids(['urn:child'])
+    assert repo.query_ids(['urn:sibling'])
+
+
+def test_post_xml_exception_report(tmp_path):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    import threading
+
+    report = b'<ows20:ExceptionReport xmlns:ows20="http://www.opengis.net/ows/2.0"/>'
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(400)
+            self.send_header('Content-Length', str(len(report)))
+            self.end_headers()
+            self.wfile.write(report)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    xml = tmp_path / 'request.xml'
+    xml.write_text('<csw:GetCapabilities/>')
+
+    # exception reports sent with HTTP error statuses are returned
+    try:
+        assert admin.post_xml('http://127.0.0.1:%d/csw' %
+                              httpd.server_address[1], str(xml)) == report
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,226 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Concurrency tests for pycsw.wsgi and pycsw.wsgi_flask"""
+
+from concurrent.futures import ThreadPoolExecutor
+import configparser
+import importlib
+import json
+import os
+import random
+import re
+from urllib.parse import quote
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from pycsw import wsgi
+from pycsw.core import admin, config
+
+pytestmark = pytest.mark.unit
+
+SUITES = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                      'functionaltests', 'suites')
+
+DATA = os.path.join(SUITES, 'cite', 'data')
+
+THREADS = 8
+
+ROUNDS = 5
+
+# a mix of protocol versions and modes, which extend the request context
+# (model, namespaces, outputschemas) differently
+REQUESTS = [
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=brief&resulttype=results&constraintlanguage=CQL_TEXT'
+    '&constraint=%s' % quote("dc:title like '%purus%'"),
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&sortby=dc:title:A',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=summary&outputschema=http://www.w3.org/2005/Atom',
+    'service=CSW&version=2.0.2&request=GetRecordById'
+    '&id=urn:uuid:829babb0-b2f1-49e1-8cd5-7b489fe71a1e',
+    'service=CSW&version=2.0.2&request=GetDomain'
+    '&parametername=GetRecords.outputSchema',
+    'mode=opensearch&service=CSW&version=3.0.0&request=GetRecords'
+    '&elementsetname=full&typenames=csw:Record&q=purus',
+    'mode=oaipmh&verb=ListIdentifiers&metadataprefix=oai_dc',
+    'mode=sru&operation=searchRetrieve&query=purus',
+]
+
+# OGC API - Records requests, served from a single shared repository
+ITEMS = [
+    '/collections/metadata:main/items?q=purus',
+    '/collections/metadata:main/items?bbox=-5,47,0,52&sortby=-title',
+    '/collections/metadata:main/items?limit=3&startindex=3',
+    '/collections/metadata:main/items/'
+    'urn:uuid:829babb0-b2f1-49e1-8cd5-7b489fe71a1e',
+]
+
+
+def normalize(content):
+    """Strip the parts of a response which vary between requests"""
+
+    content = content.decode('utf-8')
+    content = re.sub(r'(timestamp|expires|elapsedTime)="[^"]*"', '', content)
+    content = re.sub(r'<(\w+:)?(responseDate|updated)>[^<]*<',
+                     r'<\1\2><', content)
+    return content.replace('http://localhost/pycsw/csw',
+                           'http://localhost/pycsw')
+
+
+@pytest.fixture(scope='module')
+def configuration(tmp_path_factory):
+    """Configuration file of a catalogue loaded with the CITE records"""
+
+    tmp_path = tmp_path_factory.mktemp('concurrency')
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+
+    admin.setup_db(database, 'records', str(tmp_path))
+    admin.load_records(config.StaticContext(), database, 'records', DATA)
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(os.path.join(SUITES, 'cite', 'default.cfg'))
+    parser.set('server', 'url', 'http://localhost/pycsw')
+    parser.set('server', 'profiles', 'apiso')
+    parser.set('repository', 'database', database)
+    parser.set('repository', 'table', 'records')
+
+    configuration = tmp_path / 'default.cfg'
+    with configuration.open('w') as fh:
+        parser.write(fh)
+    return str(configuration)
+
+
+def run(get, requests):
+    """Run ``get`` for each request from a pool of threads"""
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(get, requests))
+
+
+def get_wsgi(query_string):
+    env = {'QUERY_STRING': query_string, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(env)
+    status = []
+    content = wsgi.application(
+        env, lambda status_, headers: status.append(status_))
+    return status[0], normalize(b''.join(content))
+
+
+@pytest.fixture(scope='module')
+def flask_client(configuration):
+    pytest.importorskip('flask')
+
+    environ = os.environ.get('PYCSW_CONFIG')
+    os.environ['PYCSW_CONFIG'] = configuration
+    try:
+        wsgi_flask = importlib.reload(
+            importlib.import_module('pycsw.wsgi_flask'))
+    finally:
+        if environ is None:
+            del os.environ['PYCSW_CONFIG']
+        else:
+            os.environ['PYCSW_CONFIG'] = environ
+
+    return wsgi_flask.APP.test_client()
+
+
+@pytest.fixture(scope='module')
+def get_flask(flask_client):
+    client = flask_client
+
+    def get(url):
+        response = client.get(url)
+        if url.startswith('/collections'):
+            content = json.loads(response.data)
+            content.pop('timeStamp', None)
+            return response.status, content
+        return response.status, normalize(response.data)
+
+    return get
+
+
+def test_wsgi_threads(configuration, monkeypatch):
+    monkeypatch.setenv('PYCSW_CONFIG', configuration)
+
+    expected = [get_wsgi(request) for request in REQUESTS]
+    assert all(status.startswith('200') for status, _ in expected)
+
+    requests = list(range(len(REQUESTS))) * ROUNDS
+    random.Random(0).shuffle(requests)
+
+    results = run(lambda i: get_wsgi(REQUESTS[i]), requests)
+    for i, result in zip(requests, results):
+        assert result == expected[i]
+
+
+def test_wsgi_flask_threads(configuration, get_flask, monkeypatch):
+    monkeypatch.setenv('PYCSW_CONFIG', configuration)
+
+    expected = [get_wsgi(request) for request in REQUESTS]
+
+    requests = list(range(len(REQUESTS))) * ROUNDS
+    random.Random(1).shuffle(requests)
+
+    results = run(lambda i: get_flask('/csw?%s' % REQUESTS[i]), requests)
+    for i, result in zip(requests, results):
+        assert result == expected[i]
+
+
+def test_wsgi_flask_items_threads(get_flask):
+    expected = [get_flask(url) for url in ITEMS]
+    assert all(status.startswith('200') for status, _ in expected)
+
+    requests = list(range(len(ITEMS))) * ROUNDS
+    random.Random(2).shuffle(requests)
+
+    results = run(lambda i: get_flask(ITEMS[i]), requests)
+    for i, result in zip(requests, results):
+        assert result == expected[i]
+
+
+def test_wsgi_flask_etag(flask_client):
+    response = flask_client.get('/?f=json')
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+
+    # compressed documents are not the bytes of the (strong) ETag
+    response = flask_client.get('/?f=json',
+                                headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == 'W/%s' % etag
+
+    response = flask_client.get('/?f=json', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': 'W/%s' % etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == 'W/%s' % etag
+
+    response = flask_client.get('/?f=json', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
@@ -0,0 +1,359 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Unit tests for pycsw.ogc.csw.federated, against a local stub CSW"""
+
+import configparser
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+import os
+from socketserver import ThreadingMixIn
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+from lxml import etree
+import pytest
+
+from pycsw import server
+from pycsw.ogc.csw import federated
+
+pytestmark = pytest.mark.unit
+
+SUITES = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                      'functionaltests', 'suites')
+
+NAMESPACES = {
+    'csw30': 'http://www.opengis.net/cat/csw/3.0',
+    'ows20': 'http://www.opengis.net/ows/2.0',
+}
+
+RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<csw30:GetRecordsResponse xmlns:csw30="http://www.opengis.net/cat/csw/3.0"
+    xmlns:dc="http://purl.org/dc/elements/1.1/" version="3.0.0">
+  <csw30:SearchStatus timestamp="2021-01-01T00:00:00Z"/>
+  <csw30:SearchResults numberOfRecordsMatched="12"
+      numberOfRecordsReturned="2" nextRecord="3" elementSet="brief">
+    <csw30:BriefRecord>
+      <dc:identifier>{name}-1</dc:identifier>
+    </csw30:BriefRecord>
+    <csw30:BriefRecord>
+      <dc:identifier>{name}-2</dc:identifier>
+    </csw30:BriefRecord>
+  </csw30:SearchResults>
+</csw30:GetRecordsResponse>
+"""
+
+EXCEPTION = """<?xml version="1.0" encoding="UTF-8"?>
+<ows20:ExceptionReport xmlns:ows20="http://www.opengis.net/ows/2.0"
+    version="3.0.0">
+  <ows20:Exception exceptionCode="InvalidParameterValue" locator="typenames">
+    <ows20:ExceptionText>Invalid typeNames parameter value</ows20:ExceptionText>
+  </ows20:Exception>
+</ows20:ExceptionReport>
+"""
+
+REQUEST = """<?xml version="1.0" encoding="UTF-8"?>
+<csw30:GetRecords xmlns:csw30="http://www.opengis.net/cat/csw/3.0"
+    service="CSW" version="3.0.0">
+  <csw30:DistributedSearch hopCount="2" clientId="urn:pycsw:test"
+      distributedSearchId="urn:pycsw:test:1"/>
+  <csw30:Query typeNames="csw30:Record">
+    <csw30:ElementSetName>brief</csw30:ElementSetName>
+  </csw30:Query>
+</csw30:GetRecords>
+"""
+
+
+class StubCSWHandler(BaseHTTPRequestHandler):
+    """Stub CSW, responding per path:
+
+    - ``/csw/<name>``: two records
+    - ``/slow/<seconds>/<name>``: two records, after some time
+    - ``/exception``: an ExceptionReport
+    - ``/error``: an HTTP error
+    """
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond()
+
+    def respond(self):
+        path = self.path.split('?')[0].strip('/').split('/')
+        self.server.requests.append(self.path)
+
+        if path[0] == 'slow':
+            time.sleep(float(path[1]))
+
+        if path[0] == 'exception':
+            status, content = 400, EXCEPTION
+        elif path[0] == 'error':
+            status, content = 500, 'Internal Server Error'
+        else:
+            status, content = 200, RESPONSE.format(name=path[-1])
+
+        content = content.encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up
+
+    def log_message(self, *args):
+        pass
+
+
+class StubCSW(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture(scope='module')
+def stub_csw():
+    """URL of a local stub CSW, and the paths it was requested"""
+
+    httpd = StubCSW(('127.0.0.1', 0), StubCSWHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield 'http://127.0.0.1:%d' % httpd.server_address[1], httpd.requests
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    federated._CACHE.clear()
+    yield
+    federated._CACHE.clear()
+
+
+def test_search(stub_csw):
+    url, _ = stub_csw
+    catalogues = ['%s/csw/a' % url, '%s/exception' % url, '%s/error' % url,
+                  '%s/csw/b' % url]
+
+    results = federated.FederatedSearch(catalogues).search(REQUEST.encode())
+
+    assert [result.url for result in results] == catalogues
+
+    assert results[0].error is None
+    assert (results[0].matched, results[0].returned,
+            results[0].nextrecord) == (12, 2, 3)
+    assert [record.findtext('{*}identifier')
+            for record in results[0].records] == ['a-1', 'a-2']
+    assert [record.findtext('{*}identifier')
+            for record in results[3].records] == ['b-1', 'b-2']
+
+    assert results[1].exception_code == 'InvalidParameterValue'
+    assert results[1].locator == 'typenames'
+    assert 'Invalid typeNames' in results[1].error
+    assert results[1].records == []
+
+    assert results[2].exception_code == 'NoApplicableCode'
+    assert 'returned error' in results[2].error
+
+
+def test_search_concurrent(stub_csw):
+    url, _ = stub_csw
+    catalogues = ['%s/slow/0.5/%d' % (url, i) for i in range(4)]
+
+    start = time.time()
+    results = federated.FederatedSearch(catalogues).search(REQUEST.encode())
+
+    assert time.time() - start < 1.5
+    assert all(result.error is None for result in results)
+
+
+def test_search_max_workers(stub_csw):
+    url, _ = stub_csw
+    catalogues = ['%s/slow/0.3/%d' % (url, i) for i in range(4)]
+
+    start = time.time()
+    federated.FederatedSearch(catalogues, max_workers=2).search(
+        REQUEST.encode())
+
+    assert time.time() - start >= 0.6
+
+
+def test_search_timeout(stub_csw):
+    url, _ = stub_csw
+    catalogues = ['%s/csw/a' % url, '%s/slow/2/b' % url]
+
+    results = federated.FederatedSearch(catalogues, timeout=0.2).search(
+        REQUEST.encode())
+
+    assert results[0].error is None
+    assert results[1].exception_code == 'NoApplicableCode'
+    assert 'returned error' in results[1].error
+
+
+def test_search_deadline(stub_csw):
+    url, _ = stub_csw
+    catalogues = ['%s/csw/a' % url, '%s/slow/2/b' % url]
+
+    start = time.time()
+    results = federated.FederatedSearch(catalogues, deadline=0.5).search(
+        REQUEST.encode())
+
+    assert time.time() - start < 1.5
+    assert len(results[0].records) == 2
+    assert 'timed out' in results[1].error
+    assert results[1].elapsed == 500
+
+
+def test_search_cache(stub_csw):
+    url, requests = stub_csw
+    catalogues = ['%s/csw/cached' % url, '%s/exception' % url]
+    search = federated.FederatedSearch(catalogues)
+
+    del requests[:]
+    results = search.search('http://localhost/pycsw/csw?service=CSW'
+                            '&version=3.0.0&request=GetRecords')
+    assert not any(result.cached for result in results)
+
+    # equivalent request, served from the cache (failures are not cached)
+    results2 = search.search('http://localhost/pycsw/csw?request=GetRecords'
+                             '&VERSION=3.0.0&service=CSW')
+    assert [result.cached for result in results2] == [True, False]
+    assert [record.findtext('{*}identifier')
+            for record in results2[0].records] == ['cached-1', 'cached-2']
+    assert len(requests) == 3
+
+    # other request
+    search.search(REQUEST.encode())
+    assert len(requests) == 5
+
+    # no cache
+    federated.FederatedSearch(catalogues, cache_ttl=0).search(
+        REQUEST.encode())
+    assert len(requests) == 7
+
+
+def test_search_cache_expires(stub_csw):
+    url, requests = stub_csw
+    search = federated.FederatedSearch(['%s/csw/a' % url], cache_ttl=0.2)
+
+    del requests[:]
+    search.search(REQUEST.encode())
+    search.search(REQUEST.encode())
+    assert len(requests) == 1
+
+    time.sleep(0.3)
+    search.search(REQUEST.encode())
+    assert len(requests) == 2
+
+
+@pytest.mark.parametrize('request1,request2', [
+    ('service=CSW&version=3.0.0&request=GetRecords',
+     'request=GetRecords&SERVICE=CSW&version=3.0.0'),
+    (REQUEST.encode(),
+     REQUEST.replace('\n  ', '\n').replace(
+         'service="CSW" version="3.0.0"',
+         'version="3.0.0" service="CSW"').encode()),
+])
+def test_normalize_request(request1, request2):
+    method, data = federated.get_request(request1)
+    method2, data2 = federated.get_request(request2)
+
+    assert method == method2
+    assert (federated.normalize_request(method, data) ==
+            federated.normalize_request(method2, data2))
+
+
+def test_get_request():
+    assert federated.get_request(
+        'http://localhost/pycsw/csw?mode=opensearch&service=CSW') == (
+        'GET', '&service=CSW')
+    assert federated.get_request(b'<csw30:GetRecords/>') == (
+        'POST', b'<csw30:GetRecords/>')
+
+
+@pytest.fixture(scope='module')
+def federated_configuration(tmp_path_factory, stub_csw):
+    """Configuration of an empty catalogue, federating stub catalogues"""
+
+    from pycsw.core import admin
+
+    url, _ = stub_csw
+
+    tmp_path = tmp_path_factory.mktemp('federated')
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(os.path.join(SUITES, 'csw30', 'default.cfg'))
+    parser.set('server', 'url', 'http://localhost/pycsw')
+    parser.set('server', 'federatedcatalogues',
+               '%s/csw/a,%s/slow/2/b,%s/exception' % (url, url, url))
+    parser.set('server', 'federated_deadline', '0.5')
+    parser.set('repository', 'database', database)
+    parser.set('repository', 'table', 'records')
+    return parser
+
+
+def test_getrecords_distributedsearch(federated_configuration):
+    env = {
+        'QUERY_STRING': '',
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_LENGTH': str(len(REQUEST)),
+        'wsgi.input': BytesIO(REQUEST.encode())
+    }
+    setup_testing_defaults(env)
+
+    csw = server.Csw(federated_configuration, env)
+    status, content = csw.dispatch_wsgi()
+
+    assert status.startswith('200')
+
+    catalogues = federated_configuration.get(
+        'server', 'federatedcatalogues').split(',')
+
+    results = etree.fromstring(content).find('csw30:SearchResults',
+                                             NAMESPACES)
+    assert [(etree.QName(node).localname, node.get('catalogueURL'))
+            for node in results] == [
+        ('FederatedSearchResult', catalogues[0]),
+        ('FederatedException', catalogues[1]),
+        ('FederatedException', catalogues[2]),
+    ]
+
+    search_result = results[0].find('csw30:searchResult', NAMESPACES)
+    assert search_result.get('numberOfRecordsMatched') == '12'
+    assert len(search_result) == 2
+
+    exceptions = results.xpath('csw30:FederatedException/ows20:ExceptionReport'
+                               '/ows20:Exception/@exceptionCode',
+                               namespaces=NAMESPACES)
+    assert exceptions == ['NoApplicableCode', 'InvalidParameterValue']
@@ -29,6 +29,10 @@
 # =================================================================
 """Unit tests for pycsw.core.formats.fmt_json"""
 
+import copy
+import json
+
+from lxml import etree
 import pytest
 
 from pycsw.core.formats import fmt_json
@@ -91,3 +95,69 @@ def test_xml2dict():
     result = fmt_json.xml2dict(xml_string=xml, namespaces=namespaces)
     assert result["csw:GetRecordsResponse"]["csw:SearchResults"][
         "csw:Record"]["dc:identifier"] == identifier
+
+
+NAMESPACES = {
+    "csw": "http://www.opengis.net/cat/csw/3.0",
+    "dc": "http://purl.org/dc/elements/1.1/",
+}
+
+RESPONSE = """
+<csw:GetRecordsResponse xmlns:csw="http://www.opengis.net/cat/csw/3.0"
+    xmlns:x="urn:unmapped" xmlns="urn:default" x:attr="1" version="3.0.0">
+  leading text<!-- comment -->tail
+  <csw:SearchStatus timestamp="2009-12-17T09:30:47-05:00"/>
+  <csw:Note>first</csw:Note> mixed <csw:Note/>
+  <x:Unmapped><inner xmlns="urn:other">deep</inner></x:Unmapped>
+  <csw:SearchResults numberOfRecordsReturned="1">
+    <Record xml:lang="en">existing</Record>
+  </csw:SearchResults>
+</csw:GetRecordsResponse>
+"""
+
+
+def test_element2dict():
+    element = etree.fromstring(RESPONSE)
+    assert fmt_json.element2dict(element, NAMESPACES) == fmt_json.xml2dict(
+        etree.tostring(element), NAMESPACES)
+
+
+@pytest.mark.parametrize("pretty_print", [False, True])
+def test_element2json(pretty_print):
+    element = etree.fromstring(RESPONSE)
+    assert fmt_json.element2json(
+        element, NAMESPACES, pretty_print) == fmt_json.xml2json(
+        etree.tostring(element), NAMESPACES, pretty_print)
+
+
+@pytest.mark.parametrize("pretty_print", [False, True])
+@pytest.mark.parametrize("names", [
+    [],
+    ["Record"],
+    ["Record", "Record", "Record"],
+    ["Brief", "Record", "Record"],
+    ["Record", "Brief", "Record"],
+    ["Brief", "Record", "Brief", "Summary", "Record", "Brief"],
+])
+def test_iter_json(pretty_print, names):
+    element = etree.fromstring(RESPONSE)
+    results = element.find("{http://www.opengis.net/cat/csw/3.0}SearchResults")
+
+    records = []
+    for index, name in enumerate(names):
+        record = etree.Element("{http://www.opengis.net/cat/csw/3.0}%s" % name,
+                               nsmap=NAMESPACES, index=str(index))
+        etree.SubElement(record, "{http://purl.org/dc/elements/1.1/}title",
+                         nsmap=NAMESPACES).text = "title %d" % index
+        records.append(record)
+
+    chunks = list(fmt_json.iter_json(element, NAMESPACES, results,
+                                     iter(copy.deepcopy(records)),
+                                     pretty_print))
+    for record in records:
+        results.append(record)
+    etree.cleanup_namespaces(element)
+    expected = fmt_json.element2json(element, NAMESPACES, pretty_print)
+
+    assert json.loads("".join(chunks)) == json.loads(expected)
+    assert "".join(chunks) == expected
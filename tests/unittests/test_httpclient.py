@@ -0,0 +1,237 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Unit tests for pycsw.core.httpclient, against a local HTTP server"""
+
+import configparser
+import gzip
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import threading
+
+import pytest
+import requests
+
+from pycsw.core import httpclient
+
+pytestmark = pytest.mark.unit
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Keep-alive HTTP server:
+
+    - ``/data/<size>``: ``size`` bytes
+    - ``/gzip/<size>``: ``size`` bytes, gzip encoded if accepted
+    - ``/flaky/<name>``: HTTP 503 on the first request, then ``name``
+    - ``/error``: an HTTP error
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond(self.rfile.read(int(self.headers['Content-Length'])))
+
+    def respond(self, body=None):
+        path = self.path.strip('/').split('/')
+        self.server.clients.append(self.client_address)
+
+        status, headers = 200, {}
+        if path[0] == 'data':
+            content = b'x' * int(path[1])
+        elif path[0] == 'gzip':
+            content = b'x' * int(path[1])
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                content = gzip.compress(content)
+                headers['Content-Encoding'] = 'gzip'
+        elif path[0] == 'flaky' and self.path not in self.server.failed:
+            self.server.failed.add(self.path)
+            status, content = 503, b'Service Unavailable'
+        elif path[0] == 'flaky':
+            content = path[1].encode()
+        elif path[0] == 'echo':
+            content = body
+        else:
+            status, content = 500, b'Internal Server Error'
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def stub_server():
+    """URL of a local HTTP server, and the client addresses of requests"""
+
+    httpd = StubServer(('127.0.0.1', 0), StubHandler)
+    httpd.clients = []
+    httpd.failed = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield 'http://127.0.0.1:%d' % httpd.server_address[1], httpd.clients
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_keep_alive(stub_server):
+    url, clients = stub_server
+    client = httpclient.HttpClient()
+
+    for size in range(5):
+        response = client.request('GET', '%s/data/%d' % (url, size))
+        assert response.status_code == 200
+        assert response.content == b'x' * size
+
+    # all requests were sent on the same connection
+    assert len(clients) == 5
+    assert len(set(clients)) == 1
+
+
+def test_post(stub_server):
+    url, _ = stub_server
+    client = httpclient.HttpClient()
+
+    response = client.request('POST', '%s/echo' % url, data=b'<xml/>')
+    assert response.content == b'<xml/>'
+
+
+def test_gzip(stub_server):
+    url, _ = stub_server
+    client = httpclient.HttpClient()
+
+    response = client.request('GET', '%s/gzip/10000' % url)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.content == b'x' * 10000
+
+    # only decoded bytes are counted
+    host = url.split('//')[1]
+    assert client.stats()[host]['bytes'] == 10000
+
+
+def test_max_size(stub_server):
+    url, _ = stub_server
+    client = httpclient.HttpClient(max_size=1000)
+
+    assert len(client.request('GET', '%s/data/1000' % url).content) == 1000
+
+    # known from the Content-Length header
+    with pytest.raises(RuntimeError):
+        client.request('GET', '%s/data/1001' % url)
+
+    # known once decoded
+    with pytest.raises(RuntimeError):
+        client.request('GET', '%s/gzip/100000' % url)
+
+    # per request limit
+    response = client.request('GET', '%s/data/1001' % url, max_size=0)
+    assert len(response.content) == 1001
+
+
+def test_retries(stub_server):
+    url, clients = stub_server
+
+    client = httpclient.HttpClient(retries=1, backoff=0)
+    response = client.request('GET', '%s/flaky/a' % url)
+    assert response.content == b'a'
+    assert len(clients) == 2
+
+    client = httpclient.HttpClient(retries=0)
+    with pytest.raises(requests.HTTPError):
+        client.request('GET', '%s/flaky/b' % url)
+
+
+def test_http_error(stub_server):
+    url, _ = stub_server
+    client = httpclient.HttpClient(retries=0)
+
+    with pytest.raises(requests.HTTPError):
+        client.request('GET', '%s/error' % url)
+
+    response = client.request('GET', '%s/error' % url, raise_for_status=False)
+    assert response.status_code == 500
+    assert response.content == b'Internal Server Error'
+
+
+def test_stats(stub_server):
+    url, _ = stub_server
+    client = httpclient.HttpClient(retries=0)
+
+    client.request('GET', '%s/data/10' % url)
+    client.request('GET', '%s/data/20' % url)
+    client.request('GET', '%s/error' % url, raise_for_status=False)
+    with pytest.raises(requests.ConnectionError):
+        client.request('GET', 'http://127.0.0.1:1/')
+
+    stats = client.stats()
+    host = url.split('//')[1]
+    assert stats[host]['requests'] == 3
+    assert stats[host]['errors'] == 1
+    assert stats[host]['bytes'] == 10 + 20 + len(b'Internal Server Error')
+    assert stats[host]['elapsed'] > 0
+    assert stats['127.0.0.1:1']['requests'] == 1
+    assert stats['127.0.0.1:1']['errors'] == 1
+
+
+def test_get_client_options():
+    config = configparser.ConfigParser()
+    config.read_dict({'server': {'http_timeout': '60',
+                                 'http_retries': '0',
+                                 'http_max_size': '1024'}})
+
+    assert httpclient.get_client_options(config) == {
+        'timeout': 60.0, 'retries': 0, 'max_size': 1024}
+    assert httpclient.get_client_options(configparser.ConfigParser()) == {}
+
+
+def test_get_client():
+    client = httpclient.get_client()
+    assert httpclient.get_client() is client
+    assert client.timeout == (httpclient.CONNECT_TIMEOUT, httpclient.TIMEOUT)
+
+    httpclient.configure({'timeout': 60})
+    try:
+        client2 = httpclient.get_client()
+        assert client2 is not client
+        assert client2.timeout == (httpclient.CONNECT_TIMEOUT, 60)
+        assert httpclient.get_client(timeout=60) is client2
+    finally:
+        httpclient.configure({})
@@ -53,3 +53,207 @@ def test_bbox_from_polygons_invalid():
     bboxes = "stuff"
     with pytest.raises(RuntimeError):
         metadata.bbox_from_polygons(bboxes)
+
+
+@pytest.fixture
+def waf(tmp_path):
+    """Serve the CITE records as a WAF, on a local HTTP server
+
+    Documents under ``/slow/`` are served after a delay, documents under
+    ``/flaky/`` fail on their first request, the last document under
+    ``/broken/`` always fails
+    """
+
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    import os
+    from socketserver import ThreadingMixIn
+    import threading
+    import time
+
+    data = os.path.join(os.path.dirname(__file__), os.pardir,
+                        'functionaltests', 'suites', 'cite', 'data')
+    names = []
+    for name in sorted(os.listdir(data)):
+        with open(os.path.join(data, name), 'rb') as fh:
+            # skip the README and the malformed record of the CITE suite
+            if fh.read(1) == b'<':
+                names.append(name)
+    failed = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            directory, name = self.path.strip('/').rpartition('/')[::2]
+            if not name.endswith('.xml'):
+                links = ''.join('<a href="{}">{}</a>'.format(name, name)
+                                for name in names)
+                content = '<html><body>{}</body></html>'.format(
+                    links).encode()
+            elif name in names:
+                if directory == 'slow':
+                    time.sleep(0.2)
+                if directory == 'broken' and name == names[-1]:
+                    self.send_error(500)
+                    return
+                if directory == 'flaky' and self.path not in failed:
+                    failed.add(self.path)
+                    self.send_error(500)
+                    return
+                with open(os.path.join(data, name), 'rb') as fh:
+                    content = fh.read()
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1]), names
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def repos(tmp_path):
+    from pycsw.core import admin, repository
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+
+    return repository.Repository(database, StaticContext())
+
+
+def test_parse_waf(waf, repos):
+    url, names = waf
+
+    records = metadata.parse_record(repos.context, url, repos,
+                                    'urn:geoss:waf', workers=4)
+
+    # records are returned lazily, in the order of the WAF index
+    assert not isinstance(records, list)
+    records = list(records)
+    assert [record.source for record in records] == [
+        '{}/{}'.format(url, name) for name in names]
+    assert all(record.identifier for record in records)
+
+
+def test_parse_waf_concurrent(waf, repos):
+    import time
+
+    url, names = waf
+
+    start = time.time()
+    records = list(metadata.parse_record(
+        repos.context, url + '/slow', repos, 'urn:geoss:waf', workers=4))
+    elapsed = time.time() - start
+
+    assert len(records) == len(names)
+    # sequential fetches would take at least 0.2 seconds per document
+    assert elapsed < 0.2 * len(names) / 2
+
+
+def test_parse_waf_retries(waf, repos):
+    url, names = waf
+
+    records = list(metadata.parse_record(
+        repos.context, url + '/flaky', repos, 'urn:geoss:waf',
+        retries=1, backoff=0))
+    assert len(records) == len(names)
+
+
+def test_parse_waf_no_retries(waf, repos):
+    from requests.exceptions import HTTPError
+
+    url, names = waf
+
+    records = metadata.parse_record(
+        repos.context, url + '/flaky', repos, 'urn:geoss:waf', retries=0)
+    with pytest.raises(HTTPError):
+        list(records)
+
+
+def test_fetch_concurrently():
+    import time
+
+    attempts = []
+
+    def fetch(item):
+        attempts.append(item)
+        if item == 3:
+            raise ValueError(item)
+        time.sleep(0.01 * (5 - item))
+        return item * 2
+
+    results = list(metadata._fetch_concurrently(
+        fetch, range(5), workers=2, retries=1, backoff=0))
+
+    # results keep the order of the items, failures are returned
+    assert [item for item, _ in results] == [0, 1, 2, 3, 4]
+    assert [result for _, result in results if _ != 3] == [0, 2, 4, 8]
+    assert isinstance(results[3][1], ValueError)
+    assert attempts.count(3) == 2
+
+
+def test_harvest_waf_failure(waf, tmp_path, monkeypatch):
+    import configparser
+    from io import BytesIO
+    import os
+    from wsgiref.util import setup_testing_defaults
+
+    from pycsw import server
+    from pycsw.core import admin
+    from pycsw.core.etree import etree
+
+    url, names = waf
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(os.path.join(os.path.dirname(__file__), os.pardir,
+                             'functionaltests', 'suites', 'cite',
+                             'default.cfg'))
+    parser.set('server', 'url', 'http://localhost/pycsw')
+    parser.set('manager', 'harvest_retries', '0')
+    parser.set('repository', 'database', database)
+    parser.set('repository', 'table', 'records')
+
+    request = (
+        '<csw:Harvest xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" '
+        'service="CSW" version="2.0.2"><csw:Source>{}/broken</csw:Source>'
+        '<csw:ResourceType>urn:geoss:waf</csw:ResourceType></csw:Harvest>'
+    ).format(url).encode()
+    env = {
+        'QUERY_STRING': '',
+        'REQUEST_METHOD': 'POST',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(request)),
+        'wsgi.input': BytesIO(request)
+    }
+    setup_testing_defaults(env)
+
+    # records are written in batches of 2 as they are harvested
+    monkeypatch.setattr(metadata, 'HARVEST_BATCH_SIZE', 2)
+    csw = server.Csw(parser, env)
+    status, content = csw.dispatch_wsgi()
+
+    # the harvest fails on the last document, the earlier batches are kept
+    written = (len(names) - 1) // 2 * 2
+    exception = etree.fromstring(content).xpath(
+        '//*[local-name()="ExceptionText"]')[0].text
+    assert 'Harvest failed' in exception
+    assert '{} records written before the failure are kept'.format(
+        written) in exception
+    assert csw.repository.query({})[0] == str(written)
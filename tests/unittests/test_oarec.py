@@ -1,5 +1,6 @@
 import json
 import os
+from urllib.parse import parse_qsl, urlparse
 from xml.etree import ElementTree as etree
 
 import pytest
@@ -208,3 +209,65 @@ def test_item(api):
 
     element = e.find('{http://purl.org/dc/elements/1.1/}subject').text
     assert element == 'Tourism--Greece'
+
+
+@pytest.mark.parametrize("sortby", [None, 'title', '-title'])
+def test_items_cursor(config, sortby):
+    config['server']['pagination'] = 'cursor'
+    api = API(config)
+
+    args = {'limit': '5'}
+    if sortby is not None:
+        args['sortby'] = sortby
+
+    ids = []
+    while args is not None:
+        content = json.loads(api.items({}, None, args)[2])
+        assert content['numberMatched'] == 12
+        ids.extend([feature['id'] for feature in content['features']])
+
+        args = None
+        for link in content['links']:
+            if link['rel'] == 'next':
+                assert 'startindex' not in link['href']
+                args = dict(parse_qsl(urlparse(link['href']).query))
+
+    assert len(ids) == len(set(ids)) == 12
+
+    headers, status, content = api.items({}, None, {'cursor': 'foo'})
+    assert status == 400
+
+
+def test_documents(config, tmp_path):
+    api = API(config)
+
+    headers, status, content = api.landing_page({}, {'f': 'json'})
+    assert status == 200
+    assert headers['Content-Length'] == len(content.encode('utf-8'))
+    assert api.landing_page({}, {'f': 'json'})[2] is content
+
+    etag = headers['ETag']
+    headers, status, content = api.landing_page({'If-None-Match': etag},
+                                                {'f': 'json'})
+    assert status == 304
+    assert content == ''
+    # as validated by clients of the compressed document
+    for if_none_match in ['W/%s' % etag, '"foo", W/%s' % etag, '*']:
+        assert api.landing_page({'If-None-Match': if_none_match},
+                                {'f': 'json'})[1] == 304
+    assert api.landing_page({'If-None-Match': '"foo"'},
+                            {'f': 'json'})[1] == 200
+    assert api.landing_page({'If-None-Match': etag},
+                            {'f': 'html'})[1] == 200
+
+    # pre-rendered documents are served instead of rendering them
+    config['server']['documents_cache'] = str(tmp_path)
+    api = API(config)
+    filepaths = api.write_documents()
+    assert len(filepaths) == 10
+
+    with open(api.get_document_filepath('conformance', 'json'), 'w') as fh:
+        fh.write('{"conformsTo": []}')
+
+    content = json.loads(api.conformance({}, {'f': 'json'})[2])
+    assert content == {'conformsTo': []}
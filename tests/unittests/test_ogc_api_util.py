@@ -0,0 +1,78 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+"""Unit tests for pycsw.ogc.api.util"""
+
+import pytest
+
+from pycsw.ogc.api import util
+
+pytestmark = pytest.mark.unit
+
+
+def test_get_j2_environment(tmp_path):
+    env = util.get_j2_environment(util.TEMPLATES)
+    assert util.get_j2_environment(util.TEMPLATES) is env
+    assert env.auto_reload
+    assert env.filters['to_json'] is util.to_json
+
+    env2 = util.get_j2_environment(util.TEMPLATES, str(tmp_path / 'cache'),
+                                   False)
+    assert env2 is not env
+    assert not env2.auto_reload
+
+    env2.get_template('landing_page.html')
+    assert list((tmp_path / 'cache').iterdir())
+
+
+def test_render_j2_template(tmp_path):
+    (tmp_path / 'custom.html').write_text('{{ data.title | to_json }}')
+
+    config = {'server': {'templates': {'path': str(tmp_path)},
+                         'templates_auto_reload': 'false'},
+              'metadata:main': {'identification_title': 'pycsw'}}
+
+    assert util.render_j2_template(
+        config, 'custom.html', {'title': 'pycsw'}) == '"pycsw"'
+
+    # missing custom templates fall back to the default templates
+    content = util.render_j2_template(config, 'exception.html', {})
+    assert '<html' in content
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ('"a"', True),
+    ('W/"a"', True),
+    ('"b", W/"a"', True),
+    ('*', True),
+    ('"b"', False),
+    ('W/"b"', False),
+])
+def test_match_etag(if_none_match, expected):
+    assert util.match_etag(if_none_match, '"a"') is expected
+    assert util.match_etag(if_none_match, 'W/"a"') is expected
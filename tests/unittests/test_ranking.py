@@ -0,0 +1,166 @@
+# =================================================================
+#
+# Copyright (c) 2026 The pycsw development team
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+# =================================================================
+
+
+"""Unit tests for pycsw.core.ranking"""
+
+import configparser
+import os
+import zlib
+
+import pytest
+
+from pycsw.core import admin, ranking, repository
+from pycsw.core.config import StaticContext
+
+pytestmark = pytest.mark.unit
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                    'functionaltests', 'suites', 'cite', 'data')
+
+QUERY = 'POLYGON((-5 47, -5 52, 0 52, 0 47, -5 47))'
+
+
+class Geometry(object):
+    """Stand-in for pycsw.ogc.gml.gml3.Geometry"""
+
+    def __init__(self, type_, wkt):
+        self.type = type_
+        self.wkt = wkt
+
+
+def test_from_config():
+    config = configparser.ConfigParser()
+    config.read_dict({'server': {'spatial_ranking': 'true',
+                                 'spatial_ranking_kt': '2',
+                                 'spatial_ranking_candidates': '10'}})
+
+    spatial_ranking = ranking.SpatialRanking.from_config(config)
+    assert spatial_ranking.enabled
+    assert (spatial_ranking.kt, spatial_ranking.kq) == (2.0, 1.0)
+    assert spatial_ranking.candidates == 10
+
+    assert not ranking.SpatialRanking.from_config(
+        configparser.ConfigParser()).enabled
+
+
+@pytest.mark.parametrize("enabled, geometry, expected", [
+    (True, Geometry('Polygon', QUERY), QUERY),
+    (True, Geometry('Point', 'POINT(1 2)'),
+     'POLYGON ((2 1, 2 3, 0 3, 0 1, 2 1))'),
+    (True, Geometry('LineString', 'LINESTRING(0 0, 0 1)'), None),
+    (True, Geometry('Envelope', 'POLYGON((0 0, 0 1, 0 1, 0 0, 0 0))'), None),
+    (False, Geometry('Polygon', QUERY), None),
+])
+def test_set_query_geometry(enabled, geometry, expected):
+    spatial_ranking = ranking.SpatialRanking(enabled)
+    spatial_ranking.set_query_geometry(geometry)
+    assert spatial_ranking.query_geometry == expected
+    assert spatial_ranking.active == (expected is not None)
+
+
+@pytest.mark.parametrize("kt, kq, target, expected", [
+    (1, 1, 'POLYGON((0 0, 0 2, 2 2, 2 0, 0 0))', 1.0),
+    (1, 1, 'POLYGON((0 0, 0 1, 1 1, 1 0, 0 0))', 0.25),
+    (2, 1, 'POLYGON((1 1, 1 3, 3 3, 3 1, 1 1))', 0.25 * 0.25 ** 2),
+    (1, 1, 'POLYGON((5 5, 5 6, 6 6, 6 5, 5 5))', 0.0),
+    (1, 1, 'POINT(1 1)', 0.0),
+    (1, 1, None, 0.0),
+])
+def test_score(kt, kq, target, expected):
+    spatial_ranking = ranking.SpatialRanking(True, kt, kq)
+    spatial_ranking.set_query_geometry(
+        Geometry('Polygon', 'POLYGON((0 0, 0 2, 2 2, 2 0, 0 0))'))
+    assert spatial_ranking.score(target) == pytest.approx(expected)
+
+
+def test_postgis_score_zero_area():
+    spatial_ranking = ranking.SpatialRanking(True)
+    spatial_ranking.query_geometry = 'POLYGON((0 0, 0 1, 0 1, 0 0, 0 0))'
+    score = spatial_ranking.postgis_score('wkt_geometry')
+    assert str(score.compile(compile_kwargs={'literal_binds': True})) == '0.0'
+
+
+@pytest.mark.parametrize("candidates", [1, 100])
+def test_query(tmp_path, candidates):
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    admin.load_records(StaticContext(), database, 'records', DATA)
+
+    repo = repository.Repository(database, StaticContext())
+
+    spatial_ranking = ranking.SpatialRanking(True, candidates=candidates)
+    spatial_ranking.set_query_geometry(Geometry('Polygon', QUERY))
+
+    where = "query_spatial(wkt_geometry,'%s','bbox','false') = 'true'" % QUERY
+    total, records = repo.query({'where': where, 'values': []},
+                                maxrecords=1, ranking=spatial_ranking)
+    assert total == '2'
+
+    # the best ranked record comes first, however many candidates are
+    # reranked
+    scores = [spatial_ranking.score(record.wkt_geometry) for record in
+              repo.query({'where': where, 'values': []})[1]]
+    assert spatial_ranking.score(records[0].wkt_geometry) == max(scores)
+
+    total, records = repo.query({'where': where, 'values': []},
+                                maxrecords=1, startposition=1,
+                                ranking=spatial_ranking)
+    assert spatial_ranking.score(records[0].wkt_geometry) == min(scores)
+
+    repository.Repository.invalidate(database, 'records')
+
+
+@pytest.mark.parametrize("candidates", [1, 3, 100])
+def test_query_pages(tmp_path, candidates):
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    admin.load_records(StaticContext(), database, 'records', DATA)
+
+    repo = repository.Repository(database, StaticContext())
+
+    spatial_ranking = ranking.SpatialRanking(True, candidates=candidates)
+    spatial_ranking.set_query_geometry(Geometry('Polygon', QUERY))
+    # exact ranks disagreeing with the approximate ranks of the database
+    spatial_ranking.score = lambda geometry: zlib.crc32(
+        str(geometry).encode()) % 5
+
+    total, records = repo.query({}, maxrecords=100)
+    expected = sorted(record.identifier for record in records)
+
+    # every record is on exactly one page, across the reranked candidates
+    identifiers = []
+    for startposition in range(0, int(total), 2):
+        total2, records = repo.query({}, maxrecords=2,
+                                     startposition=startposition,
+                                     ranking=spatial_ranking)
+        assert total2 == total
+        identifiers.extend(record.identifier for record in records)
+
+    assert sorted(identifiers) == expected
+
+    repository.Repository.invalidate(database, 'records')
@@ -28,9 +28,11 @@
 # =================================================================
 """Unit tests for pycsw.core.repository"""
 
+import os
+
 import pytest
 
-from pycsw.core import repository
+from pycsw.core import repository, util
 
 pytestmark = pytest.mark.unit
 
@@ -64,3 +66,598 @@ def test_query_spatial(data, input_, predicate, distance, expected):
         distance=distance
     )
     assert result == expected
+
+
+def test_repository_model_memoized(tmp_path):
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+
+    context = StaticContext()
+    repo1 = repository.Repository(database, context)
+    repo2 = repository.Repository(database, context)
+
+    assert repo1.dataset is repo2.dataset
+    assert repo1.queryables == repo2.queryables
+
+    # per-request changes to queryables do not leak
+    repo1.queryables['_all']['dc:title'] = {'dbcol': 'foo'}
+    assert repo2.queryables['_all']['dc:title'] != {'dbcol': 'foo'}
+    assert repository.Repository(
+        database, context).queryables['_all']['dc:title'] != {'dbcol': 'foo'}
+
+    repository.Repository.invalidate(database, 'records')
+    repo3 = repository.Repository(database, context)
+    assert repo3.dataset is not repo1.dataset
+
+
+
+def test_get_pool_options():
+    import configparser
+
+    config = configparser.ConfigParser()
+    config.read_dict({'repository': {'pool_size': '20',
+                                     'pool_recycle': '3600',
+                                     'pool_pre_ping': 'false'}})
+
+    assert repository.get_pool_options(config) == {
+        'pool_size': 20, 'pool_recycle': 3600, 'pool_pre_ping': False}
+    assert repository.get_pool_options(configparser.ConfigParser()) == {}
+
+
+def test_create_engine_pool_options(tmp_path):
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+
+    engine = repository.Repository.create_engine(database)
+    assert repository.Repository.create_engine(database) is engine
+
+    # pool sizes do not apply to SQLite, other options do
+    engine2 = repository.Repository.create_engine(
+        database, pool_size=20, max_overflow=5, pool_recycle=3600)
+    assert engine2 is not engine
+    assert engine2.pool._recycle == 3600
+
+
+def test_session_thread_local(tmp_path):
+    import threading
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+
+    repo = repository.Repository(database, StaticContext())
+    session = repo.session()
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(repo.session()))
+    thread.start()
+    thread.join()
+
+    assert repo.session() is session
+    assert sessions[0] is not session
+
+    repo.session.remove()
+    assert repo.session() is not session
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def paging_database(request, tmp_path):
+    """Database URL and table loaded with the CITE records"""
+
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    table = 'records_paging'
+    if request.param == "sqlite":
+        database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    elif request.config.getoption("--database-backend") == "postgresql":
+        database = (
+            "postgresql://{user}:{password}@{host}:{port}/{database}".format(
+                user=request.config.getoption("--database-user-postgresql"),
+                password=request.config.getoption(
+                    "--database-password-postgresql"),
+                host=request.config.getoption("--database-host-postgresql"),
+                port=request.config.getoption("--database-port-postgresql"),
+                database=request.config.getoption(
+                    "--database-name-postgresql"))
+        )
+    else:
+        pytest.skip("requires --database-backend=postgresql")
+
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+
+    admin.setup_db(database, table, str(tmp_path),
+                   create_plpythonu_functions=False)
+    admin.load_records(StaticContext(), database, table, data)
+
+    yield database, table
+
+    if request.param == "postgresql":
+        repository.Repository.create_engine(database).execute(
+            'DROP TABLE IF EXISTS %s' % table)
+    repository.Repository.invalidate(table=table)
+
+
+@pytest.mark.parametrize("constraint, maxrecords, startposition, total, returned", [
+    ({}, 10, 0, 11, 10),
+    ({}, 10, 10, 11, 1),
+    ({}, 10, 20, 11, 0),
+    ({}, 0, 0, 11, 0),
+    ({'where': 'title = :pvalue0', 'values': ['Lorem ipsum']}, 10, 0, 1, 1),
+    ({'where': 'title = :pvalue0', 'values': ['foo']}, 10, 0, 0, 0),
+])
+@pytest.mark.parametrize("paging", repository.PAGING_MODES)
+def test_query_paging(paging_database, paging, constraint, maxrecords,
+                      startposition, total, returned):
+    from pycsw.core.config import StaticContext
+    from sqlalchemy import event
+
+    database, table = paging_database
+    repo = repository.Repository(database, StaticContext(), table=table,
+                                 paging=paging)
+    assert repo.window_functions
+
+    result = repository.Repository(
+        database, StaticContext(), table=table, paging='count').query(
+        constraint, sortby={'propertyname': 'identifier', 'order': 'ASC'},
+        maxrecords=maxrecords, startposition=startposition)
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(repo.engine, 'before_cursor_execute', count_statements)
+    try:
+        result2 = repo.query(
+            constraint, sortby={'propertyname': 'identifier', 'order': 'ASC'},
+            maxrecords=maxrecords, startposition=startposition)
+    finally:
+        event.remove(repo.engine, 'before_cursor_execute', count_statements)
+
+    if paging == 'window' and maxrecords > 0 and (returned or not startposition):
+        assert len(statements) == 1
+    else:
+        assert len(statements) == 2
+
+    assert result2[0] == result[0] == str(total)
+    assert len(result2[1]) == returned
+    assert [rec.identifier for rec in result2[1]] == \
+        [rec.identifier for rec in result[1]]
+
+
+def test_check_xml(paging_database):
+    from pycsw.core.config import StaticContext
+
+    database, table = paging_database
+    repo = repository.Repository(database, StaticContext(), table=table,
+                                 check_xml=True)
+    records = [dict(repo.as_dict(record), identifier=identifier, xml=xml)
+               for identifier, xml in [('ok', '<foo/>'), ('bad', '<foo>')]
+               for record in repo.query_ids(
+                   ['urn:uuid:19887a8a-f6b0-4a63-ae56-7fba0e17801f'])]
+
+    outcomes = repo.insert_many(records)
+    assert outcomes[0] == 'inserted'
+    assert isinstance(outcomes[1], RuntimeError)
+    assert [rec.identifier for rec in repo.query_ids(['ok', 'bad'])] == ['ok']
+
+    with pytest.raises(RuntimeError):
+        repository.check_xml(b'<foo>')
+    repository.check_xml('<?xml version="1.0" encoding="UTF-8"?><foo/>')
+
+
+def test_paging_invalid():
+    from pycsw.core.config import StaticContext
+
+    with pytest.raises(RuntimeError):
+        repository.Repository('sqlite://', StaticContext(), paging='foo')
+
+
+@pytest.mark.parametrize("maxrecords, startposition", [
+    (10, 0),
+    (10, 10),
+    (10, 20),
+    (0, 0),
+])
+@pytest.mark.parametrize("paging", repository.PAGING_MODES)
+def test_query_stream(paging_database, paging, maxrecords, startposition):
+    from pycsw.core.config import StaticContext
+
+    database, table = paging_database
+    repo = repository.Repository(database, StaticContext(), table=table,
+                                 paging=paging)
+    sortby = {'propertyname': 'identifier', 'order': 'ASC'}
+
+    total, records = repo.query({}, sortby=sortby, maxrecords=maxrecords,
+                                startposition=startposition)
+    total2, records2 = repo.query({}, sortby=sortby, maxrecords=maxrecords,
+                                  startposition=startposition, stream=True)
+
+    if records:
+        assert not isinstance(records2, list)
+    assert total2 == total == '11'
+    assert [rec.identifier for rec in records2] == \
+        [rec.identifier for rec in records]
+
+
+@pytest.mark.parametrize("sortby", [
+    None,
+    {'propertyname': 'title', 'order': 'ASC'},
+    {'propertyname': 'title', 'order': 'DESC'},
+    {'propertyname': 'date_modified', 'order': 'DESC'},
+])
+def test_query_cursor(paging_database, sortby):
+    from pycsw.core.config import StaticContext
+    from pycsw.core import util
+
+    database, table = paging_database
+    repo = repository.Repository(database, StaticContext(), table=table)
+
+    # offset pagination with the same deterministic ordering
+    expected = repo.query({}, sortby=sortby, maxrecords=20,
+                          cursor=util.encode_cursor(0))[1]
+    expected = [rec.identifier for rec in expected]
+    assert len(expected) == 11
+
+    identifiers = []
+    cursor = ''
+    while cursor is not None:
+        total, records = repo.query({}, sortby=sortby, maxrecords=3,
+                                    cursor=cursor)
+        assert total == '11'
+        identifiers.extend([rec.identifier for rec in records])
+        cursor = None
+        if len(identifiers) < int(total):
+            cursor = repo.get_cursor(
+                records[-1], len(identifiers),
+                sortby['propertyname'] if sortby is not None else None)
+
+    assert identifiers == expected
+
+
+def test_apply_cursor(paging_database):
+    from pycsw.core.config import StaticContext
+    from pycsw.core import util
+
+    database, table = paging_database
+    repo = repository.Repository(database, StaticContext(), table=table)
+
+    query = repo.session.query(repo.dataset)
+    cursor = util.encode_cursor(9, [None, 'urn:uuid:a06af396-3105-442d-8b40-22b57a90d2f2'])
+    query, position, offset = repo.apply_cursor(query, cursor)
+    assert (position, offset) == (9, 0)
+    assert [rec.identifier for rec in query.all()] == [
+        'urn:uuid:ab42a8c4-95e8-4630-bf79-33e59241605a',
+        'urn:uuid:e9330592-0932-474b-be34-c3a3bb67c7db'
+    ]
+
+    with pytest.raises(ValueError):
+        repo.apply_cursor(query, 'foo')
+
+
+@pytest.mark.parametrize("columns, loaded", [
+    (None, ['xml', 'anytext', 'metadata']),
+    ([], []),
+    (['anytext'], ['anytext']),
+])
+def test_query_columns(paging_database, columns, loaded):
+    from pycsw.core.config import StaticContext
+
+    database, table = paging_database
+    repo = repository.Repository(database, StaticContext(), table=table)
+
+    records = repo.query({}, maxrecords=3, columns=columns)[1]
+    assert len(records) == 3
+
+    for column in ['xml', 'anytext', 'metadata']:
+        for record in records:
+            assert (column in record.__dict__) == (column in loaded)
+
+    record = repo.query_ids([records[1].identifier], columns)[0]
+    assert ('xml' in record.__dict__) == ('xml' in loaded)
+
+    # deferred columns are loaded on access
+    assert record.xml is not None
+
+
+def test_insert_many(paging_database):
+    from pycsw.core import metadata
+    from pycsw.core.config import StaticContext
+    from pycsw.core.etree import etree
+
+    database, table = paging_database
+    context = StaticContext()
+    repo = repository.Repository(database, context, table=table)
+
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+
+    def parse(name):
+        return metadata.parse_record(
+            context, etree.parse(os.path.join(data, name)), repo)[0]
+
+    records = [
+        parse('Record_19887a8a-f6b0-4a63-ae56-7fba0e17801f.xml'),
+        parse('Record_1ef30a8b-876d-4828-9246-c37ab4510bbd.xml'),
+        parse('Record_6a3de50b-fa66-4b58-a0e6-ca146fdd18d4.xml')
+    ]
+    records[2].identifier = 'urn:uuid:insert-many'
+
+    # existing records fail, the batch with the new record succeeds
+    outcomes = repo.insert_many(records, batch_size=2)
+    assert [isinstance(i, Exception) for i in outcomes[:2]] == [True, True]
+    assert outcomes[2] == 'inserted'
+    assert repo.query({})[0] == '12'
+
+    for record in records:
+        record.title = 'insert_many'
+
+    def titles():
+        return repo.session.query(repo.dataset).filter_by(
+            title='insert_many').count()
+
+    assert repo.insert_many(records, 'skip') == ['skipped'] * 3
+    assert titles() == 0
+
+    assert repo.insert_many(records, 'upsert', batch_size=2) == ['updated'] * 3
+    assert titles() == 3
+    assert repo.query({})[0] == '12'
+
+    with pytest.raises(RuntimeError):
+        repo.insert_many(records, 'foo')
+
+
+def test_insert_many_stop_on_error(paging_database):
+    from pycsw.core import metadata
+    from pycsw.core.config import StaticContext
+    from pycsw.core.etree import etree
+
+    database, table = paging_database
+    context = StaticContext()
+    repo = repository.Repository(database, context, table=table)
+
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+
+    def parse(name):
+        return metadata.parse_record(
+            context, etree.parse(os.path.join(data, name)), repo)[0]
+
+    records = [
+        parse('Record_19887a8a-f6b0-4a63-ae56-7fba0e17801f.xml'),
+        parse('Record_1ef30a8b-876d-4828-9246-c37ab4510bbd.xml'),
+        parse('Record_6a3de50b-fa66-4b58-a0e6-ca146fdd18d4.xml')
+    ]
+    records[0].identifier = 'urn:uuid:insert-many-a'
+    records[2].identifier = 'urn:uuid:insert-many-c'
+
+    # records before the existing one are written, records after it are not
+    outcomes = repo.insert_many(records, stop_on_error=True)
+    assert len(outcomes) == 2
+    assert outcomes[0] == 'inserted'
+    assert isinstance(outcomes[1], Exception)
+    assert [i.identifier for i in repo.query_ids(
+        ['urn:uuid:insert-many-a', 'urn:uuid:insert-many-c'])] == [
+        'urn:uuid:insert-many-a']
+
+
+def test_spatial_index(tmp_path):
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+    admin.load_records(StaticContext(), database, 'records', data)
+
+    repo = repository.Repository(database, StaticContext())
+    assert repo.spatial_index == 'records_rtree'
+
+    def indexed():
+        return repo.session.execute(
+            'select count(*) from records_rtree').scalar()
+
+    with_geometry = repo.session.query(repo.dataset).filter(
+        repo.dataset.wkt_geometry.isnot(None)).count()
+    assert with_geometry > 0
+    assert indexed() == with_geometry
+
+    # the pre-filter does not change query results
+    wkt = 'POLYGON((-180 -90, -180 90, 180 90, 180 -90, -180 -90))'
+    where = "query_spatial(wkt_geometry,'%s','intersects','false') = 'true'" % wkt
+    prefilter = util.spatial_index_filter(repo.spatial_index, wkt, 'intersects')
+    expected = repo.query({'where': where, 'values': []}, maxrecords=20)
+    result = repo.query({'where': '(%s and %s)' % (prefilter, where),
+                         'values': []}, maxrecords=20)
+    assert result[0] == expected[0] == str(with_geometry)
+
+    # the index follows deletes
+    identifier = repo.query({'where': where, 'values': []})[1][0].identifier
+    repo.delete({'where': 'identifier = :pvalue0', 'values': [identifier]})
+    assert indexed() == with_geometry - 1
+
+    repository.Repository.invalidate(database, 'records')
+
+
+def test_spatial_index_external_writer(tmp_path):
+    import sqlite3
+    from pycsw.core import admin
+
+    database = tmp_path / 'records.db'
+    admin.setup_db('sqlite:///{}'.format(database), 'records', str(tmp_path))
+
+    # the triggers only use built-in SQL: any SQLite client can write
+    connection = sqlite3.connect(str(database))
+    connection.execute(
+        "insert into records (identifier, typename, schema, mdsource, "
+        "metadata_type, insert_date, xml, anytext, wkt_geometry, bbox_minx, "
+        "bbox_miny, bbox_maxx, bbox_maxy) values ('a', 'csw:Record', 'csw', 'local', "
+        "'application/xml', '2026', '<a/>', 'a', 'POINT(1 2)', 1, 2, 1, 2)")
+    assert connection.execute(
+        'select id, minx, maxx, miny, maxy from records_rtree').fetchall() == [
+        (1, 1, 1, 2, 2)]
+
+    connection.execute(
+        "update records set wkt_geometry = 'POINT(3 4)', bbox_minx = 3, "
+        "bbox_miny = 4, bbox_maxx = 3, bbox_maxy = 4")
+    assert connection.execute(
+        'select id, minx, maxx, miny, maxy from records_rtree').fetchall() == [
+        (1, 3, 3, 4, 4)]
+
+    connection.execute("update records set wkt_geometry = null, "
+                       "bbox_minx = null, bbox_miny = null, "
+                       "bbox_maxx = null, bbox_maxy = null")
+    assert connection.execute(
+        'select count(*) from records_rtree').fetchone() == (0,)
+    connection.close()
+
+
+def test_fts_index(tmp_path):
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+    admin.load_records(StaticContext(), database, 'records', data)
+
+    repo = repository.Repository(database, StaticContext())
+    assert repo.fts_index == 'records_fts'
+
+    def search(column, pattern):
+        fts_query = util.fts_index_query(repo.fts_index, column, pattern)
+        where = util.fts_index_filter(repo.fts_index, column, ':pvalue0')
+        result = repo.query({'where': where, 'values': [fts_query]},
+                            maxrecords=20)
+        expected = repo.query({'where': '%s like :pvalue0' % column,
+                               'values': [pattern]}, maxrecords=20)
+        assert [r.identifier for r in result[1]] == \
+            [r.identifier for r in expected[1]]
+        return int(result[0])
+
+    # the index returns the same records as LIKE
+    assert search('anytext', '%lorem%') > 0
+    assert search('anytext', '%IPSUM%') > 0
+    assert search('title', '%purus%') > 0
+    assert search('abstract', '%nothing like this%') == 0
+
+    # the index follows updates and deletes
+    identifier = repo.query({'where': 'title like :pvalue0',
+                             'values': ['%purus%']})[1][0].identifier
+    repo.session.execute(
+        "update records set title = 'nothing like this' where identifier = :id",
+        {'id': identifier})
+    assert search('title', '%nothing like this%') == 1
+    repo.delete({'where': 'identifier = :pvalue0', 'values': [identifier]})
+    assert search('title', '%nothing like this%') == 0
+
+    repository.Repository.invalidate(database, 'records')
+
+
+def test_upsert_or_replace_indexes(tmp_path, monkeypatch):
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+    admin.load_records(StaticContext(), database, 'records', data)
+
+    repo = repository.Repository(database, StaticContext())
+
+    # upserts of SQLite < 3.24 replace rows
+    monkeypatch.setattr(repo.engine.dialect.dbapi, 'sqlite_version_info',
+                        (3, 23, 0))
+    assert 'OR REPLACE' in str(repo._insert_statement(
+        'upsert', repo.dataset.__table__.c.identifier))
+
+    records = [repo.as_dict(record) for record in
+               repo.session.query(repo.dataset).filter(
+                   repo.dataset.wkt_geometry.isnot(None))]
+    for record in records:
+        record['title'] = 'replaced'
+    assert repo.insert_many(records, 'upsert') == ['updated'] * len(records)
+
+    # the delete triggers of the indexes fired for the replaced rows
+    repo.session.execute(
+        "insert into records_fts(records_fts) values ('integrity-check')")
+    assert repo.session.execute(
+        "select count(*) from records_fts where records_fts match "
+        "'title:replaced'").scalar() == len(records)
+    assert repo.session.execute(
+        'select count(*) from records_rtree').scalar() == len(records)
+    assert repo.session.execute(
+        'select count(*) from records_rtree where id not in '
+        '(select rowid from records)').scalar() == 0
+
+    repository.Repository.invalidate(database, 'records')
+
+
+def test_bbox_columns(tmp_path):
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+    admin.load_records(StaticContext(), database, 'records', data)
+
+    repo = repository.Repository(database, StaticContext())
+    assert repo.bbox_columns
+
+    # columns are written at ingest
+    for record in repo.session.query(repo.dataset):
+        bbox = [getattr(record, column) for column in util.BBOX_COLUMNS]
+        assert bbox == list(util.bbox_columns(record.wkt_geometry).values())
+
+    # the pre-filter does not change query results
+    wkt = 'POLYGON((-5 47, -5 52, 0 52, 0 47, -5 47))'
+    where = "query_spatial(wkt_geometry,'%s','bbox','false') = 'true'" % wkt
+    prefilter = util.bbox_columns_filter(wkt, 'bbox')
+    expected = repo.query({'where': where, 'values': []}, maxrecords=20)
+    result = repo.query({'where': '(%s and %s)' % (prefilter, where),
+                         'values': []}, maxrecords=20)
+    assert int(expected[0]) > 0
+    assert sorted(r.identifier for r in result[1]) == \
+        sorted(r.identifier for r in expected[1])
+
+    repository.Repository.invalidate(database, 'records')
+
+
+def test_area_column(tmp_path):
+    from pycsw.core import admin
+    from pycsw.core.config import StaticContext
+
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+    admin.setup_db(database, 'records', str(tmp_path))
+    data = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'functionaltests', 'suites', 'cite', 'data')
+    admin.load_records(StaticContext(), database, 'records', data)
+
+    repo = repository.Repository(database, StaticContext())
+    assert repo.area_column
+
+    # column is written at ingest
+    areas = {}
+    for record in repo.session.query(repo.dataset):
+        assert record.area == util.geometry_area(record.wkt_geometry)
+        areas[record.identifier] = record.area
+    assert max(areas.values()) > 0
+
+    # spatial sorts use it
+    for order in ['ASC', 'DESC']:
+        sortby = {'propertyname': 'wkt_geometry', 'order': order,
+                  'spatial': True}
+        result = repo.query({}, sortby=sortby, maxrecords=20)[1]
+        assert [areas[r.identifier] for r in result] == sorted(
+            areas.values(), reverse=order == 'DESC')
+
+    repository.Repository.invalidate(database, 'records')
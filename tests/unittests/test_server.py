@@ -29,10 +29,17 @@
 """Unit tests for pycsw.server"""
 
 import configparser
+import gzip
+import json
 import os
+import shutil
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
 
+from lxml import etree
 import pytest
 
+from pycsw import server, wsgi
 from pycsw.core.util import EnvInterpolation
 
 pytestmark = pytest.mark.unit
@@ -52,3 +59,489 @@ def test_config_env_vars():
     parser.read_string(cfg)
 
     assert parser['server']['url'] == 'http://localhost:8000'
+
+
+def test_get_application_memoized(tmp_path):
+    config_path = tmp_path / 'default.cfg'
+    config_path.write_text('[server]\nurl=http://localhost/csw\n')
+
+    app = server.get_application(str(config_path))
+    assert server.get_application(str(config_path)) is app
+    assert app.config.get('repository', 'table') == 'records'
+
+    # request-scoped configuration copies do not leak into the application
+    config = app.get_config()
+    config.set('server', 'url', 'http://example.org/csw')
+    assert app.config.get('server', 'url') == 'http://localhost/csw'
+
+    # a modified configuration file is picked up
+    config_path.write_text('[server]\nurl=http://localhost/pycsw\n')
+    os.utime(config_path, (0, 0))
+    app2 = server.get_application(str(config_path))
+    assert app2 is not app
+    assert app2.config.get('server', 'url') == 'http://localhost/pycsw'
+
+
+def test_get_application_config_memoized(monkeypatch):
+    rtconfig = {'server': {'url': 'http://localhost/csw'}}
+    app = server.get_application(rtconfig)
+    assert server.get_application(dict(rtconfig)) is app
+    assert server.get_application(
+        {'server': {'url': 'http://localhost/pycsw'}}) is not app
+
+    # configuration parsers are completed in place by the application
+    parser = configparser.ConfigParser()
+    parser.read_dict({'server': {'url': 'http://localhost/parser'}})
+    app = server.get_application(parser)
+    assert parser.has_option('server', 'home')
+    assert server.get_application(parser) is app
+
+    parser2 = configparser.ConfigParser()
+    parser2.read_dict({'server': {'url': 'http://localhost/parser'}})
+    assert server.get_application(parser2) is app
+
+    # the number of memoized applications is bounded
+    monkeypatch.setattr(server, 'MAX_CONFIG_APPLICATIONS', 4)
+    for i in range(10):
+        server.get_application({'server': {'url': 'http://localhost/%d' % i}})
+    assert len([k for k in server._APPLICATIONS if k[0] == 'config']) <= 4
+
+
+@pytest.mark.parametrize("mode, shared", [
+    ("cached", True),
+    ("full", False),
+])
+def test_xml_validation_parsers(mode, shared):
+    rtconfig = {'server': {'url': 'http://localhost/csw',
+                           'xml_validation': mode}}
+    csw = server.Csw(rtconfig, {'QUERY_STRING': ''})
+    assert csw.xml_validation == mode
+
+    schema = server.get_request_schemas(csw.config.get('server', 'home'))[0]
+    parser = csw.get_parser(schema)
+    assert parser is not csw.context.parser
+    assert (csw.get_parser(schema) is parser) is shared
+
+
+def test_xml_validation_off():
+    rtconfig = {'server': {'url': 'http://localhost/csw',
+                           'xml_validation': 'off'}}
+    csw = server.Csw(rtconfig, {'QUERY_STRING': ''})
+    assert csw.get_parser('/nonexistent.xsd') is csw.context.parser
+
+
+def test_xml_validation_invalid():
+    with pytest.raises(RuntimeError):
+        server.Application({'server': {'url': 'http://localhost/csw',
+                                       'xml_validation': 'foo'}})
+
+
+def suite_configurations(tmp_path_factory, suite, **overrides):
+    """Configuration files of a catalogue loaded with the records of a
+    functional test suite, by output options"""
+
+    from pycsw.core import admin, config
+
+    suites = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                          'functionaltests', 'suites')
+
+    tmp_path = tmp_path_factory.mktemp('streaming')
+    database = 'sqlite:///{}'.format(tmp_path / 'records.db')
+
+    admin.setup_db(database, 'records', str(tmp_path))
+    admin.load_records(config.StaticContext(), database, 'records',
+                       os.path.join(suites, suite, 'data'))
+
+    configurations = {}
+    for name, options in [
+            ('buffered', {}),
+            ('streaming', {'streaming': 'true'}),
+            ('raw_xml', {'raw_xml': 'true'}),
+            ('streaming_raw_xml', {'streaming': 'true', 'raw_xml': 'true'})]:
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(os.path.join(suites, suite, 'default.cfg'))
+        parser.set('server', 'url', 'http://localhost/pycsw')
+        for option, value in dict(overrides, **options).items():
+            parser.set('server', option, value)
+        parser.set('repository', 'database', database)
+        parser.set('repository', 'table', 'records')
+
+        configurations[name] = str(tmp_path / f'{name}.cfg')
+        with open(configurations[name], 'w') as fh:
+            parser.write(fh)
+
+    return configurations
+
+
+@pytest.fixture(scope='module')
+def cite_configuration(tmp_path_factory):
+    """Configuration files of a catalogue loaded with the CITE records,
+    by output options"""
+
+    return suite_configurations(tmp_path_factory, 'cite', profiles='apiso',
+                                gzip_compresslevel='6')
+
+
+@pytest.fixture(scope='module')
+def apiso_configuration(tmp_path_factory):
+    """Configuration files of a catalogue loaded with the APISO records,
+    by output options"""
+
+    return suite_configurations(tmp_path_factory, 'apiso')
+
+
+def get_records(configuration, query_string, monkeypatch, **env):
+    monkeypatch.setenv('PYCSW_CONFIG', configuration)
+    env.update({'QUERY_STRING': query_string, 'REQUEST_METHOD': 'GET'})
+    setup_testing_defaults(env)
+    response = []
+    contents = wsgi.application(
+        env, lambda status, headers: response.extend([status, dict(headers)]))
+    return response[0], response[1], contents
+
+
+def records_of(content):
+    """Tags and texts of the records of a GetRecords response"""
+
+    results = etree.fromstring(content).xpath(
+        '//*[local-name()="SearchResults"]')[0]
+    return results.get('numberOfRecordsReturned'), [
+        [(el.tag, (el.text or '').strip()) for el in record.iter()]
+        for record in results]
+
+
+@pytest.mark.parametrize("query_string", [
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=brief&resulttype=results&maxrecords=5',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&sortby=dc:title:A&startposition=4',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=summary&outputschema=http://www.w3.org/2005/Atom',
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&resulttype=results'
+    '&outputschema=http://www.isotc211.org/2005/gmd',
+])
+def test_streaming(cite_configuration, monkeypatch, query_string):
+    status, headers, contents = get_records(
+        cite_configuration['buffered'], query_string, monkeypatch)
+    assert status.startswith('200')
+    assert len(contents) == 1
+
+    status2, headers2, contents2 = get_records(
+        cite_configuration['streaming'], query_string, monkeypatch)
+    assert status2 == status
+    assert 'Content-Length' not in headers2
+
+    chunks = list(contents2)
+    assert len(chunks) > 2
+    assert records_of(b''.join(chunks)) == records_of(contents[0])
+
+
+def json_of(content):
+    """JSON value of a response, without its timestamps and namespace
+    declarations (streamed records declare the namespaces they use)"""
+
+    def strip(value):
+        if isinstance(value, dict):
+            return dict((k, strip(v)) for k, v in value.items()
+                        if k not in ['@timestamp', '@elapsedTime', '@xmlns'])
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+
+    return strip(json.loads(content))
+
+
+@pytest.mark.parametrize("query_string", [
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&outputformat=application/json',
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&resulttype=results&outputformat=application/json',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&maxrecords=1&outputformat=application/json',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&constraintlanguage=CQL_TEXT&constraint=dc:title%20like%20%27nothing%27'
+    '&outputformat=application/json',
+])
+def test_streaming_json(cite_configuration, monkeypatch, query_string):
+    _, _, contents = get_records(
+        cite_configuration['buffered'], query_string, monkeypatch)
+
+    status, headers, contents2 = get_records(
+        cite_configuration['streaming'], query_string, monkeypatch)
+    assert status.startswith('200')
+    assert headers['Content-Type'].startswith('application/json')
+    assert 'Content-Length' not in headers
+
+    assert json_of(b''.join(contents2)) == json_of(contents[0])
+
+
+def test_streaming_json_interleaved(apiso_configuration, monkeypatch):
+    # ISO records of different types come interleaved in identifier order
+    query_string = ('service=CSW&version=3.0.0&request=GetRecords'
+                    '&typenames=gmd:MD_Metadata&elementsetname=full'
+                    '&outputschema=http://www.isotc211.org/2005/gmd'
+                    '&sortby=apiso:Identifier:D&maxrecords=20'
+                    '&outputformat=application/json')
+
+    _, _, contents = get_records(
+        apiso_configuration['buffered'], query_string, monkeypatch)
+
+    _, _, contents2 = get_records(
+        apiso_configuration['streaming'], query_string, monkeypatch)
+
+    response = json_of(b''.join(contents2))
+    results = response['csw30:GetRecordsResponse']['csw30:SearchResults']
+    assert len(results['gmd:MD_Metadata']) == 8
+    assert response == json_of(contents[0])
+
+
+@pytest.mark.parametrize("query_string", [
+    'mode=opensearch&service=CSW&version=3.0.0&request=GetRecords'
+    '&typenames=csw:Record&q=purus',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=foo',
+])
+def test_streaming_buffered(cite_configuration, monkeypatch, query_string):
+    _, headers, contents = get_records(
+        cite_configuration['streaming'], query_string, monkeypatch)
+    assert 'Content-Length' in headers
+    assert isinstance(contents[0], bytes)
+
+
+def test_streaming_gzip(cite_configuration, monkeypatch):
+    query_string = ('service=CSW&version=3.0.0&request=GetRecords'
+                    '&typenames=csw:Record&elementsetname=full')
+
+    _, _, contents = get_records(
+        cite_configuration['buffered'], query_string, monkeypatch)
+
+    _, headers, contents2 = get_records(
+        cite_configuration['streaming'], query_string, monkeypatch,
+        HTTP_ACCEPT_ENCODING='gzip')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in headers
+
+    content = gzip.decompress(b''.join(contents2))
+    assert records_of(content) == records_of(contents[0])
+
+
+def failing_rows(rows, fetched=2):
+    """Rows of a query, failing after ``fetched`` of them"""
+
+    for position, row in enumerate(rows):
+        if position == fetched:
+            raise RuntimeError('connection lost')
+        yield row
+
+
+@pytest.mark.parametrize("paging", ['window', 'count'])
+def test_streaming_failure(cite_configuration, monkeypatch, caplog, tmp_path,
+                           paging):
+    from sqlalchemy.orm import Query
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(cite_configuration['streaming'])
+    parser.set('repository', 'paging', paging)
+    configuration = str(tmp_path / 'streaming.cfg')
+    with open(configuration, 'w') as fh:
+        parser.write(fh)
+
+    query_string = ('service=CSW&version=3.0.0&request=GetRecords'
+                    '&typenames=csw:Record&elementsetname=full')
+    yield_per = Query.yield_per
+
+    # a failure midway closes the document
+    monkeypatch.setattr(Query, 'yield_per', lambda self, count: failing_rows(
+        yield_per(self, count)))
+    status, _, contents = get_records(configuration, query_string,
+                                      monkeypatch)
+    assert status.startswith('200')
+    content = b''.join(contents)
+    assert b'<!-- Fetching records failed: connection lost -->' in content
+    # the records fetched before the failure, and a comment
+    assert records_of(content)[1][:-1] == records_of(b''.join(get_records(
+        cite_configuration['streaming'], query_string + '&maxrecords=2',
+        monkeypatch)[2]))[1]
+    assert [r.levelname for r in caplog.records
+            if 'Fetching streamed records failed' in r.getMessage()] == ['ERROR']
+
+    _, _, contents = get_records(configuration,
+                                 query_string + '&outputformat=application/json',
+                                 monkeypatch)
+    results = json.loads(b''.join(contents))['csw30:GetRecordsResponse'][
+        'csw30:SearchResults']
+    assert len(results['csw30:Record']) == 2
+
+    # an early failure is reported as an exception
+    monkeypatch.setattr(Query, 'yield_per', lambda self, count: failing_rows(
+        yield_per(self, count), 0))
+    _, _, contents = get_records(configuration, query_string, monkeypatch)
+    assert b'ExceptionReport' in b''.join(contents)
+
+
+def elements_of(content):
+    """Tags, texts and attributes of the elements of a response"""
+
+    return [(el.tag, (el.text or '').strip(),
+             sorted((k, v) for k, v in el.attrib.items()
+                    if k not in ['timestamp', 'elapsedTime', 'expires']))
+            for el in etree.fromstring(content).iter(etree.Element)]
+
+
+@pytest.mark.parametrize("configuration", ['raw_xml', 'streaming_raw_xml'])
+@pytest.mark.parametrize("query_string", [
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&resulttype=results&maxrecords=20',
+    'service=CSW&version=2.0.2&request=GetRecordById&elementsetname=full'
+    '&id=urn:uuid:19887a8a-f6b0-4a63-ae56-7fba0e17801f',
+    'service=CSW&version=2.0.2&request=GetRepositoryItem'
+    '&id=urn:uuid:19887a8a-f6b0-4a63-ae56-7fba0e17801f',
+])
+def test_raw_xml(cite_configuration, monkeypatch, configuration,
+                 query_string):
+    _, _, contents = get_records(
+        cite_configuration['buffered'], query_string, monkeypatch)
+
+    status, _, contents2 = get_records(
+        cite_configuration[configuration], query_string, monkeypatch)
+    content = b''.join(contents2)
+
+    assert status.startswith('200')
+    assert b'pycsw:raw' not in content
+    # stored records are output as is, with their namespace declarations
+    assert b'<csw:Record xmlns:csw=' in content
+    assert elements_of(content) == elements_of(contents[0])
+
+
+class CustomRepository:
+    """Custom repository with the interface of the bundled repository
+    plugins, querying the database of ``database``"""
+
+    database = None
+
+    def __init__(self, context, repo_filter=None):
+        from pycsw.core import repository
+
+        self.repository = repository.Repository(self.database, context)
+        self.dataset = self.repository.dataset
+        self.dbtype = self.repository.dbtype
+        self.fts = self.repository.fts
+        self.queryables = self.repository.queryables
+
+    def query_ids(self, ids):
+        return self.repository.query_ids(ids)
+
+    def query_domain(self, domain, typenames, domainquerytype='list',
+                     count=False):
+        return self.repository.query_domain(domain, typenames,
+                                            domainquerytype, count)
+
+    def insert(self, record, source, insert_date):
+        self.repository.insert(record, source, insert_date)
+
+    def query(self, constraint, sortby=None, typenames=None,
+              maxrecords=10, startposition=0):
+        if 'where' in constraint:  # constraints with Django placeholders
+            where = constraint['where'].split('%s')
+            constraint = dict(constraint, where=''.join(
+                '%s:pvalue%d' % (part, i) for i, part in
+                enumerate(where[:-1])) + where[-1])
+        return self.repository.query(constraint, sortby, typenames,
+                                     maxrecords, startposition)
+
+
+@pytest.fixture
+def custom_configuration(cite_configuration, tmp_path, monkeypatch):
+    """Configuration file of the CITE catalogue, through a custom
+    repository"""
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(cite_configuration['buffered'])
+    parser.set('repository', 'source', '{}.CustomRepository'.format(__name__))
+
+    # a copy of the catalogue, for transactions
+    database = parser.get('repository', 'database')
+    shutil.copy(database.replace('sqlite:///', ''), tmp_path / 'records.db')
+    monkeypatch.setattr(CustomRepository, 'database',
+                        'sqlite:///{}'.format(tmp_path / 'records.db'))
+
+    configuration = str(tmp_path / 'custom.cfg')
+    with open(configuration, 'w') as fh:
+        parser.write(fh)
+    return configuration
+
+
+@pytest.mark.parametrize("query_string", [
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=brief&resulttype=results',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=summary',
+    'service=CSW&version=2.0.2&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&resulttype=results&constraintlanguage=CQL_TEXT'
+    '&constraint=dc:title%20like%20%27%25lorem%25%27',
+    'service=CSW&version=3.0.0&request=GetRecords&typenames=csw:Record'
+    '&elementsetname=full&constraintlanguage=CQL_TEXT'
+    '&constraint=dc:title%20like%20%27%25lorem%25%27',
+])
+def test_custom_repository(cite_configuration, custom_configuration,
+                           monkeypatch, query_string):
+    _, _, contents = get_records(
+        cite_configuration['buffered'], query_string, monkeypatch)
+
+    status, _, contents2 = get_records(
+        custom_configuration, query_string, monkeypatch)
+    assert status.startswith('200')
+    assert b'ExceptionReport' not in contents2[0]
+    assert records_of(contents2[0]) == records_of(contents[0])
+
+
+def post_request(configuration, request):
+    env = {
+        'QUERY_STRING': '',
+        'REQUEST_METHOD': 'POST',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_LENGTH': str(len(request)),
+        'wsgi.input': BytesIO(request)
+    }
+    setup_testing_defaults(env)
+
+    csw = server.Csw(configuration, env)
+    status, content = csw.dispatch_wsgi()
+    return csw, content
+
+
+def test_custom_repository_filter(cite_configuration, custom_configuration):
+    # spatial and property filters, without the indexes of the default
+    # repository
+    with open(os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'functionaltests',
+            'suites', 'cite', 'post',
+            '418a6fb0-a89c-4a94-afc9-3f8168eb2980.xml'), 'rb') as fh:
+        request = fh.read()
+
+    _, content = post_request(cite_configuration['buffered'], request)
+    _, content2 = post_request(custom_configuration, request)
+
+    assert b'ExceptionReport' not in content2
+    assert records_of(content2) == records_of(content)
+    assert records_of(content2)[0] == '1'
+
+
+def test_custom_repository_transaction(custom_configuration):
+    request = etree.parse(os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'functionaltests',
+        'suites', 'manager', 'post', 'Transaction-dc-01-insert.xml'))
+    # two inserts, written together by the default repository
+    insert = request.getroot()[0]
+    insert.append(etree.fromstring(etree.tostring(insert[0]).replace(
+        b'>xyz<', b'>xyz2<')))
+
+    assert not hasattr(CustomRepository, 'insert_many')
+    csw, content = post_request(custom_configuration,
+                                etree.tostring(request))
+
+    assert etree.fromstring(content).xpath(
+        '//*[local-name()="totalInserted"]')[0].text == '2'
+    assert [record.identifier for record in
+            csw.repository.query_ids(['xyz', 'xyz2'])] == ['xyz', 'xyz2']
@@ -196,21 +196,25 @@ def test_getqattr_invalid():
 
 
 def test_http_request_post():
-    # here we replace owslib.util.http_post with a mock object
-    # because we are not interested in testing owslib
+    # here we replace the shared HTTP client with a mock object
+    # because we are not interested in testing requests
     method = "POST"
     url = "some_phony_url"
     request = "some_phony_request"
     timeout = 40
-    with mock.patch("pycsw.core.util.http_post",
-                    autospec=True) as mock_http_post:
-        util.http_request(
+    with mock.patch("pycsw.core.util.get_client",
+                    autospec=True) as mock_get_client:
+        mock_get_client.return_value.request.return_value.content = b"ok"
+        result = util.http_request(
             method=method,
             url=url,
             request=request,
             timeout=timeout
         )
-        mock_http_post.assert_called_with(url, request, timeout=timeout)
+        assert result == b"ok"
+        mock_get_client.return_value.request.assert_called_with(
+            method, url, data=request, headers={"Content-Type": "text/xml"},
+            timeout=timeout, raise_for_status=False)
 
 
 @pytest.mark.parametrize("url, expected", [
@@ -340,3 +344,119 @@ def test_jsonify_links(linkstr, expected):
 ])
 def test_is_none_or_empty(value, result):
     assert util.is_none_or_empty(value) is result
+
+
+@pytest.mark.parametrize("position, values", [
+    (0, None),
+    (10, [None, "urn:uuid:1"]),
+    (20, ["Lorem ipsum", "urn:uuid:2"]),
+    (30, [1.5, "urn:uuid:3"]),
+])
+def test_cursor(position, values):
+    token = util.encode_cursor(position, values)
+    assert util.decode_cursor(token) == (position, values)
+
+
+@pytest.mark.parametrize("token", [
+    "foo",
+    util.encode_cursor(-1),
+    util.encode_cursor(0, ["foo"]),
+])
+def test_decode_cursor_invalid(token):
+    with pytest.raises(ValueError):
+        util.decode_cursor(token)
+
+
+def test_decode_cursor_empty():
+    assert util.decode_cursor('') == (0, None)
+    assert util.decode_cursor(None) == (0, None)
+
+
+@pytest.mark.parametrize("spatial_index, wkt, predicate, distance, expected", [
+    ("records_rtree", "POLYGON((0 1, 0 3, 2 3, 2 1, 0 1))", "bbox", "false",
+     "rowid in (select id from records_rtree where minx <= 2.0 and "
+     "maxx >= 0.0 and miny <= 3.0 and maxy >= 1.0)"),
+    ("records_rtree", "POINT(1 2)", "dwithin", "0.5",
+     "rowid in (select id from records_rtree where minx <= 1.5 and "
+     "maxx >= 0.5 and miny <= 2.5 and maxy >= 1.5)"),
+    (None, "POINT(1 2)", "intersects", "false", None),
+    ("records_rtree", "POINT(1 2)", "disjoint", "false", None),
+    ("records_rtree", "POINT(1 2)", "beyond", "1", None),
+    ("records_rtree", "foo", "bbox", "false", None),
+])
+def test_spatial_index_filter(spatial_index, wkt, predicate, distance,
+                              expected):
+    assert util.spatial_index_filter(
+        spatial_index, wkt, predicate, distance) == expected
+
+
+@pytest.mark.parametrize("fts_index, column, pattern, expected", [
+    ("records_fts", "anytext", "%lorem%", '"lorem"'),
+    ("records_fts", "title", "%say \"hi\"%", '"say ""hi"""'),
+    (None, "anytext", "%lorem%", None),
+    ("records_fts", "identifier", "%lorem%", None),
+    ("records_fts", "anytext", "lorem%", None),
+    ("records_fts", "anytext", "%lo%", None),
+    ("records_fts", "anytext", "%lo%em%", None),
+    ("records_fts", "anytext", "%lo_em%", None),
+])
+def test_fts_index_query(fts_index, column, pattern, expected):
+    assert util.fts_index_query(fts_index, column, pattern) == expected
+
+
+@pytest.mark.parametrize("wkt, predicate, distance, expected", [
+    ("POLYGON((0 1, 0 3, 2 3, 2 1, 0 1))", "intersects", "false",
+     "(bbox_minx <= 2.0 and bbox_maxx >= 0.0 and bbox_miny <= 3.0 and "
+     "bbox_maxy >= 1.0)"),
+    ("POINT(1 2)", "dwithin", "0.5",
+     "(bbox_minx <= 1.5 and bbox_maxx >= 0.5 and bbox_miny <= 2.5 and "
+     "bbox_maxy >= 1.5)"),
+    ("POINT(1 2)", "disjoint", "false", None),
+    ("foo", "bbox", "false", None),
+])
+def test_bbox_columns_filter(wkt, predicate, distance, expected):
+    assert util.bbox_columns_filter(wkt, predicate, distance) == expected
+
+
+@pytest.mark.parametrize("wkt, expected", [
+    ("POLYGON((0 1, 0 3, 2 3, 2 1, 0 1))", [0.0, 1.0, 2.0, 3.0]),
+    ("ENVELOPE(0, 2, 3, 1)", [0.0, 1.0, 2.0, 3.0]),
+    ("POLYGON EMPTY", [None] * 4),
+    (None, [None] * 4),
+])
+def test_bbox_columns(wkt, expected):
+    assert util.bbox_columns(wkt) == dict(zip(util.BBOX_COLUMNS, expected))
+
+
+@pytest.mark.parametrize("wkt, expected", [
+    ("POLYGON((0 1, 0 3, 2 3, 2 1, 0 1))", 4.0),
+    ("POINT(1 2)", 0.0),
+    ("foo", 0.0),
+    (None, 0.0),
+])
+def test_geometry_area(wkt, expected):
+    assert util.geometry_area(wkt) == expected
+
+
+def test_load_record_xml():
+    from pycsw.core.config import StaticContext
+    from pycsw.core.etree import etree
+
+    xml = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<foo xmlns="urn:foo"><bar>baz</bar></foo>')
+
+    context = StaticContext()
+    record = util.load_record_xml(context, xml.encode())
+    assert record.tag == '{urn:foo}foo'
+
+    context.raw_records = []
+    root = etree.Element('results')
+    root.append(util.load_record_xml(context, xml))
+    root.append(util.load_record_xml(context, xml.encode()))
+    assert root[0].tag is etree.Comment
+
+    response = util.splice_raw_records(
+        context, etree.tostring(root, encoding='unicode'))
+    assert response == ('<results><foo xmlns="urn:foo"><bar>baz</bar></foo>'
+                        '<foo xmlns="urn:foo"><bar>baz</bar></foo></results>')
+    assert context.raw_records == [None, None]
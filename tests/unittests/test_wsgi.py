@@ -28,7 +28,10 @@
 # =================================================================
 """Unit tests for pycsw.wsgi"""
 
+import configparser
+import gzip
 from wsgiref.util import setup_testing_defaults
+import zlib
 
 import mock
 import pytest
@@ -90,13 +93,15 @@ def test_get_configuration_path(process_env, wsgi_env, pycsw_root, expected):
     1, 2, 3, 4, 5, 6, 7, 8, 9,
 ])
 def test_compress_response(compression_level):
-    fake_response = "dummy"
-    with mock.patch("pycsw.wsgi.gzip", autospec=True) as mock_gzip:
+    fake_response = b"dummy"
+    with mock.patch("pycsw.wsgi.zlib.compressobj",
+                    wraps=zlib.compressobj) as mock_compressobj:
         compressed_response, headers = wsgi.compress_response(
             fake_response, compression_level)
-        creation_kwargs = mock_gzip.GzipFile.call_args[1]
-        assert creation_kwargs["compresslevel"] == compression_level
+        creation_args = mock_compressobj.call_args[0]
+        assert creation_args[0] == compression_level
         assert headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(compressed_response) == fake_response
 
 
 def test_application_no_gzip():
@@ -145,9 +150,90 @@ def test_application_gzip():
         mock_pycsw = mock_csw_class.return_value
         mock_pycsw.config = mock.MagicMock()
         mock_pycsw.config.get.return_value = fake_compression_level
+        # no level set for the format of the response
+        mock_pycsw.config.has_option.side_effect = (
+            lambda section, option: option == "gzip_min_size")
         mock_pycsw.dispatch_wsgi.return_value = (fake_status, fake_response)
         mock_pycsw.contenttype = fake_content_type
         wsgi.application(request_env, mock_start_response)
         mock_pycsw.config.get.assert_called_with("server",
                                                  "gzip_compresslevel")
-        mock_compress.assert_called_with(fake_response, fake_compression_level)
+        mock_compress.assert_called_with(fake_response, fake_compression_level,
+                                         "gzip")
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("deflate", "deflate"),
+    ("gzip, deflate, br", "gzip"),
+    ("deflate, gzip;q=0.5", "deflate"),
+    ("gzip;q=0, deflate;q=0.1", "deflate"),
+    ("gzip;q=0", None),
+    ("br", None),
+    ("*", "gzip"),
+    ("gzip;q=0, *;q=0.5", "deflate"),
+    ("identity, gzip;q=0.5", None),
+    ("x-gzip", "gzip"),
+    ("GZIP ; Q=0.8", "gzip"),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert wsgi.negotiate_encoding(accept_encoding) == expected
+
+
+def test_get_compression_options():
+    config = configparser.ConfigParser()
+    config.read_dict({"server": {"gzip_compresslevel": "6",
+                                 "gzip_compresslevel_html": "1",
+                                 "gzip_min_size": "100"}})
+
+    assert wsgi.get_compression_options(config, "application/xml") == (6, 100)
+    assert wsgi.get_compression_options(
+        config, "text/html; charset=utf-8") == (1, 100)
+
+    config.remove_option("server", "gzip_min_size")
+    assert wsgi.get_compression_options(config, "application/json") == (
+        6, wsgi.COMPRESSION_MIN_SIZE)
+
+    # compression may be enabled for some content types only
+    config.remove_option("server", "gzip_compresslevel")
+    assert wsgi.get_compression_options(config, "text/html") == (
+        1, wsgi.COMPRESSION_MIN_SIZE)
+    with pytest.raises(configparser.NoOptionError):
+        wsgi.get_compression_options(config, "application/xml")
+
+
+@pytest.mark.parametrize("encoding, decompress", [
+    ("gzip", gzip.decompress),
+    ("deflate", zlib.decompress),
+])
+def test_compress_contents(encoding, decompress):
+    contents = b"<csw:Record/>" * 100
+
+    small, headers = wsgi.compress_contents(contents[:100], encoding, 6)
+    assert small == contents[:100]
+    assert headers == {"Vary": "Accept-Encoding"}
+
+    compressed, headers = wsgi.compress_contents(contents, encoding, 6)
+    assert headers["Content-Encoding"] == encoding
+    assert decompress(compressed) == contents
+
+    chunks, headers = wsgi.compress_contents(
+        iter([contents[:10], contents[10:]]), encoding, 6)
+    assert headers["Content-Encoding"] == encoding
+    assert decompress(b"".join(chunks)) == contents
+
+
+def test_compress_contents_cache():
+    contents = b"<csw:Record/>" * 100
+
+    with mock.patch.object(wsgi, "compress_response",
+                           wraps=wsgi.compress_response) as mock_compress:
+        result = wsgi.compress_contents(contents, "gzip", 6, cache_key='"a"')
+        assert wsgi.compress_contents(
+            contents, "gzip", 6, cache_key='"a"') == result
+        assert mock_compress.call_count == 1
+
+        wsgi.compress_contents(contents, "gzip", 1, cache_key='"a"')
+        wsgi.compress_contents(contents, "gzip", 6)
+        assert mock_compress.call_count == 3